@@ -0,0 +1,427 @@
+"""
+Apache Arrow export and import for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import bisect
+
+from . import clsutils, codec, exceptions, signature
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+#: Default number of rows in every record batch that is written.
+BATCH_SIZE = 65536
+
+# key of the schema metadata holding the name of the class
+_CLASS_KEY = b'case_class'
+
+
+def schema(cls):
+    """ Returns the Arrow schema of a flat CaseClass, with one field per
+    parameter of its init signature. The types of the fields are derived
+    from the annotations of the parameters, which have to be one of bool,
+    int, float, str (or their names) and bytes. Requires pyarrow.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class to get schema of.
+    :type cls: type
+
+    :rtype: pyarrow.Schema
+    """
+
+    fields = []
+
+    for (name, tp) in _field_types(cls):
+        if tp is None:
+            raise exceptions.CodecException(
+                "Parameter %r of %s has no supported annotation" % (
+                    name, cls.__name__))
+        fields.append(pyarrow.field(name, tp))
+
+    return pyarrow.schema(fields, metadata={_CLASS_KEY: _class_name(cls)})
+
+
+def write(instances, path, cls=None, batch_size=BATCH_SIZE):
+    """ Writes a collection of flat CaseClass instances to an Arrow IPC file,
+    with one column per parameter of the init signature. Instances are
+    written in record batches as they are generated, so the collection does
+    not have to fit into memory. Requires pyarrow.
+
+    Annotated parameters get the type from schema(), the types of other
+    parameters are inferred from the first batch. Only instances whose
+    parameters are all primitive values can be written.
+
+    :raises: exceptions.CodecException
+
+    :param instances: Instances to write. All have to be of the same class.
+    :type instances: iterable
+
+    :param path: Path of the file to write.
+    :type path: str
+
+    :param cls: Optional. Class of the instances. Defaults to the class of
+    the first instance and is required if there are no instances.
+    :type cls: type
+
+    :param batch_size: Optional. Number of rows in every record batch.
+    :type batch_size: int
+
+    :return: the number of rows written
+    :rtype: int
+    """
+
+    _require()
+
+    iterator = iter(instances)
+    first = next(iterator, None)
+
+    if cls is None:
+        if first is None:
+            raise exceptions.CodecException(
+                "Can not write an empty collection without a class")
+        cls = first.__class__
+
+    types = _field_types(cls)
+    rows = 0
+
+    writer = None
+    sink = pyarrow.OSFile(path, 'wb')
+
+    try:
+        batch = [] if first is None else [first]
+
+        while True:
+            for inst in iterator:
+                batch.append(inst)
+                if len(batch) >= batch_size:
+                    break
+
+            if writer is not None and not batch:
+                break
+
+            record = _record_batch(cls, types, batch)
+
+            # the schema is known once the first batch was built
+            if writer is None:
+                types = [(f.name, f.type) for f in record.schema]
+                file_schema = record.schema.with_metadata(
+                    {_CLASS_KEY: _class_name(cls)})
+                writer = pyarrow.ipc.new_file(sink, file_schema)
+
+            if batch:
+                writer.write_batch(record)
+                rows += len(batch)
+
+            batch = []
+
+        writer.close()
+    finally:
+        sink.close()
+
+    return rows
+
+
+def read(path):
+    """ Opens an Arrow IPC file written by write for reading. Requires
+    pyarrow.
+
+    :raises: exceptions.CodecException
+
+    :param path: Path of the file to read.
+    :type path: str
+
+    :rtype: ArrowReader
+    """
+
+    return ArrowReader(path)
+
+
+class ArrowReader(object):
+    """ Reads CaseClass instances from an Arrow IPC file written by write.
+
+    The file is memory-mapped, so columns are exposed without copying them
+    and only the pages that are accessed are loaded. Instances are created
+    lazily and interned as usual. Readers can be used as context managers,
+    which closes them at the end. """
+
+    def __init__(self, path):
+        """ Creates a new ArrowReader() instance.
+
+        :raises: exceptions.CodecException
+
+        :param path: Path of the file to read.
+        :type path: str
+        """
+
+        _require()
+
+        self.__source = pyarrow.memory_map(path, 'r')
+
+        try:
+            self.__reader = pyarrow.ipc.open_file(self.__source)
+            self.__cls = _find_class(self.__reader.schema)
+        except Exception:
+            self.__source.close()
+            raise
+
+        # index of the first row of every batch
+        self.__offsets = []
+        rows = 0
+
+        for i in range(self.__reader.num_record_batches):
+            self.__offsets.append(rows)
+            rows += self.__reader.get_batch(i).num_rows
+
+        self.__rows = rows
+
+    @property
+    def cls(self):
+        """ The class of the instances in the file.
+
+        :rtype: type
+        """
+
+        return self.__cls
+
+    @property
+    def schema(self):
+        """ The Arrow schema of the file.
+
+        :rtype: pyarrow.Schema
+        """
+
+        return self.__reader.schema
+
+    def __len__(self):
+        """ Returns the number of rows in the file.
+
+        :rtype: int
+        """
+
+        return self.__rows
+
+    def column(self, name):
+        """ Returns a column of the file without copying it.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param name: Name of the parameter to get column of.
+        :type name: str
+
+        :rtype: pyarrow.ChunkedArray
+        """
+
+        idx = self.__reader.schema.get_field_index(name)
+        if idx < 0:
+            raise exceptions.NoSuchArgument(name)
+
+        return pyarrow.chunked_array(
+            [self.__reader.get_batch(i).column(idx)
+             for i in range(self.__reader.num_record_batches)],
+            type=self.__reader.schema.field(idx).type)
+
+    def table(self):
+        """ Returns the contents of the file as an Arrow table without
+        copying them.
+
+        :rtype: pyarrow.Table
+        """
+
+        return self.__reader.read_all()
+
+    def __iter__(self):
+        """ Generates the instances in the file, in order. Only the values
+        of one record batch are converted to Python objects at a time.
+
+        :rtype: generator
+        """
+
+        from_values = self.__cls.from_values
+
+        for i in range(self.__reader.num_record_batches):
+            batch = self.__reader.get_batch(i)
+            columns = [c.to_pylist() for c in batch.columns]
+
+            for values in zip(*columns):
+                yield from_values(values)
+
+    def __getitem__(self, index):
+        """ Returns the instance in a row of the file.
+
+        :param index: Index of the row.
+        :type index: int
+
+        :rtype: case_class.CaseClass
+        """
+
+        if index < 0:
+            index += self.__rows
+
+        if not 0 <= index < self.__rows:
+            raise IndexError("row index out of range")
+
+        i = bisect.bisect_right(self.__offsets, index) - 1
+        batch = self.__reader.get_batch(i)
+        row = index - self.__offsets[i]
+
+        return self.__cls.from_values(
+            [c[row].as_py() for c in batch.columns])
+
+    def close(self):
+        """ Closes the file. Columns and tables returned earlier may not be
+        used afterwards. """
+
+        self.__source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#
+# Internal helpers
+#
+
+def _require():
+    """ Raises an exception if pyarrow is not available. """
+
+    if pyarrow is None:
+        raise RuntimeError("Arrow support requires pyarrow")
+
+
+def _class_name(cls):
+    """ Returns the name of a class stored in the schema metadata.
+
+    :param cls: Class to get name of.
+    :type cls: type
+
+    :rtype: bytes
+    """
+
+    return ('%s:%s' % (cls.__module__, getattr(cls, '__qualname__',
+                                               cls.__name__))).encode('utf-8')
+
+
+def _find_class(arrow_schema):
+    """ Finds the class of the instances stored with a schema and checks
+    that its parameters match the fields.
+
+    :raises: exceptions.CodecException
+
+    :param arrow_schema: Schema to find class of.
+    :type arrow_schema: pyarrow.Schema
+
+    :rtype: type
+    """
+
+    name = (arrow_schema.metadata or {}).get(_CLASS_KEY)
+    if name is None:
+        raise exceptions.CodecException("Not a case class Arrow file")
+
+    (module, qualname) = name.decode('utf-8').split(':', 1)
+    cls = codec.find_class(module, qualname)
+
+    if arrow_schema.names != [n for (n, tp) in _field_types(cls)]:
+        raise exceptions.CodecException(
+            "Parameters of %s have changed" % (cls.__name__,))
+
+    return cls
+
+
+def _field_types(cls):
+    """ Returns the names of the parameters of a flat CaseClass and the
+    Arrow types derived from their annotations, or None for parameters
+    without a supported annotation.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class to get fields of.
+    :type cls: type
+
+    :rtype: list
+    """
+
+    _require()
+
+    sig = clsutils.get_init_signature(cls)
+    annots = sig.annots()
+    types = {
+        bool: pyarrow.bool_(), 'bool': pyarrow.bool_(),
+        int: pyarrow.int64(), 'int': pyarrow.int64(),
+        float: pyarrow.float64(), 'float': pyarrow.float64(),
+        str: pyarrow.string(), 'str': pyarrow.string(),
+        bytes: pyarrow.binary(), 'bytes': pyarrow.binary()
+    }
+
+    fields = []
+
+    for (name, tp, default) in sig:
+        if tp == signature.Signature.VARARG or \
+                tp == signature.Signature.KEYWORD_VARARG:
+            raise exceptions.CodecException(
+                "%s has variable arguments and is not a flat record" % (
+                    cls.__name__,))
+
+        annot = annots.get(name)
+        try:
+            fields.append((name, types.get(annot)))
+        except TypeError:
+            fields.append((name, None))
+
+    return fields
+
+
+def _record_batch(cls, types, instances):
+    """ Builds a record batch from a list of instances.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class of the instances.
+    :type cls: type
+
+    :param types: Pairs (name, type) of the columns, the type may be None to
+    infer it.
+    :type types: list
+
+    :param instances: Instances to build batch of.
+    :type instances: list
+
+    :rtype: pyarrow.RecordBatch
+    """
+
+    columns = [[] for t in types]
+
+    for inst in instances:
+        if inst.__class__ is not cls:
+            raise exceptions.CodecException(
+                "Expected an instance of %s, got %r" % (cls.__name__, inst))
+
+        for (column, value) in zip(columns, inst.case_signature.values()):
+            column.append(value)
+
+    arrays = []
+
+    for ((name, tp), column) in zip(types, columns):
+        if tp is None and not column:
+            tp = pyarrow.null()
+
+        try:
+            arrays.append(pyarrow.array(column, type=tp))
+        except (pyarrow.ArrowException, TypeError, ValueError) as e:
+            raise exceptions.CodecException(
+                "Can not write parameter %r of %s: %s" % (
+                    name, cls.__name__, e))
+
+    return pyarrow.RecordBatch.from_arrays(arrays,
+                                           names=[n for (n, t) in types])
+
+
+__all__ = ["BATCH_SIZE", "schema", "write", "read", "ArrowReader"]
@@ -0,0 +1,113 @@
+"""
+Memoised attributes for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import caching, traversal
+
+
+class case_attribute(object):
+    """ Decorator that turns a method without arguments into an attribute
+    that is computed once for every (interned) CaseClass instance.
+
+    The value is stored on the instance itself, so it lives exactly as long
+    as the instance does. Because equal instances are the same object, a
+    tree rebuilt after an edit shares all of its untouched subtrees with the
+    original one and only the new instances on the edited spine compute the
+    attribute again.
+
+    When the attribute is read, it is first computed for all descendants of
+    the instance that have it, bottom-up. Attributes defined in terms of the
+    same attribute of the children are therefore never computed
+    recursively, even for very deep trees. Like case_cached, every value is
+    computed at most once, also when read from several threads. """
+
+    def __init__(self, fn):
+        """ Creates a new case_attribute() instance.
+
+        :param fn: Function computing the value of the attribute.
+        :type fn: callable
+        """
+
+        self.__fn = fn
+        self.__name = fn.__name__
+        self.__doc__ = fn.__doc__
+
+        # makes sure that values are computed only once, also across threads
+        self.__values = caching._DictCache(self.__name)
+
+    @property
+    def name(self):
+        """ The name of this attribute.
+
+        :rtype: str
+        """
+
+        return self.__name
+
+    def __get__(self, obj, cls=None):
+        """ Gets the value of this attribute for an instance.
+
+        :param obj: Instance to get value for or None.
+        :type obj: case_class.CaseClass
+
+        :param cls: Class the attribute was accessed on.
+        :type cls: type
+
+        :rtype: object
+        """
+
+        if obj is None:
+            return self
+
+        # once computed, the value in the instance dictionary is found before
+        # this descriptor, so we only get here the first time
+        values = obj.__dict__
+        if self.__name not in values:
+            self.__evaluate(obj)
+
+        return values[self.__name]
+
+    def is_computed(self, obj):
+        """ Checks if this attribute was already computed for an instance.
+
+        :param obj: Instance to check.
+        :type obj: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return self.__name in obj.__dict__
+
+    def __has_attribute(self, obj):
+        """ Checks if an instance has this attribute.
+
+        :param obj: Instance to check.
+        :type obj: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return getattr(obj.__class__, self.__name, None) is self
+
+    def __evaluate(self, root):
+        """ Computes this attribute for an instance and all of its descendants
+        that have it, bottom-up.
+
+        :param root: Instance to compute attribute for.
+        :type root: case_class.CaseClass
+        """
+
+        name = self.__name
+        fn = self.__fn
+
+        # the descendants of instances that were computed before are done
+        prune = lambda n: name in n.__dict__
+
+        for node in traversal.postorder(root, unique=True, prune=prune):
+            if name not in node.__dict__ and self.__has_attribute(node):
+                self.__values.get(node, lambda: fn(node))
+
+
+__all__ = ["case_attribute"]
@@ -0,0 +1,280 @@
+"""
+Caching of derived values for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import collections
+import functools
+import threading
+
+#: Default maximal number of values kept by bounded caches.
+DEFAULT_MAXSIZE = 128
+
+# marks a value that is not in a cache
+_MISSING = object()
+
+
+class case_cached(object):
+    """ Decorator that turns a method without arguments into a property that
+    is computed at most once for every instance, even when it is read from
+    several threads at the same time.
+
+    Because equal CaseClass instances are the same object, the value is
+    shared by everyone holding an equal instance. It is stored on the
+    instance itself. For instances without a __dict__ (e.g. because of
+    __slots__) it is stored in a bounded cache per property instead. """
+
+    def __init__(self, fn):
+        """ Creates a new case_cached() instance.
+
+        :param fn: Function computing the value of the property.
+        :type fn: callable
+        """
+
+        self.__fn = fn
+        self.__doc__ = fn.__doc__
+
+        self.__values = _DictCache(fn.__name__)
+        self.__fallback = _LRUCache(DEFAULT_MAXSIZE)
+
+    def __get__(self, obj, cls=None):
+        """ Gets the value of this property for an instance.
+
+        :param obj: Instance to get value for or None.
+        :type obj: object
+
+        :param cls: Class the property was accessed on.
+        :type cls: type
+
+        :rtype: object
+        """
+
+        if obj is None:
+            return self
+
+        if hasattr(obj, '__dict__'):
+            cache = self.__values
+        else:
+            cache = self.__fallback
+
+        return cache.get(obj, lambda: self.__fn(obj))
+
+
+def case_memoize(maxsize=DEFAULT_MAXSIZE):
+    """ Creates a decorator that memoises a method with arguments. The most
+    recently used results for all instances of the class are kept in a
+    single cache, and every result is computed at most once even when the
+    method is called from several threads at the same time.
+
+    All arguments of the method have to be hashable. The decorated method
+    has a cache_clear() function to empty the cache.
+
+    :param maxsize: Optional. Maximal number of results to keep or None to
+    keep all results.
+    :type maxsize: int
+
+    :rtype: callable
+    """
+
+    def decorator(fn):
+        cache = _LRUCache(maxsize)
+
+        @functools.wraps(fn)
+        def memoized(self, *args, **kwargs):
+            key = (self, args, tuple(sorted(kwargs.items())))
+            return cache.get(key, lambda: fn(self, *args, **kwargs))
+
+        memoized.cache_clear = cache.clear
+        return memoized
+
+    return decorator
+
+
+#
+# Internal helpers
+#
+
+class _Cache(object):
+    """ Base class of caches that compute values at most once. Subclasses
+    implement the storage of values. """
+
+    def __init__(self):
+        """ Creates a new _Cache() instance. """
+
+        self._lock = threading.Lock()
+
+        # keys whose values are being computed, mapped to a pair
+        # [lock, number of waiting threads]
+        self.__pending = {}
+
+    def get(self, key, compute):
+        """ Gets the value for a key, computing it if needed. Other threads
+        asking for the same key while the value is computed wait for it.
+
+        :param key: Key to get value for.
+        :type key: object
+
+        :param compute: Function without arguments that computes the value.
+        :type compute: callable
+
+        :rtype: object
+        """
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+
+            pending = self.__pending.get(key)
+            if pending is None:
+                pending = [threading.RLock(), 0]
+                self.__pending[key] = pending
+            pending[1] += 1
+
+        try:
+            with pending[0]:
+                with self._lock:
+                    value = self._lookup(key)
+
+                if value is _MISSING:
+                    value = compute()
+
+                    with self._lock:
+                        self._store(key, value)
+        finally:
+            with self._lock:
+                pending[1] -= 1
+                if not pending[1]:
+                    del self.__pending[key]
+
+        return value
+
+    def _lookup(self, key):
+        """ Returns the stored value for a key or _MISSING. Called with the
+        lock held.
+
+        :param key: Key to look up.
+        :type key: object
+
+        :rtype: object
+        """
+
+        raise NotImplementedError
+
+    def _store(self, key, value):
+        """ Stores the value for a key. Called with the lock held.
+
+        :param key: Key to store value for.
+        :type key: object
+
+        :param value: Value to store.
+        :type value: object
+        """
+
+        raise NotImplementedError
+
+
+class _DictCache(_Cache):
+    """ A cache that stores values in the dictionary of the key. """
+
+    def __init__(self, name):
+        """ Creates a new _DictCache() instance.
+
+        :param name: Name to store values under.
+        :type name: str
+        """
+
+        super(_DictCache, self).__init__()
+        self.__name = name
+
+    def _lookup(self, key):
+        """ Returns the stored value for a key or _MISSING. Called with the
+        lock held.
+
+        :param key: Key to look up.
+        :type key: object
+
+        :rtype: object
+        """
+
+        return key.__dict__.get(self.__name, _MISSING)
+
+    def _store(self, key, value):
+        """ Stores the value for a key. Called with the lock held.
+
+        :param key: Key to store value for.
+        :type key: object
+
+        :param value: Value to store.
+        :type value: object
+        """
+
+        key.__dict__[self.__name] = value
+
+
+class _LRUCache(_Cache):
+    """ A cache that keeps the most recently used values. """
+
+    def __init__(self, maxsize):
+        """ Creates a new _LRUCache() instance.
+
+        :param maxsize: Maximal number of values to keep or None.
+        :type maxsize: int
+        """
+
+        super(_LRUCache, self).__init__()
+
+        self.__maxsize = maxsize
+        self.__values = collections.OrderedDict()
+
+    def __len__(self):
+        """ Returns the number of values in this cache.
+
+        :rtype: int
+        """
+
+        return len(self.__values)
+
+    def clear(self):
+        """ Removes all values from this cache. """
+
+        with self._lock:
+            self.__values.clear()
+
+    def _lookup(self, key):
+        """ Returns the stored value for a key or _MISSING. Called with the
+        lock held.
+
+        :param key: Key to look up.
+        :type key: object
+
+        :rtype: object
+        """
+
+        value = self.__values.pop(key, _MISSING)
+
+        # re-insert the value to mark it as most recently used
+        if value is not _MISSING:
+            self.__values[key] = value
+
+        return value
+
+    def _store(self, key, value):
+        """ Stores the value for a key. Called with the lock held.
+
+        :param key: Key to store value for.
+        :type key: object
+
+        :param value: Value to store.
+        :type value: object
+        """
+
+        self.__values[key] = value
+
+        if self.__maxsize is not None:
+            while len(self.__values) > self.__maxsize:
+                self.__values.popitem(last=False)
+
+
+__all__ = ["DEFAULT_MAXSIZE", "case_cached", "case_memoize"]
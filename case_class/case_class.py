@@ -6,7 +6,8 @@ Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
 
 import inspect
 
-from . import exceptions, clsutils, signature
+from . import exceptions, clsutils, signature, representation, columnar, \
+    fieldindex, persistent
 
 
 #
@@ -19,8 +20,15 @@ class CaseClassMeta(type):
 
     instance_keys = {}
     instance_values = {}
+    instance_hashes = {}
     instance_list = []
 
+    #: secondary indexes of the interned instances by class, see fieldindex
+    instance_indexes = {}
+
+    #: all classes created with this metaclass by (module, qualified name)
+    classes = {}
+
     def __new__(mcs, name, bases, attrs):
         """ Creates a new class with MetaClass CaseClassMeta.
         :param name: Name of the class to create.
@@ -41,7 +49,13 @@ class CaseClassMeta(type):
             raise exceptions.NoCaseToCaseInheritanceException(name)
 
         # now we can just create it normally.
-        return super(CaseClassMeta, mcs).__new__(mcs, name, bases, attrs)
+        cls = super(CaseClassMeta, mcs).__new__(mcs, name, bases, attrs)
+
+        # and remember it, so that it can be found by name
+        qualname = getattr(cls, '__qualname__', name)
+        CaseClassMeta.classes[(cls.__module__, qualname)] = cls
+
+        return cls
 
     def __call__(cls, *args, **kwargs):
         """ Creates a new CaseClass() instance.
@@ -55,42 +69,162 @@ class CaseClassMeta(type):
         :rtype: CaseClass
         """
 
-        # Can not instantiate Abstract Case Class
-        if AbstractCaseClass in cls.__bases__:
-            raise exceptions.NotInstantiableAbstractCaseClassException(cls)
+        CaseClassMeta.check_instantiable(cls)
 
-        # may not instantiate sub classes of _CaseClass
-        if _CaseClass in cls.__bases__:
-            raise exceptions.NotInstantiableClassException(
-                "Cannot instantiate %s: " % (cls.__name__,) +
-                "Classes inheriting directly from _CaseClass may not be " +
-                "instantiated. ", cls)
+        # bind the arguments to get the key for this instance.
+        applied = clsutils.get_init_signature(cls)(*args, **kwargs)
+
+        return CaseClassMeta.__intern(cls, applied.values(), args, kwargs)
+
+    def from_values(cls, values):
+        """ Creates a new CaseClass() instance from the values of all
+        parameters, in the order returned by AppliedSignature.values().
+
+        This is the fast construction path: An existing instance is returned
+        without binding any arguments to the init signature.
+
+        :param values: Values of all parameters.
+        :type values: tuple
+
+        :rtype: CaseClass
+        """
+
+        CaseClassMeta.check_instantiable(cls)
+
+        return CaseClassMeta.__intern(cls, tuple(values), None, None)
+
+    def read_csv(cls, path, chunk_size=columnar.CHUNK_SIZE, arrays=False,
+                 errors=None, **fmtparams):
+        """ Reads instances of this class from a CSV file whose header names
+        the parameters of the init signature. See columnar.read_csv.
+
+        :raises: exceptions.CodecException
+
+        :param path: Path or text file object to read from.
+        :type path: str
+
+        :param chunk_size: Optional. Number of rows converted at once.
+        :type chunk_size: int
+
+        :param arrays: Optional. If set to True, generates a
+        columnar.CaseClassArray for every chunk instead of single instances.
+        :type arrays: bool
+
+        :param errors: Optional. List to append columnar.RowError instances
+        for rows that can not be read to.
+        :type errors: list
+
+        :param fmtparams: Formatting parameters passed to csv.reader.
+        :type fmtparams: dict
+
+        :rtype: generator
+        """
+
+        return columnar.read_csv(cls, path, chunk_size, arrays, errors,
+                                 **fmtparams)
+
+    def create_index(cls, name, kind=fieldindex.HASH):
+        """ Creates a secondary index of the interned instances of this class
+        by the value of a parameter. See fieldindex.create_index.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param name: Name of the parameter to index.
+        :type name: str
+
+        :param kind: Optional. Kind of the index, either fieldindex.HASH or
+        fieldindex.SORTED.
+        :type kind: str
+
+        :rtype: object
+        """
+
+        return fieldindex.create_index(cls, name, kind)
+
+    def instances(cls, where=None):
+        """ Generates the interned instances of this class, in the order they
+        were created. Instances created while iterating are not generated.
+
+        :param where: Optional. A query.Predicate the instances have to
+        match, e.g. query.field('src') == 1. Secondary indexes created with
+        create_index are used to find the matching instances when possible,
+        in which case they are generated in the order of the index.
+        :type where: query.Predicate
+
+        :rtype: generator
+        """
+
+        if where is not None:
+            return where.instances(cls)
+
+        return CaseClassMeta.__iter_instances(cls)
+
+    def __iter_instances(cls):
+        """ Generates the interned instances of this class that exist when
+        the iteration starts.
+
+        :rtype: generator
+        """
+
+        cval = CaseClassMeta.instance_values.get(cls, {})
+
+        for idx in range(len(cval)):
+            yield cval[idx]
+
+    def __intern(cls, values, args, kwargs):
+        """ Returns the instance of a class for the given values of the
+        parameters, creating it if it does not yet exist.
+
+        :param values: Values of all parameters.
+        :type values: tuple
+
+        :param args: Arguments to create the instance with or None to derive
+        them from values.
+        :type args: list
+
+        :param kwargs: Keyword arguments to create the instance with or None to
+        derive them from values.
+        :type kwargs: dict
+
+        :rtype: CaseClass
+        """
 
         # make sure we have the dictionary
         if cls not in CaseClassMeta.instance_keys:
             CaseClassMeta.instance_keys[cls] = []
             CaseClassMeta.instance_values[cls] = {}
+            CaseClassMeta.instance_hashes[cls] = {}
 
         # Extract the instances for this class
         ckey = CaseClassMeta.instance_keys[cls]
         cval = CaseClassMeta.instance_values[cls]
+        chash = CaseClassMeta.instance_hashes[cls]
 
-        # key we will use for this instance.
-        key = clsutils.get_class_parameters(cls, *args, **kwargs)
+        # hash of the key for this instance.
+        khash = CaseClassMeta.hash_value(values)
 
-        # try and return an existing instance.
-        try:
-            return cval[ckey.index(key)]
-        except ValueError:
-            pass
+        # try and return an existing instance, only instances with the same
+        # hash can be equal.
+        for idx in chash.get(khash, ()):
+            if ckey[idx] == values:
+                return cval[idx]
+
+        if args is None:
+            (args, kwargs) = clsutils.get_init_signature(cls) \
+                .get_call_arguments(values)
 
         # create a new instance
         instance = super(CaseClassMeta, cls).__call__(*args, **kwargs)
 
         # store the instance
         idx = len(ckey)
-        ckey.append(key)
+        ckey.append(values)
         cval[idx] = instance
+        chash.setdefault(khash, []).append(idx)
+
+        # and keep the secondary indexes up to date
+        for index in CaseClassMeta.instance_indexes.get(cls, ()):
+            index.add(instance)
 
         # and return it
         return instance
@@ -116,9 +250,37 @@ class CaseClassMeta(type):
         # finally just do the same as in call.
         return CaseClassMeta.__call__(cls, *item)
 
+    @staticmethod
+    def check_instantiable(cls):
+        """ Checks that a class may be instantiated and raises an appropriate
+        exception otherwise.
+
+        :raises: exceptions.NotInstantiableAbstractCaseClassException
+        :raises: exceptions.NotInstantiableClassException
+
+        :param cls: Class to check.
+        :type cls: type
+        """
+
+        # Can not instantiate Abstract Case Class
+        if AbstractCaseClass in cls.__bases__:
+            raise exceptions.NotInstantiableAbstractCaseClassException(cls)
+
+        # may not instantiate sub classes of _CaseClass
+        if _CaseClass in cls.__bases__:
+            raise exceptions.NotInstantiableClassException(
+                "Cannot instantiate %s: " % (cls.__name__,) +
+                "Classes inheriting directly from _CaseClass may not be " +
+                "instantiated. ", cls)
+
     @staticmethod
     def get_hash(cc):
-        """ Gets a hash for a CaseClass or None.
+        """ Gets a hash for a CaseClass. It is computed once when the
+        instance is created from the class and the values of the parameters
+        and never None, as unhashable values are hashed by their type (see
+        hash_value). Because the parameters are created before the
+        instance, nested CaseClass instances already have a stored hash and
+        this does not recurse into them.
 
         :param cc: CaseClass instance to get hash for
         :type cc: CaseClass
@@ -129,20 +291,189 @@ class CaseClassMeta(type):
         if not isinstance(cc, CaseClass):
             raise ValueError("Argument is not a CaseClass, can not get hash. ")
 
-        # get a key for the instance
-        cls = cc.__class__
-        key = (cc.case_args, cc.case_kwargs)
+        return hash((cc.__class__,
+                     CaseClassMeta.hash_value(cc.case_signature.values())))
 
-        # extract the key
-        ckey = CaseClassMeta.instance_keys[cls]
-        idx = ckey.index(key)
+    @staticmethod
+    def hash_value(value):
+        """ Gets a hash for a value passed to a CaseClass. In contrast to
+        the builtin hash() function, this also works for lists and
+        dictionaries. Values that can not be hashed at all are hashed by
+        their type.
+
+        :param value: Value to get hash for.
+        :type value: object
+
+        :rtype: int
+        """
+
+        if type(value) is tuple or type(value) is list:
+            return hash((type(value), tuple(
+                CaseClassMeta.hash_value(v) for v in value)))
 
-        # and return a hash of it
-        return hash((CaseClassMeta, ckey, idx))
+        elif type(value) is dict:
+            return hash((dict, frozenset(
+                (k, CaseClassMeta.hash_value(value[k])) for k in value)))
+
+        try:
+            return hash(value)
+        except TypeError:
+            return hash(type(value))
+
+    @staticmethod
+    def equals(a, b):
+        """ Checks if two CaseClass instances are structurally equal, i.e.
+        if they are of the same class and were given equal parameters.
+
+        Shared subtrees are recognised by identity and unequal subtrees by
+        their stored hashes, so only the differing parts of two trees are
+        compared. This works iteratively and does not hit the recursion
+        limit for deep trees.
+
+        :param a: First CaseClass instance to compare.
+        :type a: CaseClass
+
+        :param b: Second CaseClass instance to compare.
+        :type b: CaseClass
+
+        :rtype: bool
+        """
+
+        # pairs of objects that are compared or have been compared already
+        stack = [(a, b)]
+        seen = set()
+
+        while stack:
+            (x, y) = stack.pop()
+
+            if x is y:
+                continue
+
+            if isinstance(x, CaseClass):
+                if type(x) is not type(y) or hash(x) != hash(y):
+                    return False
+
+                # a pair of shared subtrees only needs to be compared once
+                key = (id(x), id(y))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                stack.extend(zip(x.case_signature.values(),
+                                 y.case_signature.values()))
+
+            elif (type(x) is tuple or type(x) is list) and \
+                    type(x) is type(y):
+                if len(x) != len(y):
+                    return False
+
+                stack.extend(zip(x, y))
+
+            elif type(x) is dict and type(y) is dict:
+                if len(x) != len(y):
+                    return False
+
+                for k in x:
+                    if k not in y:
+                        return False
+                    stack.append((x[k], y[k]))
+
+            # persistent collections have cached hashes
+            elif type(x) is persistent.PVector and type(y) is type(x):
+                if len(x) != len(y) or hash(x) != hash(y):
+                    return False
+
+                stack.extend(zip(x, y))
+
+            elif type(x) is persistent.PMap and type(y) is type(x):
+                if len(x) != len(y) or hash(x) != hash(y):
+                    return False
+
+                for (k, v) in x.items():
+                    w = y.get(k, _MISSING)
+                    if w is _MISSING:
+                        return False
+                    stack.append((v, w))
+
+            elif x != y:
+                return False
+
+        return True
+
+    @staticmethod
+    def compare(a, b):
+        """ Compares two CaseClass instances of the same class. The
+        parameters are compared lexicographically in the order of the init
+        signature. Raises TypeError if two unorderable values have to be
+        compared.
+
+        Like equals(), this works iteratively and skips shared subtrees.
+
+        :raises: TypeError
+
+        :param a: First CaseClass instance to compare.
+        :type a: CaseClass
+
+        :param b: Second CaseClass instance to compare.
+        :type b: CaseClass
+
+        :return: a negative number if a < b, zero if a == b and a positive
+        number if a > b.
+        :rtype: int
+        """
+
+        # pairs of objects that still have to be compared, the next pair is
+        # at the end of the stack.
+        stack = [(a, b)]
+        seen = set()
+
+        while stack:
+            (x, y) = stack.pop()
+
+            if x is y:
+                continue
+
+            # the end of two sequences, so the longer one is bigger
+            if x is _LENGTH:
+                if y != 0:
+                    return y
+                continue
+
+            if isinstance(x, CaseClass):
+                if type(x) is not type(y):
+                    raise TypeError(
+                        "unorderable types: %s and %s" % (
+                            type(x).__name__, type(y).__name__))
+
+                key = (id(x), id(y))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                stack.extend(reversed(list(zip(x.case_signature.values(),
+                                               y.case_signature.values()))))
+
+            elif (type(x) is tuple or type(x) is list or
+                  type(x) is persistent.PVector) and type(x) is type(y):
+                stack.append((_LENGTH, len(x) - len(y)))
+                stack.extend(reversed(list(zip(x, y))))
+
+            elif x == y:
+                continue
+
+            elif x < y:
+                return -1
+
+            else:
+                return 1
+
+        return 0
 
     @staticmethod
     def is_concrete_caseclass(cls):
         """ Checks if a class is a concrete case class via inheritance.
+        Classes inheriting from OrderedCaseClass are concrete unless they
+        are also abstract or inheritable.
 
         :param cls: Class to check.
         :type cls: type
@@ -150,7 +481,15 @@ class CaseClassMeta(type):
         :rtype: bool
         """
 
-        return cls != AbstractCaseClass and CaseClass in cls.__bases__
+        if cls == AbstractCaseClass or cls == OrderedCaseClass:
+            return False
+
+        if CaseClass in cls.__bases__:
+            return True
+
+        return OrderedCaseClass in cls.__bases__ and \
+            AbstractCaseClass not in cls.__bases__ and \
+            InheritableCaseClass not in cls.__bases__
 
     @staticmethod
     def inherits_from_case_class(bases):
@@ -179,6 +518,28 @@ class _CaseClass(object):
     pass
 
 
+# marker used by CaseClassMeta.compare() for the length of sequences
+_LENGTH = object()
+
+# marker used by CaseClassMeta.equals() for keys missing from a PMap
+_MISSING = object()
+
+
+def _restore(cls, values):
+    """ Restores a pickled CaseClass instance, see CaseClass.__reduce__.
+
+    :param cls: Class of the instance.
+    :type cls: type
+
+    :param values: Values of all parameters.
+    :type values: tuple
+
+    :rtype: CaseClass
+    """
+
+    return cls.from_values(values)
+
+
 @clsutils.add_metaclass(CaseClassMeta)
 class CaseClass(_CaseClass):
     """ Represents a normal CaseClass. """
@@ -207,6 +568,9 @@ class CaseClass(_CaseClass):
         # and the arguments
         inst.__applied = inst.__sig(*args, **kwargs)
 
+        # the hash, which is stored for quick comparisons
+        inst.__hash = CaseClassMeta.get_hash(inst)
+
         # and return the instance
         return inst
 
@@ -216,7 +580,43 @@ class CaseClass(_CaseClass):
         :rtype: int
         """
 
-        return CaseClassMeta.get_hash(self)
+        return self.__hash
+
+    def __eq__(self, other):
+        """ Checks if this CaseClass is equal to another object. Two
+        CaseClass instances are equal if they are of the same class and
+        were given equal parameters. This method is shared by all classes,
+        see CaseClassMeta.equals.
+
+        :param other: Object to compare with.
+        :type other: object
+
+        :rtype: bool
+        """
+
+        if self is other:
+            return True
+
+        if not isinstance(other, CaseClass):
+            return NotImplemented
+
+        return CaseClassMeta.equals(self, other)
+
+    def __ne__(self, other):
+        """ Checks if this CaseClass is not equal to another object.
+
+        :param other: Object to compare with.
+        :type other: object
+
+        :rtype: bool
+        """
+
+        equal = self.__eq__(other)
+
+        if equal is NotImplemented:
+            return equal
+
+        return not equal
 
     def copy(self, *args, **kwargs):
         """ Makes a copy of this CaseClass instance and exchanges the given
@@ -225,8 +625,39 @@ class CaseClass(_CaseClass):
         :rtype: CaseClass
         """
 
-        updated = self.case_params.signature(*args, **kwargs)
-        return updated.call(self.__class__)
+        updated = self.__applied(*args, **kwargs)
+        return self.__class__.from_values(updated.values())
+
+    def __reduce__(self):
+        """ Pickles this CaseClass instance as its class and the values of its
+        parameters only. It is interned again when it is unpickled, so it is
+        identical to an existing equal instance.
+
+        :rtype: tuple
+        """
+
+        return (_restore, (self.__class__, self.__applied.values()))
+
+    def __copy__(self):
+        """ Returns this CaseClass instance, because instances are immutable
+        and interned.
+
+        :rtype: CaseClass
+        """
+
+        return self
+
+    def __deepcopy__(self, memo):
+        """ Returns this CaseClass instance, because instances are immutable
+        and interned.
+
+        :param memo: Objects copied so far.
+        :type memo: dict
+
+        :rtype: CaseClass
+        """
+
+        return self
 
     @property
     def case_params(self):
@@ -237,6 +668,17 @@ class CaseClass(_CaseClass):
 
         return CaseParameters(self.__applied)
 
+    @property
+    def case_signature(self):
+        """ Returns the applied Signature of the parameters originally given
+        to this CaseClass. Unlike case_params, this does not create a new
+        CaseParameters instance.
+
+        :rtype: signature.AppliedSignature
+        """
+
+        return self.__applied
+
     def __repr__(self):
         """ Implements a representation for CaseClass instances. This is given
         by the class name and the representation of all the parameters.
@@ -244,8 +686,8 @@ class CaseClass(_CaseClass):
         :rtype: str
         """
 
-        # name of the class and parameters
-        return "%s(%s)" % (self.__name, self.case_params)
+        # iterative, so that deep trees do not hit the recursion limit
+        return representation.case_repr(self)
 
 
 class AbstractCaseClass(CaseClass, _CaseClass):
@@ -261,6 +703,72 @@ class InheritableCaseClass(CaseClass, _CaseClass):
     pass
 
 
+class OrderedCaseClass(CaseClass, _CaseClass):
+    """ Represents a CaseClass whose instances can be ordered. Instances of
+    the same class are ordered by their parameters.
+
+    The ordering methods are shared by all classes rather than generated
+    per class. They read the parameters through the getter compiled once
+    per init Signature (see Signature.get_values), which is all a generated
+    method would do, and compare them with CaseClassMeta.compare. """
+
+    def __lt__(self, other):
+        """ Checks if this CaseClass is smaller than another one.
+
+        :param other: CaseClass to compare with.
+        :type other: OrderedCaseClass
+
+        :rtype: bool
+        """
+
+        if type(self) is not type(other):
+            return NotImplemented
+
+        return CaseClassMeta.compare(self, other) < 0
+
+    def __le__(self, other):
+        """ Checks if this CaseClass is smaller than or equal to another one.
+
+        :param other: CaseClass to compare with.
+        :type other: OrderedCaseClass
+
+        :rtype: bool
+        """
+
+        if type(self) is not type(other):
+            return NotImplemented
+
+        return CaseClassMeta.compare(self, other) <= 0
+
+    def __gt__(self, other):
+        """ Checks if this CaseClass is bigger than another one.
+
+        :param other: CaseClass to compare with.
+        :type other: OrderedCaseClass
+
+        :rtype: bool
+        """
+
+        if type(self) is not type(other):
+            return NotImplemented
+
+        return CaseClassMeta.compare(self, other) > 0
+
+    def __ge__(self, other):
+        """ Checks if this CaseClass is bigger than or equal to another one.
+
+        :param other: CaseClass to compare with.
+        :type other: OrderedCaseClass
+
+        :rtype: bool
+        """
+
+        if type(self) is not type(other):
+            return NotImplemented
+
+        return CaseClassMeta.compare(self, other) >= 0
+
+
 class CaseParameters(CaseClass, dict):
     """ Represents arguments given to a CaseClass. """
 
@@ -312,4 +820,5 @@ class CaseParameters(CaseClass, dict):
         return str(self.__sig)
 
 
-__all__ = ["AbstractCaseClass", "CaseClass", "InheritableCaseClass"]
+__all__ = ["AbstractCaseClass", "CaseClass", "InheritableCaseClass",
+           "OrderedCaseClass"]
@@ -46,8 +46,34 @@ def get_method(name, attrs, bases, exclude=None):
     return None
 
 
+# cache of init signatures by class
+_init_signatures = {}
+
+
 def get_init_signature(cls):
-    """ Gets the signature of an init function of a class.
+    """ Gets the signature of an init function of a class. The signature is
+    computed once per class and cached afterwards.
+
+    :param cls: Class to get init signature of.
+    :type cls: type
+
+    :rtype: signature.Signature
+    """
+
+    try:
+        return _init_signatures[cls]
+    except KeyError:
+        pass
+
+    sig = _get_init_signature(cls)
+    _init_signatures[cls] = sig
+
+    return sig
+
+
+def _get_init_signature(cls):
+    """ Computes the signature of an init function of a class. Used by
+    get_init_signature.
 
     :param cls: Class to get init signature of.
     :type cls: type
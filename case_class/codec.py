@@ -0,0 +1,574 @@
+"""
+Compact binary serialisation for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import importlib
+import numbers
+import struct
+
+from . import case_class, clsutils, exceptions, persistent, utils
+
+#: Bytes every encoded document starts with.
+MAGIC = b'CCB\x01'
+
+# tags of encoded values
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_TEXT = 5
+_BYTES = 6
+_TUPLE = 7
+_LIST = 8
+_DICT = 9
+_NODE = 10
+_BACKREF = 11
+_PVECTOR = 12
+_PMAP = 13
+
+_DOUBLE = struct.Struct('>d')
+
+
+def dumps(obj):
+    """ Encodes an object, which typically is a tree of CaseClass instances,
+    as bytes.
+
+    Every class is written once, together with the names of the parameters
+    of its init signature. Every distinct (interned) instance is written
+    once, later occurrences refer back to it. Integers and lengths are
+    written as variable length integers.
+
+    :raises: exceptions.CodecException
+
+    :param obj: Object to encode.
+    :type obj: object
+
+    :rtype: bytes
+    """
+
+    out = bytearray(MAGIC)
+    _Encoder(out).encode(obj)
+    return bytes(out)
+
+
+def loads(data):
+    """ Decodes an object encoded by dumps. Decoded CaseClass instances are
+    interned bottom-up, so they are identical to existing equal instances.
+
+    :raises: exceptions.CodecException
+
+    :param data: Data to decode.
+    :type data: bytes
+
+    :rtype: object
+    """
+
+    data = bytearray(data)
+
+    if data[:len(MAGIC)] != bytearray(MAGIC):
+        raise exceptions.CodecException("Not an encoded case class document")
+
+    reader = _Reader(data, len(MAGIC))
+    obj = _Decoder(reader).decode()
+
+    if reader.position != len(data):
+        raise exceptions.CodecException("Unexpected data after document")
+
+    return obj
+
+
+def dump(obj, fileobj):
+    """ Encodes an object and writes it to a binary file object. See dumps.
+
+    :param obj: Object to encode.
+    :type obj: object
+
+    :param fileobj: File object to write to.
+    :type fileobj: file
+    """
+
+    fileobj.write(dumps(obj))
+
+
+def load(fileobj):
+    """ Decodes an object from a binary file object. See loads.
+
+    :param fileobj: File object to read from.
+    :type fileobj: file
+
+    :rtype: object
+    """
+
+    return loads(fileobj.read())
+
+
+def find_class(module, qualname):
+    """ Finds a CaseClass by the name of its module and its qualified name,
+    importing the module if needed.
+
+    :raises: exceptions.CodecException
+
+    :param module: Name of the module the class was defined in.
+    :type module: str
+
+    :param qualname: Qualified name of the class.
+    :type qualname: str
+
+    :rtype: type
+    """
+
+    classes = case_class.CaseClassMeta.classes
+
+    if (module, qualname) not in classes:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    if (module, qualname) not in classes:
+        raise exceptions.CodecException("Unknown case class %s.%s" % (
+            module, qualname))
+
+    return classes[(module, qualname)]
+
+
+#
+# Internal helpers
+#
+
+def _parameter_names(cls):
+    """ Returns the names of the parameters of the init signature of a class.
+
+    :param cls: Class to get names for.
+    :type cls: type
+
+    :rtype: list
+    """
+
+    return [n for (n, t, d) in clsutils.get_init_signature(cls)]
+
+
+def _write_varint(out, n):
+    """ Writes a non-negative integer in 7-bit groups, least significant
+    first, with the highest bit set in all but the last byte.
+
+    :param out: Buffer to write to.
+    :type out: bytearray
+
+    :param n: Integer to write.
+    :type n: int
+    """
+
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+
+    out.append(n)
+
+
+def _write_text(out, s):
+    """ Writes a string as utf-8, prefixed with its length.
+
+    :param out: Buffer to write to.
+    :type out: bytearray
+
+    :param s: String to write.
+    :type s: str
+    """
+
+    data = s.encode('utf-8')
+    _write_varint(out, len(data))
+    out.extend(data)
+
+
+class _Encoder(object):
+    """ Encodes objects into a buffer. """
+
+    def __init__(self, out):
+        """ Creates a new _Encoder() instance.
+
+        :param out: Buffer to write to.
+        :type out: bytearray
+        """
+
+        self.__out = out
+
+        # indices of classes and instances that were written
+        self.__classes = {}
+        self.__nodes = {}
+
+    def encode(self, obj):
+        """ Encodes an object.
+
+        :param obj: Object to encode.
+        :type obj: object
+        """
+
+        out = self.__out
+        nodes = self.__nodes
+
+        # stack of (done, value) pairs. If done is True, value is an instance
+        # whose parameters were all written.
+        stack = [(False, obj)]
+
+        while stack:
+            (done, value) = stack.pop()
+
+            if done:
+                nodes[id(value)] = len(nodes)
+
+            elif isinstance(value, case_class.CaseClass):
+                if id(value) in nodes:
+                    out.append(_BACKREF)
+                    _write_varint(out, nodes[id(value)])
+                    continue
+
+                out.append(_NODE)
+                self.__write_class(value.__class__)
+
+                stack.append((True, value))
+                stack.extend((False, v) for v in
+                             reversed(value.case_signature.values()))
+
+            elif type(value) is tuple or type(value) is list:
+                out.append(_TUPLE if type(value) is tuple else _LIST)
+                _write_varint(out, len(value))
+                stack.extend((False, v) for v in reversed(value))
+
+            elif type(value) is dict:
+                out.append(_DICT)
+                _write_varint(out, len(value))
+                for k in reversed(list(value)):
+                    stack.append((False, value[k]))
+                    stack.append((False, k))
+
+            elif type(value) is persistent.PVector:
+                out.append(_PVECTOR)
+                _write_varint(out, len(value))
+                stack.extend((False, v) for v in reversed(list(value)))
+
+            elif type(value) is persistent.PMap:
+                out.append(_PMAP)
+                _write_varint(out, len(value))
+                for (k, v) in reversed(list(value.items())):
+                    stack.append((False, v))
+                    stack.append((False, k))
+
+            else:
+                self.__write_primitive(value)
+
+    def __write_class(self, cls):
+        """ Writes a reference to a class, followed by its name and its
+        parameter names when it is written for the first time.
+
+        :param cls: Class to write.
+        :type cls: type
+        """
+
+        out = self.__out
+
+        if cls in self.__classes:
+            _write_varint(out, self.__classes[cls])
+            return
+
+        self.__classes[cls] = len(self.__classes)
+        _write_varint(out, self.__classes[cls])
+
+        _write_text(out, cls.__module__)
+        _write_text(out, getattr(cls, '__qualname__', cls.__name__))
+
+        names = _parameter_names(cls)
+        _write_varint(out, len(names))
+        for name in names:
+            _write_text(out, name)
+
+    def __write_primitive(self, value):
+        """ Writes a value that does not contain other values.
+
+        :raises: exceptions.CodecException
+
+        :param value: Value to write.
+        :type value: object
+        """
+
+        out = self.__out
+
+        if value is None:
+            out.append(_NONE)
+
+        elif value is True or value is False:
+            out.append(_TRUE if value else _FALSE)
+
+        elif isinstance(value, numbers.Integral):
+            out.append(_INT)
+            value = int(value)
+
+            # zig-zag encoding, so that small negative numbers stay small
+            _write_varint(out, 2 * value if value >= 0 else -2 * value - 1)
+
+        elif type(value) is float:
+            out.append(_FLOAT)
+            out.extend(_DOUBLE.pack(value))
+
+        elif utils.is_string(value) and not isinstance(value, bytes):
+            out.append(_TEXT)
+            _write_text(out, value)
+
+        elif isinstance(value, bytes):
+            out.append(_BYTES)
+            _write_varint(out, len(value))
+            out.extend(value)
+
+        else:
+            raise exceptions.CodecException(
+                "Can not encode values of type %s" % (type(value).__name__,))
+
+
+class _Reader(object):
+    """ Reads primitives from a buffer. """
+
+    def __init__(self, data, position):
+        """ Creates a new _Reader() instance.
+
+        :param data: Data to read from.
+        :type data: bytearray
+
+        :param position: Position to start reading at.
+        :type position: int
+        """
+
+        self.data = data
+        self.position = position
+
+    def byte(self):
+        """ Reads a single byte.
+
+        :rtype: int
+        """
+
+        if self.position >= len(self.data):
+            raise exceptions.CodecException("Unexpected end of data")
+
+        self.position += 1
+        return self.data[self.position - 1]
+
+    def varint(self):
+        """ Reads a non-negative integer written by _write_varint.
+
+        :rtype: int
+        """
+
+        n = 0
+        shift = 0
+
+        while True:
+            b = self.byte()
+            n |= (b & 0x7f) << shift
+            shift += 7
+
+            if not b & 0x80:
+                return n
+
+    def raw(self, length):
+        """ Reads a number of bytes.
+
+        :param length: Number of bytes to read.
+        :type length: int
+
+        :rtype: bytes
+        """
+
+        end = self.position + length
+        if end > len(self.data):
+            raise exceptions.CodecException("Unexpected end of data")
+
+        chunk = bytes(self.data[self.position:end])
+        self.position = end
+        return chunk
+
+    def text(self):
+        """ Reads a string written by _write_text.
+
+        :rtype: str
+        """
+
+        return self.raw(self.varint()).decode('utf-8')
+
+
+class _Decoder(object):
+    """ Decodes objects from a _Reader. """
+
+    def __init__(self, reader):
+        """ Creates a new _Decoder() instance.
+
+        :param reader: Reader to read from.
+        :type reader: _Reader
+        """
+
+        self.__reader = reader
+
+        # classes as pairs (class, number of parameters) and instances, by
+        # index
+        self.__classes = []
+        self.__nodes = []
+
+    def decode(self):
+        """ Decodes an object.
+
+        :raises: exceptions.CodecException
+
+        :rtype: object
+        """
+
+        reader = self.__reader
+
+        # stack of containers that are being read, as lists
+        # [tag, number of missing items, items, class]
+        stack = []
+
+        while True:
+            tag = reader.byte()
+            frame = None
+
+            if tag == _NODE:
+                (cls, count) = self.__read_class()
+                frame = [tag, count, [], cls]
+
+            elif tag == _TUPLE or tag == _LIST or tag == _PVECTOR:
+                frame = [tag, reader.varint(), [], None]
+
+            elif tag == _DICT or tag == _PMAP:
+                frame = [tag, 2 * reader.varint(), [], None]
+
+            else:
+                value = self.__read_primitive(tag)
+
+            # containers without items are done immediately
+            if frame is not None:
+                if frame[1]:
+                    stack.append(frame)
+                    continue
+                value = self.__build(frame)
+
+            # add the value to its container, and build all the containers
+            # that are complete
+            while True:
+                if not stack:
+                    return value
+
+                frame = stack[-1]
+                frame[2].append(value)
+                frame[1] -= 1
+
+                if frame[1]:
+                    break
+
+                stack.pop()
+                value = self.__build(frame)
+
+    def __read_class(self):
+        """ Reads a reference to a class written by _Encoder.__write_class.
+
+        :raises: exceptions.CodecException
+
+        :return: a pair (class, number of parameters)
+        :rtype: tuple
+        """
+
+        reader = self.__reader
+        idx = reader.varint()
+
+        if idx < len(self.__classes):
+            return self.__classes[idx]
+
+        if idx != len(self.__classes):
+            raise exceptions.CodecException("Invalid class reference")
+
+        cls = find_class(reader.text(), reader.text())
+        names = [reader.text() for i in range(reader.varint())]
+
+        if names != _parameter_names(cls):
+            raise exceptions.CodecException(
+                "Parameters of %s have changed" % (cls.__name__,))
+
+        self.__classes.append((cls, len(names)))
+        return self.__classes[idx]
+
+    def __read_primitive(self, tag):
+        """ Reads a value that does not contain other values.
+
+        :raises: exceptions.CodecException
+
+        :param tag: Tag of the value.
+        :type tag: int
+
+        :rtype: object
+        """
+
+        reader = self.__reader
+
+        if tag == _NONE:
+            return None
+
+        elif tag == _FALSE:
+            return False
+
+        elif tag == _TRUE:
+            return True
+
+        elif tag == _INT:
+            n = reader.varint()
+            return n // 2 if not n & 1 else -(n + 1) // 2
+
+        elif tag == _FLOAT:
+            return _DOUBLE.unpack(reader.raw(_DOUBLE.size))[0]
+
+        elif tag == _TEXT:
+            return reader.text()
+
+        elif tag == _BYTES:
+            return reader.raw(reader.varint())
+
+        elif tag == _BACKREF:
+            idx = reader.varint()
+            if idx >= len(self.__nodes):
+                raise exceptions.CodecException("Invalid back-reference")
+            return self.__nodes[idx]
+
+        raise exceptions.CodecException("Invalid tag %d" % (tag,))
+
+    def __build(self, frame):
+        """ Builds a container from its items.
+
+        :param frame: Container to build.
+        :type frame: list
+
+        :rtype: object
+        """
+
+        (tag, missing, items, cls) = frame
+
+        if tag == _NODE:
+            node = cls.from_values(items)
+            self.__nodes.append(node)
+            return node
+
+        elif tag == _TUPLE:
+            return tuple(items)
+
+        elif tag == _LIST:
+            return items
+
+        elif tag == _PVECTOR:
+            return persistent.PVector(items)
+
+        elif tag == _PMAP:
+            return persistent.PMap(zip(items[::2], items[1::2]))
+
+        return dict(zip(items[::2], items[1::2]))
+
+
+__all__ = ["MAGIC", "dumps", "loads", "dump", "load", "find_class"]
@@ -0,0 +1,543 @@
+"""
+Column-wise collections and CSV ingestion for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import csv
+import io
+
+from . import clsutils, exceptions, signature, utils
+
+#: Default number of rows that are parsed and converted at once.
+CHUNK_SIZE = 10000
+
+# strings accepted for parameters annotated with bool
+_BOOLEANS = {'true': True, 't': True, 'yes': True, 'y': True, '1': True,
+             'false': False, 'f': False, 'no': False, 'n': False, '0': False}
+
+
+class CaseClassArray(object):
+    """ A collection of instances of a flat CaseClass stored column-wise,
+    with one list of values per parameter of the init signature. Instances
+    are only created (and interned) when they are accessed. """
+
+    def __init__(self, cls, columns):
+        """ Creates a new CaseClassArray() instance.
+
+        :raises: exceptions.CodecException
+        :raises: exceptions.NoSuchArgument
+
+        :param cls: Class of the instances.
+        :type cls: type
+
+        :param columns: Dictionary mapping the names of all parameters to
+        lists of values of the same length.
+        :type columns: dict
+        """
+
+        names = record_parameters(cls)
+
+        for name in columns:
+            if name not in names:
+                raise exceptions.NoSuchArgument(name)
+
+        for name in names:
+            if name not in columns:
+                raise exceptions.CodecException(
+                    "Missing column %r of %s" % (name, cls.__name__))
+
+        lengths = set(len(columns[n]) for n in names)
+        if len(lengths) > 1:
+            raise exceptions.CodecException("Columns differ in length")
+
+        self.__cls = cls
+        self.__names = names
+        self.__columns = [list(columns[n]) for n in names]
+        self.__length = lengths.pop() if lengths else 0
+
+    @staticmethod
+    def from_instances(cls, instances):
+        """ Creates a CaseClassArray from instances of a flat CaseClass.
+
+        :raises: exceptions.CodecException
+
+        :param cls: Class of the instances.
+        :type cls: type
+
+        :param instances: Instances to store.
+        :type instances: iterable
+
+        :rtype: CaseClassArray
+        """
+
+        names = record_parameters(cls)
+        rows = []
+
+        for inst in instances:
+            if inst.__class__ is not cls:
+                raise exceptions.CodecException(
+                    "Expected an instance of %s, got %r" % (cls.__name__,
+                                                            inst))
+            rows.append(inst.case_signature.values())
+
+        columns = [list(c) for c in zip(*rows)] if rows else [[] for n in
+                                                               names]
+
+        return CaseClassArray(cls, dict(zip(names, columns)))
+
+    @property
+    def cls(self):
+        """ The class of the instances in this array.
+
+        :rtype: type
+        """
+
+        return self.__cls
+
+    @property
+    def names(self):
+        """ The names of the columns, in the order of the init signature.
+
+        :rtype: list
+        """
+
+        return list(self.__names)
+
+    def column(self, name):
+        """ Returns the values of a parameter. The list is not copied and
+        should not be modified.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param name: Name of the parameter.
+        :type name: str
+
+        :rtype: list
+        """
+
+        if name not in self.__names:
+            raise exceptions.NoSuchArgument(name)
+
+        return self.__columns[self.__names.index(name)]
+
+    def rows(self):
+        """ Generates the values of all parameters of every row, without
+        creating instances.
+
+        :rtype: generator
+        """
+
+        return zip(*self.__columns) if self.__columns else \
+            iter([()] * self.__length)
+
+    def take(self, indices):
+        """ Returns a new CaseClassArray containing the given rows.
+
+        :param indices: Indices of the rows to take, in order.
+        :type indices: iterable
+
+        :rtype: CaseClassArray
+        """
+
+        indices = list(indices)
+
+        return CaseClassArray(self.__cls, dict(
+            (n, [c[i] for i in indices])
+            for (n, c) in zip(self.__names, self.__columns)))
+
+    def __len__(self):
+        """ Returns the number of rows.
+
+        :rtype: int
+        """
+
+        return self.__length
+
+    def __iter__(self):
+        """ Generates the instances in this array, in order.
+
+        :rtype: generator
+        """
+
+        from_values = self.__cls.from_values
+
+        for values in self.rows():
+            yield from_values(values)
+
+    def __getitem__(self, index):
+        """ Returns the instance in a row, or a new CaseClassArray for a
+        slice.
+
+        :param index: Index of the row or slice.
+        :type index: int
+
+        :rtype: CaseClass
+        """
+
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(self.__length)))
+
+        return self.__cls.from_values([c[index] for c in self.__columns])
+
+    def __repr__(self):
+        return 'CaseClassArray(%s, %d rows)' % (self.__cls.__name__,
+                                                self.__length)
+
+
+class RowError(object):
+    """ An error that occurred while reading a row of a CSV file.
+
+    Attributes:
+
+    line -- the line number the row ended at
+    row -- the list of fields of the row
+    error -- the exception that occurred
+    """
+
+    def __init__(self, line, row, error):
+        """ Creates a new RowError() instance.
+
+        :param line: Line number the row ended at.
+        :type line: int
+
+        :param row: Fields of the row.
+        :type row: list
+
+        :param error: Exception that occurred.
+        :type error: Exception
+        """
+
+        self.line = line
+        self.row = row
+        self.error = error
+
+    def __repr__(self):
+        return 'RowError(line=%d, error=%r)' % (self.line, self.error)
+
+
+def record_parameters(cls):
+    """ Returns the names of the parameters of a flat CaseClass, i.e. one
+    without variable arguments.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class to get parameters of.
+    :type cls: type
+
+    :rtype: list
+    """
+
+    names = []
+
+    for (name, tp, default) in clsutils.get_init_signature(cls):
+        if tp == signature.Signature.VARARG or \
+                tp == signature.Signature.KEYWORD_VARARG:
+            raise exceptions.CodecException(
+                "%s has variable arguments and is not a flat record" % (
+                    cls.__name__,))
+        names.append(name)
+
+    return names
+
+
+def read_csv(cls, path, chunk_size=CHUNK_SIZE, arrays=False, errors=None,
+             encoding='utf-8', **fmtparams):
+    """ Reads instances of a flat CaseClass from a CSV file, whose header
+    row names the parameters of the init signature. Columns that are not
+    parameters are ignored, missing columns and empty fields take the
+    default value of the parameter.
+
+    Fields are converted according to the annotations of the parameters
+    (bool, int, float, str or bytes), other parameters are passed as
+    strings. Rows are read in chunks, and each chunk is converted one
+    column at a time.
+
+    Rows that can not be converted, and rows whose constructor fails, are
+    skipped. They are reported as RowError instances appended to errors,
+    so a single bad row does not abort the whole file. With arrays set, no
+    instances are created while reading, so only conversion errors are
+    reported. A failing constructor raises when the instance of its row
+    is accessed in the CaseClassArray.
+
+    Also available as a method of every CaseClass.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class to read instances of.
+    :type cls: type
+
+    :param path: Path or text file object to read from.
+    :type path: str
+
+    :param chunk_size: Optional. Number of rows converted at once.
+    :type chunk_size: int
+
+    :param arrays: Optional. If set to True, generates a CaseClassArray for
+    every chunk instead of single instances. Instances are only created
+    when they are accessed.
+    :type arrays: bool
+
+    :param errors: Optional. List to append RowError instances to.
+    :type errors: list
+
+    :param encoding: Optional. Encoding of the file if a path is given.
+    :type encoding: str
+
+    :param fmtparams: Formatting parameters passed to csv.reader.
+    :type fmtparams: dict
+
+    :rtype: generator
+    """
+
+    if errors is None:
+        errors = []
+
+    if not utils.is_string(path):
+        return _read_chunks(cls, path, chunk_size, arrays, errors, fmtparams)
+
+    return _read_file(cls, path, chunk_size, arrays, errors, encoding,
+                      fmtparams)
+
+
+#
+# Internal helpers
+#
+
+def _read_file(cls, path, chunk_size, arrays, errors, encoding, fmtparams):
+    """ Opens a file and reads it with _read_chunks, see read_csv.
+
+    :rtype: generator
+    """
+
+    with io.open(path, 'r', encoding=encoding, newline='') as fileobj:
+        for item in _read_chunks(cls, fileobj, chunk_size, arrays, errors,
+                                 fmtparams):
+            yield item
+
+
+def _read_chunks(cls, fileobj, chunk_size, arrays, errors, fmtparams):
+    """ Reads a CSV file object in chunks, see read_csv.
+
+    :rtype: generator
+    """
+
+    reader = csv.reader(fileobj, **fmtparams)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    columns = _compile_columns(cls, header)
+    width = len(header)
+
+    rows = []
+    lines = []
+
+    # rows with the wrong number of fields in the current chunk
+    invalid = []
+
+    for row in reader:
+        if len(row) != width:
+            if row:
+                invalid.append(RowError(reader.line_num, row,
+                                       exceptions.CodecException(
+                                           "Expected %d fields, got %d" % (
+                                               width, len(row)))))
+            continue
+
+        rows.append(row)
+        lines.append(reader.line_num)
+
+        if len(rows) >= chunk_size:
+            for item in _convert_chunk(cls, columns, rows, lines, invalid,
+                                       arrays, errors):
+                yield item
+            rows = []
+            lines = []
+            invalid = []
+
+    if rows or invalid:
+        for item in _convert_chunk(cls, columns, rows, lines, invalid, arrays,
+                                   errors):
+            yield item
+
+
+def _compile_columns(cls, header):
+    """ Builds a list of (name, field index, converter, default) for every
+    parameter of a class. The field index is None for parameters without a
+    column.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class to read.
+    :type cls: type
+
+    :param header: Header row of the file.
+    :type header: list
+
+    :rtype: list
+    """
+
+    sig = clsutils.get_init_signature(cls)
+    annots = sig.annots()
+
+    record_parameters(cls)
+    columns = []
+
+    for (name, tp, default) in sig:
+        has_default = tp == signature.Signature.ARGUMENT_WITH_DEFAULT or \
+            tp == signature.Signature.KEYWORD_ONLY
+
+        if name not in header:
+            if not has_default:
+                raise exceptions.CodecException(
+                    "Missing column %r of %s" % (name, cls.__name__))
+            columns.append((name, None, None, default))
+            continue
+
+        convert = _converter(annots.get(name))
+        if has_default:
+            convert = _with_default(convert, default)
+
+        columns.append((name, header.index(name), convert, default))
+
+    return columns
+
+
+def _converter(annotation):
+    """ Returns the function converting fields for a parameter annotation,
+    or None if fields are used as they are.
+
+    :param annotation: Annotation of the parameter.
+    :type annotation: object
+
+    :rtype: callable
+    """
+
+    if annotation is bool or annotation == 'bool':
+        return lambda s: _BOOLEANS[s.strip().lower()]
+
+    elif annotation is int or annotation == 'int':
+        return int
+
+    elif annotation is float or annotation == 'float':
+        return float
+
+    elif (annotation is bytes and bytes is not str) or annotation == 'bytes':
+        return lambda s: s.encode('utf-8')
+
+    return None
+
+
+def _with_default(convert, default):
+    """ Wraps a converter so that empty fields take a default value.
+
+    :param convert: Converter to wrap or None.
+    :type convert: callable
+
+    :param default: Default value.
+    :type default: object
+
+    :rtype: callable
+    """
+
+    if convert is None:
+        return lambda s: default if s == '' else s
+
+    return lambda s: default if s == '' else convert(s)
+
+
+def _convert_chunk(cls, columns, rows, lines, invalid, arrays, errors):
+    """ Converts a chunk of rows column by column, and generates either a
+    CaseClassArray or the instances of the rows that could be converted.
+
+    :rtype: generator
+    """
+
+    if not rows:
+        errors.extend(invalid)
+        return
+
+    fields = list(zip(*rows))
+    values = []
+
+    # indices of rows that failed
+    bad = {}
+
+    for (name, idx, convert, default) in columns:
+        if idx is None:
+            values.append([default] * len(rows))
+        elif convert is None:
+            values.append(fields[idx])
+        else:
+            values.append(_convert_column(convert, fields[idx], name, bad))
+
+    keep = [i for i in range(len(rows)) if i not in bad]
+
+    invalid.extend(RowError(lines[i], rows[i], bad[i]) for i in bad)
+    errors.extend(sorted(invalid, key=lambda e: e.line))
+
+    if len(keep) < len(rows):
+        values = [[c[i] for i in keep] for c in values]
+        lines = [lines[i] for i in keep]
+        rows = [rows[i] for i in keep]
+
+    if arrays:
+        if keep:
+            yield CaseClassArray(cls, dict(
+                (name, column) for ((name, i, c, d), column) in
+                zip(columns, values)))
+        return
+
+    from_values = cls.from_values
+
+    for (i, args) in enumerate(zip(*values)):
+        try:
+            inst = from_values(args)
+        except Exception as e:
+            errors.append(RowError(lines[i], rows[i], e))
+            continue
+
+        yield inst
+
+
+def _convert_column(convert, fields, name, bad):
+    """ Converts the fields of a column. Fields that can not be converted
+    mark their rows as bad.
+
+    :param convert: Converter to apply.
+    :type convert: callable
+
+    :param fields: Fields to convert.
+    :type fields: list
+
+    :param name: Name of the parameter.
+    :type name: str
+
+    :param bad: Dictionary mapping indices of bad rows to exceptions.
+    :type bad: dict
+
+    :rtype: list
+    """
+
+    # the fast path converts the entire column at once
+    try:
+        return list(map(convert, fields))
+    except (ValueError, KeyError, TypeError, UnicodeError):
+        pass
+
+    converted = []
+
+    for (i, field) in enumerate(fields):
+        try:
+            converted.append(convert(field))
+        except (ValueError, KeyError, TypeError, UnicodeError) as e:
+            bad.setdefault(i, exceptions.CodecException(
+                "Invalid value %r for %r: %s" % (field, name, e)))
+            converted.append(None)
+
+    return converted
+
+
+__all__ = ["CHUNK_SIZE", "CaseClassArray", "RowError", "record_parameters",
+           "read_csv"]
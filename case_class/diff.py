@@ -0,0 +1,281 @@
+"""
+Differences between trees for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import difflib
+
+from . import case_class, zipper
+
+
+class Edit(case_class.AbstractCaseClass):
+    """ A single edit of a tree. Each edit has a path, which is a tuple of
+    steps leading from the root of the tree to the value that is edited.
+    Steps into a CaseClass instance are parameter names, steps into a tuple
+    or list are indices and steps into a dictionary are keys. """
+
+    @property
+    def path(self):
+        """ The path to the edited value.
+
+        :rtype: tuple
+        """
+
+        return self.__path
+
+    def _set_path(self, path):
+        """ Sets the path of this edit. Called from the constructors of
+        subclasses.
+
+        :param path: Path to the edited value.
+        :type path: tuple
+        """
+
+        self.__path = tuple(path)
+
+
+class Replace(Edit):
+    """ Replaces the value at a path. """
+
+    def __init__(self, path, value):
+        """ Creates a new Replace() instance.
+
+        :param path: Path to the value to replace.
+        :type path: tuple
+
+        :param value: New value.
+        :type value: object
+        """
+
+        self._set_path(path)
+        self.__value = value
+
+    @property
+    def value(self):
+        """ The new value.
+
+        :rtype: object
+        """
+
+        return self.__value
+
+
+class Insert(Edit):
+    """ Inserts a value into the tuple or list at a path. """
+
+    def __init__(self, path, index, value):
+        """ Creates a new Insert() instance.
+
+        :param path: Path to the tuple or list to insert into.
+        :type path: tuple
+
+        :param index: Index to insert value at.
+        :type index: int
+
+        :param value: Value to insert.
+        :type value: object
+        """
+
+        self._set_path(path)
+        self.__index = index
+        self.__value = value
+
+    @property
+    def index(self):
+        """ The index the value is inserted at.
+
+        :rtype: int
+        """
+
+        return self.__index
+
+    @property
+    def value(self):
+        """ The inserted value.
+
+        :rtype: object
+        """
+
+        return self.__value
+
+
+class Delete(Edit):
+    """ Deletes a value from the tuple or list at a path. """
+
+    def __init__(self, path, index):
+        """ Creates a new Delete() instance.
+
+        :param path: Path to the tuple or list to delete from.
+        :type path: tuple
+
+        :param index: Index of the value to delete.
+        :type index: int
+        """
+
+        self._set_path(path)
+        self.__index = index
+
+    @property
+    def index(self):
+        """ The index of the deleted value.
+
+        :rtype: int
+        """
+
+        return self.__index
+
+
+def diff(old, new):
+    """ Computes a list of edits that turns one tree into another.
+
+    Subtrees that are the same (interned) object in both trees are skipped
+    without looking at them, so the cost depends on the size of the change
+    rather than the size of the trees. Edits within a tuple or list are
+    given with indices that are valid when applying the edits in order.
+
+    :param old: Old tree.
+    :type old: object
+
+    :param new: New tree.
+    :type new: object
+
+    :rtype: list
+    """
+
+    edits = []
+
+    # pairs of values still to compare, the next one is at the end
+    stack = [((), old, new)]
+
+    while stack:
+        (path, a, b) = stack.pop()
+
+        if a is b:
+            continue
+
+        if isinstance(a, case_class.CaseClass) or \
+                isinstance(b, case_class.CaseClass):
+            if type(a) is not type(b):
+                edits.append(Replace(path, b))
+                continue
+
+            items = zip(a.case_signature, b.case_signature.values())
+            for ((n, t, va), vb) in reversed(list(items)):
+                stack.append((path + (n,), va, vb))
+
+        elif (type(a) is tuple or type(a) is list) and type(a) is type(b):
+            pairs = _diff_sequence(path, a, b, edits)
+            for (i, va, vb) in reversed(pairs):
+                stack.append((path + (i,), va, vb))
+
+        elif type(a) is dict and type(b) is dict and set(a) == set(b):
+            for k in a:
+                stack.append((path + (k,), a[k], b[k]))
+
+        elif type(a) is not type(b) or a != b:
+            edits.append(Replace(path, b))
+
+    return edits
+
+
+def apply_patch(root, edits):
+    """ Applies a list of edits to a tree using a Zipper. Only the instances
+    on the paths to edited values are rebuilt, every instance is rebuilt at
+    most once and all other subtrees are shared with the original tree.
+
+    :param root: Tree to apply edits to.
+    :type root: object
+
+    :param edits: List of Edit instances, as returned by diff.
+    :type edits: list
+
+    :rtype: object
+    """
+
+    z = zipper.Zipper(root)
+
+    for edit in edits:
+        z.goto(edit.path)
+
+        if isinstance(edit, Replace):
+            z.replace(edit.value)
+        elif isinstance(edit, Insert):
+            z.insert(edit.index, edit.value)
+        else:
+            z.delete(edit.index)
+
+    return z.root()
+
+
+#
+# Internal helpers
+#
+
+def _key(value):
+    """ Returns a hashable key for a value within a sequence, used to find
+    the values that are equal in two sequences.
+
+    :param value: Value to get key for.
+    :type value: object
+
+    :rtype: object
+    """
+
+    if isinstance(value, case_class.CaseClass):
+        return (0, id(value))
+
+    try:
+        hash(value)
+        return (1, type(value), value)
+    except TypeError:
+        return (2, id(value))
+
+
+def _diff_sequence(path, a, b, edits):
+    """ Adds the edits to insert and delete elements of a sequence to a list
+    of edits. Elements that are replaced by the same number of elements are
+    not edited but returned, so that they can be compared recursively.
+
+    :param path: Path to the sequence.
+    :type path: tuple
+
+    :param a: Old sequence.
+    :type a: list
+
+    :param b: New sequence.
+    :type b: list
+
+    :param edits: List to add edits to.
+    :type edits: list
+
+    :return: a list of (index, old, new) triples where index is the index
+    of the element in the new sequence
+    :rtype: list
+    """
+
+    matcher = difflib.SequenceMatcher(None, [_key(v) for v in a],
+                                      [_key(v) for v in b], autojunk=False)
+
+    pairs = []
+
+    # go backwards so that earlier indices are still valid
+    for (tag, i1, i2, j1, j2) in reversed(matcher.get_opcodes()):
+        if tag == 'equal':
+            continue
+
+        if tag == 'replace' and i2 - i1 == j2 - j1:
+            for k in range(i2 - i1):
+                pairs.append((j1 + k, a[i1 + k], b[j1 + k]))
+            continue
+
+        for i in range(i2 - 1, i1 - 1, -1):
+            edits.append(Delete(path, i))
+        for j in range(j1, j2):
+            edits.append(Insert(path, i1 + j - j1, b[j]))
+
+    pairs.sort(key=lambda p: p[0])
+    return pairs
+
+
+__all__ = ["Edit", "Replace", "Insert", "Delete", "diff", "apply_patch"]
@@ -0,0 +1,257 @@
+"""
+Stable content digests for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import hashlib
+import numbers
+import struct
+
+from . import case_class, persistent, traversal, utils
+
+#: Name of the hash algorithm used for digests.
+ALGORITHM = 'sha256'
+
+# name digests are stored under in the dictionary of instances
+_DIGEST_KEY = '__case_digest__'
+
+# encoders registered with register_encoder, by type
+_encoders = {}
+
+
+def digest(obj, encoders=None):
+    """ Computes a stable content digest of an object, which typically is a
+    CaseClass instance. In contrast to hash(), the digest is the same in
+    every process and can be used to identify trees across processes and
+    on disk.
+
+    The digest of a CaseClass instance is computed from the qualified name
+    of its class and the values bound to its init signature. Digests of
+    instances are cached on the instances, so a tree costs one hash per
+    distinct instance and an edited tree only hashes its new instances.
+
+    :param obj: Object to compute digest of.
+    :type obj: object
+
+    :param encoders: Optional. Dictionary mapping types to encoders that are
+    used in addition to the registered encoders, see register_encoder.
+    Digests computed with custom encoders are not cached.
+    :type encoders: dict
+
+    :return: the hexadecimal digest
+    :rtype: str
+    """
+
+    return _Digester(encoders).digest(obj)
+
+
+def register_encoder(cls, encoder):
+    """ Registers a function to encode values of a type that digest does not
+    know. Values of subclasses use the encoder as well, unless they have one
+    of their own. Encoders have to be registered before computing digests
+    of objects containing such values.
+
+    :param cls: Type to encode values of.
+    :type cls: type
+
+    :param encoder: Function that takes a value and returns a stable bytes
+    encoding of it.
+    :type encoder: callable
+    """
+
+    _encoders[cls] = encoder
+
+
+def qualified_name(cls):
+    """ Returns the qualified name of a class including its module, e.g.
+    'case_class.diff.Replace'.
+
+    :param cls: Class to get name of.
+    :type cls: type
+
+    :rtype: str
+    """
+
+    name = getattr(cls, '__qualname__', cls.__name__)
+    return '%s.%s' % (cls.__module__, name)
+
+
+#
+# Internal helpers
+#
+
+class _Digester(object):
+    """ Computes digests with a given set of encoders. """
+
+    def __init__(self, encoders):
+        """ Creates a new _Digester() instance.
+
+        :param encoders: Dictionary of custom encoders or None.
+        :type encoders: dict
+        """
+
+        self.__encoders = encoders
+
+        # digests by id of the instance, if they can not be cached
+        self.__memo = None if encoders is None else {}
+
+    def digest(self, obj):
+        """ Computes the hexadecimal digest of an object.
+
+        :param obj: Object to compute digest of.
+        :type obj: object
+
+        :rtype: str
+        """
+
+        if isinstance(obj, case_class.CaseClass):
+            raw = self.__get(obj)
+        else:
+            raw = hashlib.new(ALGORITHM, self.__encode(obj)).digest()
+
+        return ''.join('%02x' % b for b in bytearray(raw))
+
+    def __cached(self, node):
+        """ Returns the cached raw digest of an instance or None.
+
+        :param node: Instance to get digest of.
+        :type node: case_class.CaseClass
+
+        :rtype: bytes
+        """
+
+        if self.__memo is None:
+            return node.__dict__.get(_DIGEST_KEY)
+
+        return self.__memo.get(id(node))
+
+    def __get(self, root):
+        """ Returns the raw digest of an instance, computing it and the
+        digests of all of its descendants bottom-up if needed.
+
+        :param root: Instance to get digest of.
+        :type root: case_class.CaseClass
+
+        :rtype: bytes
+        """
+
+        raw = self.__cached(root)
+        if raw is not None:
+            return raw
+
+        prune = lambda n: self.__cached(n) is not None
+
+        for node in traversal.postorder(root, unique=True, prune=prune):
+            if self.__cached(node) is not None:
+                continue
+
+            h = hashlib.new(ALGORITHM)
+            h.update(_frame(b'N', qualified_name(node.__class__)
+                            .encode('utf-8')))
+
+            for value in node.case_signature.values():
+                h.update(self.__encode(value))
+
+            if self.__memo is None:
+                node.__dict__[_DIGEST_KEY] = h.digest()
+            else:
+                self.__memo[id(node)] = h.digest()
+
+        return self.__cached(root)
+
+    def __encode(self, value):
+        """ Encodes a value as bytes.
+
+        :param value: Value to encode.
+        :type value: object
+
+        :rtype: bytes
+        """
+
+        if isinstance(value, case_class.CaseClass):
+            return _frame(b'C', self.__get(value))
+
+        encoder = self.__find_encoder(type(value))
+        if encoder is not None:
+            name = qualified_name(type(value)).encode('utf-8')
+            return _frame(b'X', _frame(b'T', name) + encoder(value))
+
+        if value is None:
+            return _frame(b'0', b'')
+
+        elif isinstance(value, bool):
+            return _frame(b'b', b'1' if value else b'0')
+
+        elif isinstance(value, numbers.Integral):
+            return _frame(b'i', str(int(value)).encode('ascii'))
+
+        elif isinstance(value, float):
+            return _frame(b'f', repr(value).encode('ascii'))
+
+        elif utils.is_string(value) and not isinstance(value, bytes):
+            return _frame(b's', value.encode('utf-8'))
+
+        elif isinstance(value, bytes):
+            return _frame(b'y', value)
+
+        elif type(value) is tuple or type(value) is list:
+            tag = b't' if type(value) is tuple else b'l'
+            return _frame(tag, b''.join(self.__encode(v) for v in value))
+
+        elif type(value) is dict:
+            items = sorted(self.__encode(k) + self.__encode(value[k])
+                           for k in value)
+            return _frame(b'd', b''.join(items))
+
+        elif type(value) is persistent.PVector:
+            return _frame(b'v', b''.join(self.__encode(v) for v in value))
+
+        elif type(value) is persistent.PMap:
+            items = sorted(self.__encode(k) + self.__encode(v)
+                           for (k, v) in value.items())
+            return _frame(b'm', b''.join(items))
+
+        elif type(value) is frozenset or type(value) is set:
+            items = sorted(self.__encode(v) for v in value)
+            return _frame(b'S', b''.join(items))
+
+        raise TypeError("No digest encoder for values of type %r" % (
+            type(value),))
+
+    def __find_encoder(self, cls):
+        """ Finds the encoder for a type, if any.
+
+        :param cls: Type to find encoder for.
+        :type cls: type
+
+        :rtype: callable
+        """
+
+        for base in cls.__mro__:
+            if self.__encoders is not None and base in self.__encoders:
+                return self.__encoders[base]
+
+            if base in _encoders:
+                return _encoders[base]
+
+        return None
+
+
+def _frame(tag, payload):
+    """ Prefixes a payload with a tag and its length, so that encodings of
+    different values never run into each other.
+
+    :param tag: Single byte tag of the payload.
+    :type tag: bytes
+
+    :param payload: Payload to frame.
+    :type payload: bytes
+
+    :rtype: bytes
+    """
+
+    return tag + struct.pack('>Q', len(payload)) + payload
+
+
+__all__ = ["ALGORITHM", "digest", "register_encoder", "qualified_name"]
@@ -0,0 +1,347 @@
+"""
+Disk-backed memoisation for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import functools
+import pickle
+import sqlite3
+import threading
+
+from . import digest
+
+# protocol used to store values, readable by Python 2 and 3
+_PROTOCOL = 2
+
+
+class DiskMemo(object):
+    """ A persistent store for the results of expensive computations, kept
+    in a local SQLite database. Results are keyed by the stable digest of
+    the arguments they were computed from (see digest.digest) and the
+    identity of the function that computed them, so they survive restarts.
+
+    Values are stored with pickle. If the store grows larger than its
+    maximal size, the least recently used values are evicted. """
+
+    def __init__(self, path, max_size=None):
+        """ Creates a new DiskMemo() instance.
+
+        :param path: Path to the database file, created if it does not exist.
+        Use ':memory:' for a store that is not persisted.
+        :type path: str
+
+        :param max_size: Optional. Maximal total size of the stored values in
+        bytes. If exceeded, the least recently used values are evicted.
+        :type max_size: int
+        """
+
+        self.__path = path
+        self.__max_size = max_size
+
+        self.__lock = threading.RLock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+
+        with self.__db:
+            self.__db.execute(
+                'CREATE TABLE IF NOT EXISTS memo ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'size INTEGER NOT NULL, used INTEGER NOT NULL)')
+            self.__db.execute(
+                'CREATE INDEX IF NOT EXISTS memo_used ON memo (used)')
+
+            # running total of the sizes, so that writes do not sum them
+            self.__db.execute(
+                'CREATE TABLE IF NOT EXISTS memo_size ('
+                'total INTEGER NOT NULL)')
+            if self.__db.execute(
+                    'SELECT total FROM memo_size').fetchone() is None:
+                self.__db.execute(
+                    'INSERT INTO memo_size (total) '
+                    'SELECT COALESCE(SUM(size), 0) FROM memo')
+
+    @property
+    def path(self):
+        """ The path to the database file.
+
+        :rtype: str
+        """
+
+        return self.__path
+
+    @property
+    def max_size(self):
+        """ The maximal total size of the stored values in bytes or None.
+
+        :rtype: int
+        """
+
+        return self.__max_size
+
+    @property
+    def size(self):
+        """ The total size of the stored values in bytes.
+
+        :rtype: int
+        """
+
+        with self.__lock:
+            return self.__total()
+
+    def __len__(self):
+        """ Returns the number of stored values.
+
+        :rtype: int
+        """
+
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+
+    def __contains__(self, key):
+        """ Checks if a value is stored for a key.
+
+        :param key: Key to check.
+        :type key: str
+
+        :rtype: bool
+        """
+
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT 1 FROM memo WHERE key = ?', (key,)).fetchone()
+
+        return row is not None
+
+    def get(self, key, default=None):
+        """ Gets the value stored for a key and marks it as recently used.
+
+        :param key: Key to get value for.
+        :type key: str
+
+        :param default: Optional. Value to return if no value is stored.
+        :type default: object
+
+        :rtype: object
+        """
+
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT value FROM memo WHERE key = ?', (key,)).fetchone()
+
+            if row is None:
+                return default
+
+            with self.__db:
+                self.__db.execute('UPDATE memo SET used = ? WHERE key = ?',
+                                  (self.__next_use(), key))
+
+        return pickle.loads(bytes(row[0]))
+
+    def set(self, key, value):
+        """ Stores a value for a key, evicting the least recently used values
+        if the store gets too large.
+
+        :param key: Key to store value for.
+        :type key: str
+
+        :param value: Value to store.
+        :type value: object
+        """
+
+        data = pickle.dumps(value, _PROTOCOL)
+
+        with self.__lock:
+            with self.__db:
+                old = self.__size_of(key)
+                self.__db.execute(
+                    'INSERT OR REPLACE INTO memo (key, value, size, used) '
+                    'VALUES (?, ?, ?, ?)',
+                    (key, sqlite3.Binary(data), len(data), self.__next_use()))
+                self.__add_size(len(data) - old)
+                self.__evict()
+
+    def delete(self, key):
+        """ Removes the value stored for a key, if any.
+
+        :param key: Key to remove value of.
+        :type key: str
+        """
+
+        with self.__lock:
+            with self.__db:
+                size = self.__size_of(key)
+                self.__db.execute('DELETE FROM memo WHERE key = ?', (key,))
+                self.__add_size(-size)
+
+    def clear(self):
+        """ Removes all stored values. """
+
+        with self.__lock:
+            with self.__db:
+                self.__db.execute('DELETE FROM memo')
+                self.__db.execute('UPDATE memo_size SET total = 0')
+
+    def close(self):
+        """ Closes the underlying database. """
+
+        with self.__lock:
+            self.__db.close()
+
+    def key(self, fn, args, kwargs, version=None):
+        """ Computes the key for a call of a function.
+
+        :param fn: Function that is called.
+        :type fn: callable
+
+        :param args: Positional arguments of the call.
+        :type args: tuple
+
+        :param kwargs: Keyword arguments of the call.
+        :type kwargs: dict
+
+        :param version: Optional. Version of the function. Change it to
+        invalidate the stored results whenever the function changes.
+        :type version: object
+
+        :rtype: str
+        """
+
+        name = digest.qualified_name(fn)
+        return digest.digest((name, version, tuple(args), dict(kwargs)))
+
+    def memoize(self, version=None):
+        """ Creates a decorator that stores the results of a function in this
+        store. All arguments of the function need to have a stable digest,
+        see digest.digest.
+
+        :param version: Optional. Version of the function, see key().
+        :type version: object
+
+        :rtype: callable
+        """
+
+        def decorator(fn):
+            missing = object()
+
+            @functools.wraps(fn)
+            def memoized(*args, **kwargs):
+                key = self.key(fn, args, kwargs, version)
+
+                value = self.get(key, missing)
+                if value is missing:
+                    value = fn(*args, **kwargs)
+                    self.set(key, value)
+
+                return value
+
+            return memoized
+
+        return decorator
+
+    def __next_use(self):
+        """ Returns a number that is larger than the one of any previous use
+        of a value. Called with the lock held.
+
+        :rtype: int
+        """
+
+        row = self.__db.execute('SELECT MAX(used) FROM memo').fetchone()
+        return (row[0] or 0) + 1
+
+    def __total(self):
+        """ Returns the running total of the sizes of the stored values.
+        Called with the lock held.
+
+        :rtype: int
+        """
+
+        return self.__db.execute('SELECT total FROM memo_size').fetchone()[0]
+
+    def __size_of(self, key):
+        """ Returns the size of the value stored for a key, or 0 if there is
+        none. Called with the lock held.
+
+        :param key: Key to get size for.
+        :type key: str
+
+        :rtype: int
+        """
+
+        row = self.__db.execute(
+            'SELECT size FROM memo WHERE key = ?', (key,)).fetchone()
+
+        return 0 if row is None else row[0]
+
+    def __add_size(self, delta):
+        """ Adds to the running total of the sizes of the stored values.
+        Called with the lock held.
+
+        :param delta: Number of bytes to add, may be negative.
+        :type delta: int
+        """
+
+        if delta:
+            self.__db.execute('UPDATE memo_size SET total = total + ?',
+                              (delta,))
+
+    def __evict(self):
+        """ Removes the least recently used values until the store is no
+        larger than its maximal size. The values are only looked at if the
+        running total exceeds the maximal size. Called with the lock
+        held. """
+
+        if self.__max_size is None:
+            return
+
+        total = self.__total()
+        if total <= self.__max_size:
+            return
+
+        cursor = self.__db.execute('SELECT key, size FROM memo ORDER BY used')
+
+        evict = []
+        removed = 0
+        for (key, size) in cursor:
+            if total - removed <= self.__max_size:
+                break
+            evict.append((key,))
+            removed += size
+
+        self.__db.executemany('DELETE FROM memo WHERE key = ?', evict)
+        self.__add_size(-removed)
+
+
+def disk_memoize(path, max_size=None, version=None):
+    """ Creates a decorator that stores the results of a function in a
+    DiskMemo at the given path. See DiskMemo.memoize.
+
+    The store stays open as long as the decorated function is used. It is
+    available as the store attribute of the decorated function, and the
+    close attribute closes it.
+
+    :param path: Path to the database file.
+    :type path: str
+
+    :param max_size: Optional. Maximal total size of the stored values in
+    bytes.
+    :type max_size: int
+
+    :param version: Optional. Version of the function, see DiskMemo.key.
+    :type version: object
+
+    :rtype: callable
+    """
+
+    store = DiskMemo(path, max_size=max_size)
+    memoize = store.memoize(version=version)
+
+    def decorator(fn):
+        memoized = memoize(fn)
+        memoized.store = store
+        memoized.close = store.close
+        return memoized
+
+    return decorator
+
+
+__all__ = ["DiskMemo", "disk_memoize"]
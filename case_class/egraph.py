@@ -0,0 +1,660 @@
+"""
+Equality saturation for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, exceptions, extractor, rewriting, signature, \
+    traversal
+
+
+class EClass(case_class.CaseClass):
+    """ Refers to an equivalence class of an EGraph. Used in place of the
+    children of an e-node. """
+
+    def __init__(self, cid):
+        """ Creates a new EClass() instance.
+
+        :param cid: Id of the equivalence class.
+        :type cid: int
+        """
+
+        self.__cid = cid
+
+    @property
+    def cid(self):
+        """ The id of the equivalence class.
+
+        :rtype: int
+        """
+
+        return self.__cid
+
+
+def node_cost(enode, costs):
+    """ The default cost function used to extract terms from an EGraph. The
+    cost of a term is the number of CaseClass instances in it.
+
+    :param enode: E-node to compute cost of.
+    :type enode: case_class.CaseClass
+
+    :param costs: Costs of the children of the e-node.
+    :type costs: list
+
+    :rtype: int
+    """
+
+    return 1 + sum(costs)
+
+
+class EGraph(object):
+    """ An e-graph that stores a set of terms together with equalities
+    between them. Each e-node is an interned CaseClass instance with its
+    children replaced by EClass instances, so every distinct e-node is
+    stored only once. """
+
+    def __init__(self):
+        """ Creates a new, empty, EGraph() instance. """
+
+        # union-find over class ids
+        self.__parents = []
+        self.__sizes = []
+
+        # e-nodes of each canonical class
+        self.__nodes = {}
+
+        # e-nodes that use a canonical class as a child, with their class
+        self.__uses = {}
+
+        # maps each e-node to its class
+        self.__hashcons = {}
+
+        # classes that need to be repaired during rebuild()
+        self.__pending = []
+
+        # incremented whenever classes are added or merged
+        self.__version = 0
+
+        # (version, cheapest e-nodes, cheapest terms) used for rewriting
+        self.__snapshot = None
+
+    def __len__(self):
+        """ Returns the number of equivalence classes in this EGraph.
+
+        :rtype: int
+        """
+
+        return len(self.__nodes)
+
+    @property
+    def classes(self):
+        """ The ids of all canonical equivalence classes in this EGraph.
+
+        :rtype: list
+        """
+
+        return list(self.__nodes)
+
+    def nodes(self, cid):
+        """ Returns the canonical e-nodes of an equivalence class.
+
+        :param cid: Id of the equivalence class.
+        :type cid: int
+
+        :rtype: list
+        """
+
+        result = []
+        seen = set()
+
+        for enode in self.__nodes[self.find(cid)]:
+            enode = self.__canonicalize(enode)
+
+            if id(enode) not in seen:
+                seen.add(id(enode))
+                result.append(enode)
+
+        return result
+
+    #
+    # Union-Find
+    #
+
+    def find(self, cid):
+        """ Finds the canonical id of an equivalence class.
+
+        :param cid: Id of the equivalence class.
+        :type cid: int
+
+        :rtype: int
+        """
+
+        parents = self.__parents
+
+        root = cid
+        while parents[root] != root:
+            root = parents[root]
+
+        # compress the path
+        while parents[cid] != root:
+            (parents[cid], cid) = (root, parents[cid])
+
+        return root
+
+    def merge(self, a, b):
+        """ Records that two equivalence classes are equal. Call rebuild()
+        afterwards to restore congruence.
+
+        :param a: Id of the first equivalence class.
+        :type a: int
+
+        :param b: Id of the second equivalence class.
+        :type b: int
+
+        :return: True if the classes were different before
+        :rtype: bool
+        """
+
+        a = self.find(a)
+        b = self.find(b)
+
+        if a == b:
+            return False
+
+        # the bigger class becomes the root
+        if self.__sizes[a] < self.__sizes[b]:
+            (a, b) = (b, a)
+
+        self.__parents[b] = a
+        self.__sizes[a] += self.__sizes[b]
+        self.__version += 1
+
+        self.__nodes[a].extend(self.__nodes.pop(b))
+        self.__uses[a].extend(self.__uses.pop(b))
+
+        self.__pending.append(a)
+        return True
+
+    #
+    # Adding terms
+    #
+
+    def add(self, term):
+        """ Adds a term to this EGraph.
+
+        :param term: Term to add.
+        :type term: case_class.CaseClass
+
+        :return: the id of the equivalence class of the term
+        :rtype: int
+        """
+
+        if not isinstance(term, case_class.CaseClass):
+            raise ValueError("Only CaseClass instances can be added to an "
+                             "EGraph. ")
+
+        ids = {}
+
+        for node in traversal.postorder(term, unique=True):
+            enode = traversal.map_children(
+                node, lambda c: EClass(self.find(ids[id(c)])))
+            ids[id(node)] = self.__add_enode(enode)
+
+        return ids[id(term)]
+
+    def lookup(self, term):
+        """ Finds the equivalence class of a term without adding it.
+
+        :param term: Term to look for.
+        :type term: case_class.CaseClass
+
+        :return: the id of the equivalence class or None
+        :rtype: int
+        """
+
+        if not isinstance(term, case_class.CaseClass):
+            return None
+
+        ids = {}
+
+        for node in traversal.postorder(term, unique=True):
+            if any(id(c) not in ids for c in traversal.children(node)):
+                return None
+
+            enode = traversal.map_children(node,
+                                           lambda c: EClass(ids[id(c)]))
+            cid = self.__hashcons.get(self.__canonicalize(enode))
+
+            if cid is None:
+                return None
+            ids[id(node)] = self.find(cid)
+
+        return ids[id(term)]
+
+    def __add_enode(self, enode):
+        """ Adds a canonical e-node to this EGraph.
+
+        :param enode: E-node to add.
+        :type enode: case_class.CaseClass
+
+        :return: the id of the equivalence class of the e-node
+        :rtype: int
+        """
+
+        cid = self.__hashcons.get(enode)
+        if cid is not None:
+            return self.find(cid)
+
+        cid = len(self.__parents)
+        self.__version += 1
+        self.__parents.append(cid)
+        self.__sizes.append(1)
+        self.__nodes[cid] = [enode]
+        self.__uses[cid] = []
+        self.__hashcons[enode] = cid
+
+        for child in traversal.children(enode):
+            self.__uses[self.find(child.cid)].append((enode, cid))
+
+        return cid
+
+    def __canonicalize(self, enode):
+        """ Replaces the children of an e-node by their canonical classes.
+
+        :param enode: E-node to canonicalize.
+        :type enode: case_class.CaseClass
+
+        :rtype: case_class.CaseClass
+        """
+
+        return traversal.map_children(enode,
+                                      lambda c: EClass(self.find(c.cid)))
+
+    #
+    # Congruence closure
+    #
+
+    def rebuild(self):
+        """ Restores the congruence invariant after merging classes, i.e.
+        makes sure that e-nodes with equal children are in the same
+        equivalence class. """
+
+        while self.__pending:
+            todo = set(self.find(c) for c in self.__pending)
+            self.__pending = []
+
+            for cid in todo:
+                self.__repair(self.find(cid))
+
+    def __repair(self, cid):
+        """ Repairs the e-nodes using an equivalence class.
+
+        :param cid: Canonical id of the equivalence class.
+        :type cid: int
+        """
+
+        # merges below may add to the uses of the class again
+        uses = self.__uses[cid]
+        self.__uses[cid] = []
+
+        # update the hashcons to canonical e-nodes
+        for (enode, ecid) in uses:
+            self.__hashcons.pop(enode, None)
+            self.__hashcons[self.__canonicalize(enode)] = self.find(ecid)
+
+        # merge e-nodes that have become equal
+        new_uses = {}
+        for (enode, ecid) in uses:
+            enode = self.__canonicalize(enode)
+
+            if enode in new_uses:
+                self.merge(ecid, new_uses[enode])
+            new_uses[enode] = self.find(ecid)
+
+        self.__uses[self.find(cid)].extend(new_uses.items())
+
+    #
+    # Equality saturation
+    #
+
+    def saturate(self, rules, max_iterations=10, max_nodes=10000):
+        """ Applies rules to this EGraph until no more equalities are found
+        or one of the limits is reached. A rule is a rewriting.Rule or a
+        pair (pattern, rewrite). The rewrite function is called with an
+        ExtractedContext of the cheapest terms of the matched classes.
+
+        :param rules: Rules to apply.
+        :type rules: list
+
+        :param max_iterations: Optional. Maximal number of iterations.
+        :type max_iterations: int
+
+        :param max_nodes: Optional. Stop after an iteration if the EGraph
+        has more than this many e-nodes.
+        :type max_nodes: int
+
+        :return: True if the EGraph is saturated
+        :rtype: bool
+        """
+
+        rules = [r if isinstance(r, rewriting.Rule) else rewriting.Rule(*r)
+                 for r in rules]
+
+        for i in range(max_iterations):
+
+            # find all the matches first
+            matches = []
+            for rule in rules:
+                for cid in self.classes:
+                    for ctx in self.match(rule.pattern, cid):
+                        matches.append((rule, cid, ctx))
+
+            # build all the rewritten terms before changing the classes
+            results = []
+            for (rule, cid, ctx) in matches:
+                result = rule.rewrite(
+                    extractor.ExtractedContext(self.__terms(ctx)))
+
+                if isinstance(result, case_class.CaseClass):
+                    results.append((cid, result))
+
+            # and then apply them
+            changed = False
+            for (cid, result) in results:
+                if self.merge(cid, self.add(result)):
+                    changed = True
+
+            self.rebuild()
+
+            if not changed:
+                return True
+
+            if len(self.__hashcons) > max_nodes:
+                return False
+
+        return False
+
+    def match(self, pattern, cid):
+        """ Matches a pattern against all the terms in an equivalence class.
+        Variables are bound to EClass instances or to the values of
+        non-CaseClass parameters.
+
+        :param pattern: Pattern to match, lifted into an Extractor.
+        :type pattern: object
+
+        :param cid: Id of the equivalence class to match against.
+        :type cid: int
+
+        :return: a generator of dictionaries of bound variables
+        :rtype: generator
+        """
+
+        return self.__match_class(extractor.Extractor.lift(pattern),
+                                  self.find(cid), {})
+
+    def __match_class(self, pattern, cid, ctx):
+        """ Matches an Extractor against an equivalence class.
+
+        :rtype: generator
+        """
+
+        if isinstance(pattern, extractor._):
+            yield ctx
+
+        elif isinstance(pattern, extractor.V):
+            (name,) = pattern.case_signature.values()
+            value = EClass(cid)
+
+            if name not in ctx:
+                ctx = dict(ctx)
+                ctx[name] = value
+                yield ctx
+            elif isinstance(ctx[name], EClass) and \
+                    self.find(ctx[name].cid) == cid:
+                yield ctx
+
+        elif isinstance(pattern, extractor.And):
+            contexts = [ctx]
+
+            for p in pattern.patterns:
+                contexts = [c2 for c1 in contexts
+                            for c2 in self.__match_class(p, cid, c1)]
+
+            for c in contexts:
+                yield c
+
+        elif isinstance(pattern, extractor.A):
+            for enode in self.nodes(cid):
+                for c in self.__match_node(pattern, enode, cid, ctx):
+                    yield c
+
+        elif isinstance(pattern, extractor.T):
+            (tp,) = pattern.case_signature.values()
+
+            if any(isinstance(n, tp) for n in self.nodes(cid)):
+                yield ctx
+
+        elif isinstance(pattern, extractor.L):
+            (lit,) = pattern.case_signature.values()
+            lit_cid = self.lookup(lit)
+
+            if lit_cid is not None and self.find(lit_cid) == cid:
+                yield ctx
+
+        elif isinstance(pattern, extractor.C):
+            try:
+                pattern._extract(None, self.__terms(ctx))
+                yield ctx
+            except exceptions.ExtractorDoesNotMatch:
+                pass
+
+        else:
+            raise ValueError("Unsupported pattern %s in EGraph" % (
+                pattern.__class__.__name__,))
+
+    def __match_node(self, pattern, enode, cid, ctx):
+        """ Matches an A() pattern against a single e-node.
+
+        :rtype: generator
+        """
+
+        (head, args, kwargs) = pattern.case_signature.values()
+        head = extractor.Extractor.lift(head)
+
+        # the head applies to this e-node only
+        if isinstance(head, extractor.T):
+            (tp,) = head.case_signature.values()
+            contexts = [ctx] if isinstance(enode, tp) else []
+        else:
+            contexts = list(self.__match_class(head, cid, ctx))
+
+        if not contexts:
+            return
+
+        actual = enode.case_signature
+
+        try:
+            should = actual.signature(*args, **kwargs)
+        except (exceptions.SignatureException,
+                exceptions.AppliedSignatureException):
+            return
+
+        for (name, tp, p) in should:
+            value = actual[name]
+
+            if tp == signature.Signature.VARARG:
+                if len(p) != len(value):
+                    return
+                pairs = zip(p, value)
+            elif tp == signature.Signature.KEYWORD_VARARG:
+                if any(k not in value for k in p):
+                    return
+                pairs = [(p[k], value[k]) for k in p]
+            else:
+                pairs = [(p, value)]
+
+            for (sub_pattern, sub_value) in pairs:
+                sub_pattern = extractor.Extractor.lift(sub_pattern)
+                contexts = [c2 for c1 in contexts
+                            for c2 in self.__match_value(sub_pattern,
+                                                         sub_value, c1)]
+
+                if not contexts:
+                    return
+
+        for c in contexts:
+            yield c
+
+    def __match_value(self, pattern, value, ctx):
+        """ Matches an Extractor against a parameter of an e-node.
+
+        :rtype: generator
+        """
+
+        if isinstance(value, EClass):
+            for c in self.__match_class(pattern, self.find(value.cid), ctx):
+                yield c
+            return
+
+        try:
+            yield pattern._extract(value, dict(ctx))
+        except exceptions.ExtractorDoesNotMatch:
+            pass
+
+    #
+    # Extraction
+    #
+
+    def extract(self, term_or_cid, cost=node_cost):
+        """ Extracts the cheapest term from an equivalence class.
+
+        :param term_or_cid: Term in the class or the id of the class.
+        :type term_or_cid: object
+
+        :param cost: Optional. Function that is called with an e-node and the
+        list of costs of its children and returns the cost of the e-node.
+        Defaults to node_cost.
+        :type cost: callable
+
+        :rtype: case_class.CaseClass
+        """
+
+        if isinstance(term_or_cid, case_class.CaseClass):
+            cid = self.add(term_or_cid)
+        else:
+            cid = term_or_cid
+
+        return self.__term(self.__best(cost), self.find(cid))
+
+    def __best(self, cost):
+        """ Computes the cheapest e-node of every equivalence class.
+
+        :param cost: Cost function, see extract.
+        :type cost: callable
+
+        :return: a dictionary mapping class ids to pairs (cost, e-node)
+        :rtype: dict
+        """
+
+        best = {}
+
+        changed = True
+        while changed:
+            changed = False
+
+            for cid in self.__nodes:
+                for enode in self.nodes(cid):
+                    child_ids = [self.find(c.cid)
+                                 for c in traversal.children(enode)]
+
+                    if any(c not in best for c in child_ids):
+                        continue
+
+                    c = cost(enode, [best[c][0] for c in child_ids])
+
+                    if cid not in best or c < best[cid][0]:
+                        best[cid] = (c, enode)
+                        changed = True
+
+        return best
+
+    def __terms(self, ctx):
+        """ Replaces the EClass instances bound in a context by the cheapest
+        terms of their classes. The cheapest terms are computed once for
+        the current state of this EGraph and reused until it changes.
+
+        :param ctx: Context returned by match.
+        :type ctx: dict
+
+        :rtype: dict
+        """
+
+        if self.__snapshot is None or self.__snapshot[0] != self.__version:
+            self.__snapshot = (self.__version, self.__best(node_cost), {})
+
+        (_, best, terms) = self.__snapshot
+
+        return dict((k, self.__term(best, self.find(v.cid), terms)
+                     if isinstance(v, EClass) else v)
+                    for (k, v) in ctx.items())
+
+    def __term(self, best, cid, terms=None):
+        """ Builds the cheapest term of an equivalence class.
+
+        :param best: Result of __best.
+        :type best: dict
+
+        :param cid: Canonical id of the class.
+        :type cid: int
+
+        :param terms: Optional. Cheapest terms of classes built so far, which
+        is updated with the built terms.
+        :type terms: dict
+
+        :rtype: case_class.CaseClass
+        """
+
+        if terms is None:
+            terms = {}
+
+        stack = [cid]
+
+        while stack:
+            current = stack[-1]
+
+            if current in terms:
+                stack.pop()
+                continue
+
+            enode = best[current][1]
+            pending = [self.find(c.cid) for c in traversal.children(enode)
+                       if self.find(c.cid) not in terms]
+
+            if pending:
+                stack.extend(pending)
+                continue
+
+            terms[current] = traversal.map_children(
+                enode, lambda c: terms[self.find(c.cid)])
+            stack.pop()
+
+        return terms[cid]
+
+
+def simplify(term, rules, cost=node_cost, max_iterations=10,
+             max_nodes=10000):
+    """ Simplifies a term using equality saturation. See EGraph.saturate and
+    EGraph.extract for a description of the parameters.
+
+    :rtype: case_class.CaseClass
+    """
+
+    graph = EGraph()
+    cid = graph.add(term)
+
+    graph.saturate(rules, max_iterations=max_iterations, max_nodes=max_nodes)
+
+    return graph.extract(cid, cost=cost)
+
+
+__all__ = ["EClass", "EGraph", "node_cost", "simplify"]
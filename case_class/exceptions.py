@@ -218,9 +218,99 @@ class ExtractorDoesNotMatch(ExtractorException):
     pass
 
 
+#
+# Rewriting
+#
+
+class RewriteException(CaseClassException):
+    """ Base class for all exceptions related to rewriting. """
+    pass
+
+
+class NonTerminatingRewrite(RewriteException):
+    """ Exception indicating that rewriting a term does not terminate. """
+
+    def __init__(self, term):
+        """ Creates a new NonTerminatingRewrite instance.
+
+        :param term: Term that could not be rewritten to a normal form.
+        :type term: object
+        """
+
+        super(NonTerminatingRewrite, self).__init__(
+            "NonTerminatingRewrite: Rewriting an instance of %s does " % (
+                term.__class__.__name__,) + "not terminate. ")
+
+        self.__term = term
+
+    @property
+    def term(self):
+        """ The term that could not be rewritten to a normal form.
+
+        :rtype: object
+        """
+
+        return self.__term
+
+
+#
+# Unification
+#
+
+class UnificationFailure(CaseClassException):
+    """ Exception indicating that two terms can not be unified. """
+
+    def __init__(self, left, right):
+        """ Creates a new UnificationFailure instance.
+
+        :param left: Left subterm that could not be unified.
+        :type left: object
+
+        :param right: Right subterm that could not be unified.
+        :type right: object
+        """
+
+        super(UnificationFailure, self).__init__(
+            "UnificationFailure: Can not unify an instance of %s with an " % (
+                left.__class__.__name__,) + "instance of %s. " % (
+                right.__class__.__name__,))
+
+        self.__left = left
+        self.__right = right
+
+    @property
+    def left(self):
+        """ The left subterm that could not be unified.
+
+        :rtype: object
+        """
+
+        return self.__left
+
+    @property
+    def right(self):
+        """ The right subterm that could not be unified.
+
+        :rtype: object
+        """
+
+        return self.__right
+
+
+#
+# Serialisation
+#
+
+class CodecException(CaseClassException):
+    """ Exception indicating that data can not be encoded or decoded. """
+    pass
+
+
 __all__ = ["CaseClassException", "NotInstantiableClassException",
            "NotInstantiableAbstractCaseClassException",
            "NoCaseToCaseInheritanceException", "SignatureException",
            "MissingArgument", "NoSuchArgument", "NoDefaultValue",
            "AppliedSignatureException", "TooManyArguments",
-           "TooManyKeyWordArguments", "DoubleArgumentValue"]
+           "TooManyKeyWordArguments", "DoubleArgumentValue",
+           "RewriteException", "NonTerminatingRewrite",
+           "UnificationFailure", "CodecException"]
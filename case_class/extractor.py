@@ -1,4 +1,4 @@
-from . import case_class, exceptions, utils, clsutils, signature
+from . import case_class, exceptions, utils, clsutils, signature, persistent
 
 
 class Extractor(case_class.AbstractCaseClass):
@@ -281,8 +281,27 @@ class A(Extractor):
             except KeyError:
                 raise exceptions.ExtractorDoesNotMatch()
 
+            # varargs are matched item by item and have to have the same
+            # length
+            if tp == signature.Signature.VARARG:
+                if len(value) != len(pattern):
+                    raise exceptions.ExtractorDoesNotMatch()
+
+                for (v, p) in zip(value, pattern):
+                    extracted_ctx = p._extract(v, extracted_ctx)
+
+            # keyword varargs only need to contain the keys of the pattern
+            elif tp == signature.Signature.KEYWORD_VARARG:
+                for k in pattern:
+                    if k not in value:
+                        raise exceptions.ExtractorDoesNotMatch()
+
+                    extracted_ctx = pattern[k]._extract(value[k],
+                                                        extracted_ctx)
+
             # extract all the items one by one
-            extracted_ctx = pattern._extract(value, extracted_ctx)
+            else:
+                extracted_ctx = pattern._extract(value, extracted_ctx)
 
         # and return the context
         return extracted_ctx
@@ -613,12 +632,63 @@ class CaseClassExtractor(ApplicationExtractor):
         :rtype: signature.AppliedSignature
         """
 
-        return o.case_params.signature
+        return o.case_signature
 
 
 CaseClassExtractor.register()
 
 
+def _pvector(*items):
+    """ Signature used to extract the items of a PVector. """
+
+    pass
+
+
+def _pmap(**items):
+    """ Signature used to extract the items of a PMap. """
+
+    pass
+
+
+class PersistentExtractor(ApplicationExtractor):
+    """ Extracts the items of persistent collections, so that T(PVector)(a,
+    b) matches vectors of two items and T(PMap)(key=a) matches maps
+    containing key. """
+
+    __vector = signature.Signature(_pvector)
+    __map = signature.Signature(_pmap)
+
+    def applicable(self, o):
+        """ Checks if this ApplicationExtractor is applicable to a given
+        object.
+
+        :param o: Object to check applicability to
+        :type o: object
+
+        :rtype: bool
+        """
+
+        return isinstance(o, (persistent.PVector, persistent.PMap))
+
+    def extract(self, o):
+        """ Applies this ApplicationExtractor to an object and extracts the
+        parameters.
+
+        :param o: Object to apply to.
+        :type o: object
+
+        :rtype: signature.AppliedSignature
+        """
+
+        if isinstance(o, persistent.PVector):
+            return signature.AppliedSignature(self.__vector, list(o), {})
+
+        return signature.AppliedSignature(self.__map, [], dict(o.items()))
+
+
+PersistentExtractor.register()
+
+
 class PatternMatcher(case_class.CaseClass):
     """ Runs a pattern match scenario """
 
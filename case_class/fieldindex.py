@@ -0,0 +1,359 @@
+"""
+Secondary indexes over the interned instances for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import bisect
+import numbers
+import operator
+
+from . import case_class, clsutils, exceptions
+
+#: Kind of index supporting lookups by equality.
+HASH = 'hash'
+
+#: Kind of index supporting lookups by equality and by ranges.
+SORTED = 'sorted'
+
+# marker for a missing bound of a range
+_UNBOUNDED = object()
+
+
+class HashIndex(object):
+    """ An index of the interned instances of a class by the value of one
+    parameter, supporting lookups by equality. """
+
+    kind = HASH
+
+    def __init__(self, cls, name):
+        """ Creates a new HashIndex() instance. It is empty until instances
+        are added.
+
+        :param cls: Class of the indexed instances.
+        :type cls: type
+
+        :param name: Name of the indexed parameter.
+        :type name: str
+        """
+
+        self.cls = cls
+        self.name = name
+
+        # instances by hash of the value
+        self.__buckets = {}
+
+    def add(self, instance):
+        """ Adds an instance to this index.
+
+        :param instance: Instance to add.
+        :type instance: case_class.CaseClass
+        """
+
+        key = case_class.CaseClassMeta.hash_value(
+            instance.case_signature[self.name])
+        self.__buckets.setdefault(key, []).append(instance)
+
+    def lookup(self, value):
+        """ Returns the indexed instances whose parameter equals a value.
+
+        :param value: Value to look for.
+        :type value: object
+
+        :rtype: list
+        """
+
+        bucket = self.__buckets.get(
+            case_class.CaseClassMeta.hash_value(value), ())
+
+        return [i for i in bucket if i.case_signature[self.name] == value]
+
+    def __len__(self):
+        return sum(len(b) for b in self.__buckets.values())
+
+
+class SortedIndex(object):
+    """ An index of the interned instances of a class by the value of one
+    parameter, supporting lookups by equality and by ranges.
+
+    Values are ordered by kind first (all numbers come before other values,
+    which are grouped by type) and then by value. Values that can not be
+    ordered within their kind are never found by range lookups.
+
+    Added instances are collected and only sorted into the index by the
+    next lookup, so building an index takes O(n log n) time. """
+
+    kind = SORTED
+
+    def __init__(self, cls, name):
+        """ Creates a new SortedIndex() instance. It is empty until instances
+        are added.
+
+        :param cls: Class of the indexed instances.
+        :type cls: type
+
+        :param name: Name of the indexed parameter.
+        :type name: str
+        """
+
+        self.cls = cls
+        self.name = name
+
+        # sorted keys and the instances in the same order
+        self.__keys = []
+        self.__instances = []
+
+        # pairs (key, instance) added since the last lookup
+        self.__added = []
+
+        # instances with values that can not be ordered
+        self.__unordered = []
+
+    def add(self, instance):
+        """ Adds an instance to this index.
+
+        :param instance: Instance to add.
+        :type instance: case_class.CaseClass
+        """
+
+        key = _sort_key(instance.case_signature[self.name])
+
+        # values that can not even be compared to themselves
+        try:
+            key < key
+        except TypeError:
+            self.__unordered.append(instance)
+            return
+
+        self.__added.append((key, instance))
+
+    def __merge(self):
+        """ Sorts the instances added since the last lookup into the index.
+        Sorting the concatenation of the sorted and the added instances only
+        takes O(n + k log k) time, because the sorted ones form a single
+        run. """
+
+        if not self.__added:
+            return
+
+        added = self.__added
+        self.__added = []
+
+        pairs = list(zip(self.__keys, self.__instances)) + added
+
+        try:
+            pairs.sort(key=operator.itemgetter(0))
+        except TypeError:
+            # some values can not be ordered with each other
+            for (key, instance) in added:
+                self.__insert(key, instance)
+            return
+
+        self.__keys = [k for (k, i) in pairs]
+        self.__instances = [i for (k, i) in pairs]
+
+    def __insert(self, key, instance):
+        """ Inserts a single instance into the sorted instances.
+
+        :param key: Key of the instance.
+        :type key: tuple
+
+        :param instance: Instance to insert.
+        :type instance: case_class.CaseClass
+        """
+
+        try:
+            idx = bisect.bisect_right(self.__keys, key)
+        except TypeError:
+            self.__unordered.append(instance)
+            return
+
+        self.__keys.insert(idx, key)
+        self.__instances.insert(idx, instance)
+
+    def lookup(self, value):
+        """ Returns the indexed instances whose parameter equals a value.
+
+        :param value: Value to look for.
+        :type value: object
+
+        :rtype: list
+        """
+
+        try:
+            found = self.range(value, value)
+        except TypeError:
+            found = []
+
+        return found + [i for i in self.__unordered
+                        if i.case_signature[self.name] == value]
+
+    def range(self, low=_UNBOUNDED, high=_UNBOUNDED, include_low=True,
+              include_high=True):
+        """ Returns the indexed instances whose parameter lies within a range,
+        in ascending order. Both bounds have to be of the same kind.
+
+        :param low: Optional. Lower bound, omit for no bound.
+        :type low: object
+
+        :param high: Optional. Upper bound, omit for no bound.
+        :type high: object
+
+        :param include_low: Optional. If set to False, excludes the lower
+        bound.
+        :type include_low: bool
+
+        :param include_high: Optional. If set to False, excludes the upper
+        bound.
+        :type include_high: bool
+
+        :rtype: list
+        """
+
+        self.__merge()
+
+        keys = self.__keys
+        bound = low if low is not _UNBOUNDED else high
+        if bound is _UNBOUNDED:
+            return list(self.__instances)
+
+        # the range never leaves the kind of its bounds
+        kind = _sort_key(bound)[0]
+        start = bisect.bisect_left(keys, (kind,))
+        end = bisect.bisect_left(keys, ((kind[0], kind[1] + '\0'),))
+
+        if low is not _UNBOUNDED:
+            find = bisect.bisect_left if include_low else bisect.bisect_right
+            start = find(keys, _sort_key(low), start, end)
+
+        if high is not _UNBOUNDED:
+            find = bisect.bisect_right if include_high else bisect.bisect_left
+            end = find(keys, _sort_key(high), start, end)
+
+        return self.__instances[start:end]
+
+    def __len__(self):
+        return len(self.__instances) + len(self.__added) + \
+            len(self.__unordered)
+
+
+def create_index(cls, name, kind=HASH):
+    """ Creates a secondary index of the interned instances of a class by
+    the value of one of its parameters. The index contains all existing
+    instances and is updated whenever a new instance is interned. Creating
+    an index that exists returns the existing one.
+
+    Also available as a method of every CaseClass.
+
+    :raises: exceptions.NoSuchArgument
+
+    :param cls: Class to index.
+    :type cls: type
+
+    :param name: Name of the parameter to index.
+    :type name: str
+
+    :param kind: Optional. Kind of the index, either HASH or SORTED.
+    :type kind: str
+
+    :rtype: object
+    """
+
+    if kind not in _KINDS:
+        raise ValueError("Unknown kind of index %r" % (kind,))
+
+    if name not in [n for (n, t, d) in clsutils.get_init_signature(cls)]:
+        raise exceptions.NoSuchArgument(name)
+
+    existing = get_index(cls, name, kind)
+    if existing is not None:
+        return existing
+
+    index = _KINDS[kind](cls, name)
+    for instance in list(case_class.CaseClassMeta.instance_values.get(
+            cls, {}).values()):
+        index.add(instance)
+
+    case_class.CaseClassMeta.instance_indexes.setdefault(cls, []).append(
+        index)
+
+    return index
+
+
+def get_index(cls, name, kind=None):
+    """ Returns the secondary index of a class by a parameter, or None if it
+    does not exist.
+
+    :param cls: Class to get index of.
+    :type cls: type
+
+    :param name: Name of the indexed parameter.
+    :type name: str
+
+    :param kind: Optional. Kind of the index. If omitted, returns an index of
+    any kind, preferring hash indexes.
+    :type kind: str
+
+    :rtype: object
+    """
+
+    found = None
+
+    for index in case_class.CaseClassMeta.instance_indexes.get(cls, ()):
+        if index.name != name:
+            continue
+
+        if index.kind == kind or (kind is None and index.kind == HASH):
+            return index
+
+        if kind is None:
+            found = index
+
+    return found
+
+
+def drop_index(cls, name, kind=None):
+    """ Removes the secondary indexes of a class by a parameter.
+
+    :param cls: Class to remove indexes of.
+    :type cls: type
+
+    :param name: Name of the indexed parameter.
+    :type name: str
+
+    :param kind: Optional. Kind of the index to remove. If omitted, removes
+    indexes of all kinds.
+    :type kind: str
+    """
+
+    indexes = case_class.CaseClassMeta.instance_indexes.get(cls, [])
+
+    indexes[:] = [i for i in indexes if i.name != name or
+                  (kind is not None and i.kind != kind)]
+
+
+#
+# Internal helpers
+#
+
+_KINDS = {HASH: HashIndex, SORTED: SortedIndex}
+
+
+def _sort_key(value):
+    """ Returns the key of a value in a sorted index, which is a pair (kind,
+    value) where kind orders numbers before other values.
+
+    :param value: Value to get key of.
+    :type value: object
+
+    :rtype: tuple
+    """
+
+    if isinstance(value, numbers.Real):
+        return ((0, ''), value)
+
+    return ((1, type(value).__name__), value)
+
+
+__all__ = ["HASH", "SORTED", "HashIndex", "SortedIndex", "create_index",
+           "get_index", "drop_index"]
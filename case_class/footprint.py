@@ -0,0 +1,315 @@
+"""
+Memory footprint analysis for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import contextlib
+import os
+import sys
+
+from . import case_class, traversal
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+#: Memory used by the instance objects themselves.
+INSTANCES = 'instances'
+
+#: Memory used by the dictionaries of instances.
+DICTS = 'dicts'
+
+#: Memory used by the AppliedSignature of instances.
+SIGNATURES = 'signatures'
+
+#: Memory used by the values bound to the signatures (except instances).
+VALUES = 'values'
+
+#: Memory used by attributes set on instances (except instances).
+ATTRIBUTES = 'attributes'
+
+# prefix of the internal attributes of CaseClass instances
+_INTERNAL_PREFIX = '_CaseClass__'
+
+
+class Footprint(object):
+    """ The memory footprint of a set of CaseClass instances. Every object
+    is counted only once, no matter how often it is referenced.
+
+    Attributes:
+
+    nodes -- the number of distinct instances
+    tree_size -- the number of instances if shared ones were copied
+    sizes -- dictionary mapping INSTANCES, DICTS, SIGNATURES, VALUES and
+    ATTRIBUTES to the number of bytes used for them
+    by_class -- dictionary mapping classes to pairs (number of instances,
+    number of bytes)
+    """
+
+    def __init__(self, nodes, tree_size, sizes, by_class):
+        """ Creates a new Footprint() instance.
+
+        :param nodes: Number of distinct instances.
+        :type nodes: int
+
+        :param tree_size: Number of instances if shared ones were copied.
+        :type tree_size: int
+
+        :param sizes: Number of bytes by category.
+        :type sizes: dict
+
+        :param by_class: Pairs (instances, bytes) by class.
+        :type by_class: dict
+        """
+
+        self.nodes = nodes
+        self.tree_size = tree_size
+        self.sizes = sizes
+        self.by_class = by_class
+
+    @property
+    def total(self):
+        """ The total number of bytes.
+
+        :rtype: int
+        """
+
+        return sum(self.sizes.values())
+
+    @property
+    def sharing_ratio(self):
+        """ The ratio tree_size / nodes. The larger it is, the more memory is
+        saved by interning.
+
+        :rtype: float
+        """
+
+        if not self.nodes:
+            return 1.0
+
+        return float(self.tree_size) / self.nodes
+
+    def __repr__(self):
+        return 'Footprint(nodes=%d, tree_size=%d, total=%d)' % (
+            self.nodes, self.tree_size, self.total)
+
+
+def footprint(root):
+    """ Computes the memory retained by a tree of CaseClass instances. Shared
+    instances and values are counted once.
+
+    :param root: Root of the tree.
+    :type root: case_class.CaseClass
+
+    :rtype: Footprint
+    """
+
+    nodes = list(traversal.preorder(root, unique=True))
+    tree_size = traversal.fold(root, lambda n, sizes: 1 + sum(sizes))
+
+    return _measure(nodes, tree_size)
+
+
+def registry_report():
+    """ Computes the memory used by all interned instances, by class. In
+    addition to the memory of the instances, the tree size counts how often
+    instances of the class are referenced by other instances, so the
+    sharing ratio shows how much interning saves for the class.
+
+    :return: a dictionary mapping classes to Footprint instances
+    :rtype: dict
+    """
+
+    instances = dict((cls, list(values.values())) for (cls, values) in
+                     list(case_class.CaseClassMeta.instance_values.items()))
+
+    references = dict((cls, 0) for cls in instances)
+    for cls in instances:
+        for inst in instances[cls]:
+            for child in traversal.children(inst):
+                if child.__class__ in references:
+                    references[child.__class__] += 1
+
+    return dict((cls, _measure(instances[cls], references[cls]))
+                for cls in instances)
+
+
+@contextlib.contextmanager
+def trace_allocations(frames=25):
+    """ Context manager that traces all memory allocated while creating
+    CaseClass instances within it. Requires the tracemalloc module.
+
+    Yields a dictionary that is filled when the block is left. It maps the
+    call sites (filename, line number) that created instances to pairs
+    (number of bytes, number of allocations) still allocated at the end.
+
+    :param frames: Optional. Number of frames to store for each allocation.
+    Allocations nested deeper than this within a call site are not found.
+    :type frames: int
+
+    :rtype: dict
+    """
+
+    if tracemalloc is None:
+        raise RuntimeError("Tracing allocations requires tracemalloc")
+
+    sites = {}
+    started = not tracemalloc.is_tracing()
+
+    if started:
+        tracemalloc.start(frames)
+
+    try:
+        yield sites
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    own = os.path.dirname(os.path.abspath(case_class.__file__))
+
+    for trace in snapshot.traces:
+        site = _call_site(trace.traceback, own)
+        if site is not None:
+            (size, count) = sites.get(site, (0, 0))
+            sites[site] = (size + trace.size, count + 1)
+
+
+#
+# Internal helpers
+#
+
+def _call_site(traceback, own):
+    """ Finds the call site of the innermost call into the case_class module
+    in the traceback of an allocation, e.g. the line creating an instance.
+
+    :param traceback: Traceback of the allocation.
+    :type traceback: tracemalloc.Traceback
+
+    :param own: Directory of the case_class module.
+    :type own: str
+
+    :rtype: tuple
+    """
+
+    # order the frames from the most recent to the oldest
+    frames = list(traceback)
+    if sys.version_info >= (3, 7):
+        frames.reverse()
+
+    inside = False
+
+    for frame in frames:
+        filename = os.path.abspath(frame.filename)
+
+        if os.path.dirname(filename) == own:
+            inside = inside or os.path.basename(filename) == 'case_class.py'
+        elif inside:
+            return (frame.filename, frame.lineno)
+
+    return None
+
+
+def _measure(nodes, tree_size):
+    """ Measures the memory used by a list of distinct instances.
+
+    :param nodes: Instances to measure.
+    :type nodes: list
+
+    :param tree_size: Tree size to report.
+    :type tree_size: int
+
+    :rtype: Footprint
+    """
+
+    sizes = dict((k, 0) for k in [INSTANCES, DICTS, SIGNATURES, VALUES,
+                                  ATTRIBUTES])
+    by_class = {}
+    seen = set(id(n) for n in nodes)
+
+    for node in nodes:
+        node_sizes = {
+            INSTANCES: sys.getsizeof(node),
+            DICTS: sys.getsizeof(node.__dict__),
+            SIGNATURES: _signature_size(node.case_signature, seen),
+            VALUES: sum(_deep_size(v, seen)
+                        for v in node.case_signature.values()),
+            ATTRIBUTES: sum(_deep_size(node.__dict__[k], seen)
+                            for k in node.__dict__
+                            if not k.startswith(_INTERNAL_PREFIX))
+        }
+
+        total = 0
+        for k in node_sizes:
+            sizes[k] += node_sizes[k]
+            total += node_sizes[k]
+
+        (count, size) = by_class.get(node.__class__, (0, 0))
+        by_class[node.__class__] = (count + 1, size + total)
+
+    return Footprint(len(nodes), tree_size, sizes, by_class)
+
+
+def _signature_size(applied, seen):
+    """ Measures the memory used by an AppliedSignature without the values
+    bound in it and without the Signature it is shared with all instances.
+
+    :param applied: AppliedSignature to measure.
+    :type applied: signature.AppliedSignature
+
+    :param seen: Ids of objects that were counted already.
+    :type seen: set
+
+    :rtype: int
+    """
+
+    size = 0
+
+    for obj in [applied, applied.__dict__] + [
+            v for v in applied.__dict__.values()
+            if type(v) in (dict, tuple, list)]:
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+
+    return size
+
+
+def _deep_size(value, seen):
+    """ Measures the memory used by a value, including the values within
+    tuples, lists, sets and dictionaries but not CaseClass instances.
+
+    :param value: Value to measure.
+    :type value: object
+
+    :param seen: Ids of objects that were counted already.
+    :type seen: set
+
+    :rtype: int
+    """
+
+    size = 0
+    stack = [value]
+
+    while stack:
+        obj = stack.pop()
+
+        if id(obj) in seen or isinstance(obj, case_class.CaseClass):
+            continue
+        seen.add(id(obj))
+
+        size += sys.getsizeof(obj)
+
+        if type(obj) in (tuple, list, set, frozenset):
+            stack.extend(obj)
+        elif type(obj) is dict:
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+
+    return size
+
+
+__all__ = ["INSTANCES", "DICTS", "SIGNATURES", "VALUES", "ATTRIBUTES",
+           "Footprint", "footprint", "registry_report", "trace_allocations"]
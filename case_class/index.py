@@ -0,0 +1,254 @@
+"""
+Subtree indexes for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, exceptions, extractor, traversal
+
+# name class sets are stored under in the dictionary of instances
+_CLASSES_KEY = '__case_classes__'
+
+# all class sets, so that equal sets are shared between instances
+_class_sets = {}
+
+# caches if a class set contains a subclass of a class, by (set, class)
+_contains = {}
+
+
+def class_set(node):
+    """ Returns the set of classes of all CaseClass instances in a tree,
+    including the root. The set is cached on every instance in the tree, so
+    it is computed only once per (interned) instance.
+
+    :param node: Root of the tree.
+    :type node: case_class.CaseClass
+
+    :rtype: frozenset
+    """
+
+    classes = node.__dict__.get(_CLASSES_KEY)
+    if classes is not None:
+        return classes
+
+    prune = lambda n: _CLASSES_KEY in n.__dict__
+
+    for n in traversal.postorder(node, unique=True, prune=prune):
+        if _CLASSES_KEY in n.__dict__:
+            continue
+
+        classes = set([n.__class__])
+        for c in traversal.children(n):
+            classes.update(c.__dict__[_CLASSES_KEY])
+
+        classes = frozenset(classes)
+        n.__dict__[_CLASSES_KEY] = _class_sets.setdefault(classes, classes)
+
+    return node.__dict__[_CLASSES_KEY]
+
+
+class SubtreeIndex(object):
+    """ An index of the CaseClass instances in a tree, grouped by class.
+
+    Groups are built on first use. Building a group only visits the
+    subtrees that contain an instance of the class, which is found from the
+    class sets (see class_set) cached on the instances. These are shared
+    between all trees containing an instance, so indexes of trees sharing
+    subtrees with an earlier tree are built incrementally. """
+
+    def __init__(self, root):
+        """ Creates a new SubtreeIndex() instance.
+
+        :param root: Root of the tree to index.
+        :type root: case_class.CaseClass
+        """
+
+        self.__root = root
+
+        # distinct instances by class
+        self.__groups = {}
+
+    @property
+    def root(self):
+        """ The root of the indexed tree.
+
+        :rtype: case_class.CaseClass
+        """
+
+        return self.__root
+
+    def classes(self):
+        """ Returns the set of classes of all instances in the tree.
+
+        :rtype: frozenset
+        """
+
+        return class_set(self.__root)
+
+    def nodes(self, cls):
+        """ Returns the distinct instances of a class (or its subclasses) in
+        the tree, in pre-order.
+
+        :param cls: Class to get instances of.
+        :type cls: type
+
+        :rtype: tuple
+        """
+
+        if cls not in self.__groups:
+            self.__groups[cls] = tuple(_iter_nodes(self.__root, cls))
+
+        return self.__groups[cls]
+
+    def find_all(self, pattern):
+        """ Finds all distinct instances in the tree matching a pattern. See
+        find_all.
+
+        :param pattern: Pattern to match. Lifted into an Extractor.
+        :type pattern: object
+
+        :rtype: generator
+        """
+
+        pattern = extractor.Extractor.lift(pattern)
+        head = head_class(pattern)
+
+        if head is None:
+            candidates = traversal.preorder(self.__root, unique=True)
+        else:
+            candidates = self.nodes(head)
+
+        return _matches(pattern, candidates)
+
+
+def head_class(pattern):
+    """ Returns the class that every CaseClass instance matching a pattern is
+    an instance of, or None if the pattern can match instances of any
+    class.
+
+    :param pattern: Pattern to get class of.
+    :type pattern: extractor.Extractor
+
+    :rtype: type
+    """
+
+    stack = [extractor.Extractor.lift(pattern)]
+
+    while stack:
+        p = stack.pop()
+
+        if isinstance(p, extractor.A):
+            inner = p.case_signature.values()[0]
+            stack.append(extractor.Extractor.lift(inner))
+
+        elif isinstance(p, extractor.And):
+            stack.extend(reversed(p.patterns))
+
+        elif isinstance(p, extractor.T):
+            (tp,) = p.case_signature.values()
+            if isinstance(tp, type) and issubclass(tp, case_class.CaseClass):
+                return tp
+
+        elif isinstance(p, extractor.L):
+            (lit,) = p.case_signature.values()
+            if isinstance(lit, case_class.CaseClass):
+                return lit.__class__
+
+    return None
+
+
+def find_all(root, pattern):
+    """ Finds all distinct CaseClass instances in a tree matching a pattern
+    and generates the ExtractedContext of each match. To get the matching
+    instance itself, bind it to a variable, e.g. using pattern >> 'node'.
+
+    If the pattern only matches instances of a certain class (e.g. because
+    it is of the form A(Cls, ...)), only the subtrees containing instances
+    of that class are visited.
+
+    :param root: Root of the tree to search.
+    :type root: case_class.CaseClass
+
+    :param pattern: Pattern to match. Lifted into an Extractor.
+    :type pattern: object
+
+    :rtype: generator
+    """
+
+    pattern = extractor.Extractor.lift(pattern)
+    head = head_class(pattern)
+
+    if head is None:
+        candidates = traversal.preorder(root, unique=True)
+    else:
+        candidates = _iter_nodes(root, head)
+
+    return _matches(pattern, candidates)
+
+
+#
+# Internal helpers
+#
+
+def _has_subclass(classes, cls):
+    """ Checks if a class set contains a class or one of its subclasses.
+
+    :param classes: Class set to check.
+    :type classes: frozenset
+
+    :param cls: Class to look for.
+    :type cls: type
+
+    :rtype: bool
+    """
+
+    key = (classes, cls)
+
+    if key not in _contains:
+        _contains[key] = any(issubclass(c, cls) for c in classes)
+
+    return _contains[key]
+
+
+def _iter_nodes(root, cls):
+    """ Generates the distinct instances of a class in a tree in pre-order,
+    skipping all subtrees that do not contain any.
+
+    :param root: Root of the tree.
+    :type root: case_class.CaseClass
+
+    :param cls: Class to get instances of.
+    :type cls: type
+
+    :rtype: generator
+    """
+
+    class_set(root)
+    prune = lambda n: not _has_subclass(n.__dict__[_CLASSES_KEY], cls)
+
+    for node in traversal.preorder(root, unique=True, prune=prune):
+        if isinstance(node, cls):
+            yield node
+
+
+def _matches(pattern, candidates):
+    """ Generates the ExtractedContext of every candidate matching a
+    pattern.
+
+    :param pattern: Pattern to match.
+    :type pattern: extractor.Extractor
+
+    :param candidates: Instances to match.
+    :type candidates: iterable
+
+    :rtype: generator
+    """
+
+    for node in candidates:
+        try:
+            yield pattern.extract(node)
+        except exceptions.ExtractorDoesNotMatch:
+            pass
+
+
+__all__ = ["class_set", "SubtreeIndex", "head_class", "find_all"]
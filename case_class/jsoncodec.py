@@ -0,0 +1,529 @@
+"""
+Streaming JSON serialisation for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import base64
+import codecs
+import json
+import json.decoder
+import re
+
+from . import case_class, clsutils, codec, exceptions, persistent, \
+    signature, utils
+
+#: Number of characters read at once when decoding from a file object.
+CHUNK_SIZE = 65536
+
+# markers used on the stack of the encoder
+_VALUE = 0
+_TEXT = 1
+_DONE = 2
+
+# states of the decoder
+_EXPECT_VALUE = 0
+_EXPECT_VALUE_OR_END = 1
+_EXPECT_KEY = 2
+_EXPECT_KEY_OR_END = 3
+_EXPECT_COLON = 4
+_EXPECT_COMMA_OR_END = 5
+
+# literals and numbers
+_LITERAL = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?'
+                      r'|true|false|null|NaN|-?Infinity')
+# characters after a number that may still belong to it
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*\Z')
+_CONSTANTS = {'true': True, 'false': False, 'null': None,
+              'NaN': float('nan'), 'Infinity': float('inf'),
+              '-Infinity': float('-inf')}
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json(obj):
+    """ Generates the JSON encoding of an object, which typically is a tree
+    of CaseClass instances, as a sequence of string chunks.
+
+    A CaseClass instance is encoded as {"$case": "module:name", "args":
+    [...]}, where args are the values bound to its init signature. Every
+    distinct (interned) instance is encoded once, later occurrences are
+    encoded as {"$ref": n}, where n counts the instances in the order they
+    are completed. Tuples, bytes and dictionaries that can not be JSON
+    objects are encoded as {"$tuple": [...]}, {"$bytes": "base64"} and
+    {"$dict": [[key, value], ...]}, persistent collections as
+    {"$pvector": [...]} and {"$pmap": [[key, value], ...]}.
+
+    :raises: exceptions.CodecException
+
+    :param obj: Object to encode.
+    :type obj: object
+
+    :rtype: generator
+    """
+
+    # indices of instances that were completed
+    nodes = {}
+
+    stack = [(_VALUE, obj)]
+
+    while stack:
+        (marker, item) = stack.pop()
+
+        if marker == _TEXT:
+            yield item
+            continue
+
+        elif marker == _DONE:
+            nodes[id(item)] = len(nodes)
+            continue
+
+        if isinstance(item, case_class.CaseClass):
+            if id(item) in nodes:
+                yield '{"$ref": %d}' % (nodes[id(item)],)
+                continue
+
+            cls = item.__class__
+            name = '%s:%s' % (cls.__module__,
+                              getattr(cls, '__qualname__', cls.__name__))
+
+            stack.append((_DONE, item))
+            stack.append((_TEXT, ']}'))
+            _push_items(stack, item.case_signature.values())
+            yield '{"$case": %s, "args": [' % (json.dumps(name),)
+
+        elif type(item) is tuple:
+            stack.append((_TEXT, ']}'))
+            _push_items(stack, item)
+            yield '{"$tuple": ['
+
+        elif type(item) is list:
+            stack.append((_TEXT, ']'))
+            _push_items(stack, item)
+            yield '['
+
+        elif type(item) is persistent.PVector:
+            stack.append((_TEXT, ']}'))
+            _push_items(stack, list(item))
+            yield '{"$pvector": ['
+
+        elif type(item) is persistent.PMap:
+            stack.append((_TEXT, ']}'))
+            for (i, (k, v)) in reversed(list(enumerate(item.items()))):
+                stack.append((_TEXT, ']'))
+                stack.append((_VALUE, v))
+                stack.append((_TEXT, ', '))
+                stack.append((_VALUE, k))
+                stack.append((_TEXT, ', [' if i else '['))
+            yield '{"$pmap": ['
+
+        elif type(item) is dict:
+            if all(_is_text(k) and not k.startswith('$') for k in item):
+                stack.append((_TEXT, '}'))
+                for (i, k) in reversed(list(enumerate(item))):
+                    stack.append((_VALUE, item[k]))
+                    stack.append((_TEXT, '%s%s: ' % (', ' if i else '',
+                                                     json.dumps(k))))
+                yield '{'
+            else:
+                stack.append((_TEXT, ']}'))
+                for (i, k) in reversed(list(enumerate(item))):
+                    stack.append((_TEXT, ']'))
+                    stack.append((_VALUE, item[k]))
+                    stack.append((_TEXT, ', '))
+                    stack.append((_VALUE, k))
+                    stack.append((_TEXT, ', [' if i else '['))
+                yield '{"$dict": ['
+
+        elif isinstance(item, bytes) and not _is_text(item):
+            data = base64.b64encode(item).decode('ascii')
+            yield '{"$bytes": "%s"}' % (data,)
+
+        elif item is None or isinstance(item, (bool, int, float)) or \
+                _is_text(item) or type(item).__name__ == 'long':
+            yield json.dumps(item)
+
+        else:
+            raise exceptions.CodecException(
+                "Can not encode values of type %s" % (type(item).__name__,))
+
+
+def dump(obj, fileobj):
+    """ Writes the JSON encoding of an object to a text file object as it is
+    generated. See iter_json.
+
+    :raises: exceptions.CodecException
+
+    :param obj: Object to encode.
+    :type obj: object
+
+    :param fileobj: File object to write to.
+    :type fileobj: file
+    """
+
+    for chunk in iter_json(obj):
+        fileobj.write(chunk)
+
+
+def dumps(obj):
+    """ Returns the JSON encoding of an object. See iter_json.
+
+    :raises: exceptions.CodecException
+
+    :param obj: Object to encode.
+    :type obj: object
+
+    :rtype: str
+    """
+
+    return ''.join(iter_json(obj))
+
+
+def load(fileobj, chunk_size=CHUNK_SIZE):
+    """ Decodes an object encoded by iter_json from a file object, reading
+    it in chunks. CaseClass instances are interned bottom-up as soon as all
+    of their arguments are read, so only the containers that are currently
+    open are kept in memory, and deep documents do not hit the recursion
+    limit.
+
+    :raises: exceptions.CodecException
+
+    :param fileobj: Text or binary (utf-8) file object to read from.
+    :type fileobj: file
+
+    :param chunk_size: Optional. Number of characters to read at once.
+    :type chunk_size: int
+
+    :rtype: object
+    """
+
+    return _decode(_Tokenizer(lambda: fileobj.read(chunk_size)))
+
+
+def loads(s):
+    """ Decodes an object encoded by iter_json from a string. See load.
+
+    :raises: exceptions.CodecException
+
+    :param s: String to decode.
+    :type s: str
+
+    :rtype: object
+    """
+
+    chunks = [s]
+    return _decode(_Tokenizer(lambda: chunks.pop() if chunks else ''))
+
+
+#
+# Internal helpers
+#
+
+def _is_text(value):
+    """ Checks if a value is a text string.
+
+    :param value: Value to check.
+    :type value: object
+
+    :rtype: bool
+    """
+
+    return utils.is_string(value) and not isinstance(value, bytes)
+
+
+def _push_items(stack, items):
+    """ Pushes items separated by commas onto the stack of the encoder, so
+    that they are popped in their original order.
+
+    :param stack: Stack to push items to.
+    :type stack: list
+
+    :param items: Items to push.
+    :type items: list
+    """
+
+    for (i, v) in reversed(list(enumerate(items))):
+        stack.append((_VALUE, v))
+        if i:
+            stack.append((_TEXT, ', '))
+
+
+class _Tokenizer(object):
+    """ Splits JSON read in chunks into tokens. """
+
+    def __init__(self, read):
+        """ Creates a new _Tokenizer() instance.
+
+        :param read: Function returning the next chunk or an empty chunk at
+        the end.
+        :type read: callable
+        """
+
+        self.__read = read
+        self.__decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__buffer = ''
+        self.__position = 0
+        self.__eof = False
+
+    def __fill(self):
+        """ Reads the next chunk into the buffer.
+
+        :return: False if there is nothing left to read
+        :rtype: bool
+        """
+
+        if self.__eof:
+            return False
+
+        chunk = self.__read()
+        if isinstance(chunk, bytes) and not _is_text(chunk):
+            chunk = self.__decoder.decode(chunk, not chunk)
+
+        if not chunk:
+            self.__eof = True
+            return False
+
+        self.__buffer = self.__buffer[self.__position:] + chunk
+        self.__position = 0
+        return True
+
+    def next(self):
+        """ Returns the next token as a pair (kind, value), where kind is one
+        of '{', '}', '[', ']', ':', ',' or 'v' for values. Returns None at
+        the end of the input.
+
+        :raises: exceptions.CodecException
+
+        :rtype: tuple
+        """
+
+        while True:
+            buf = self.__buffer
+            pos = self.__position
+
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.__position = pos
+
+            if pos < len(buf):
+                break
+
+            if not self.__fill():
+                return None
+
+        c = buf[pos]
+
+        if c in '{}[]:,':
+            self.__position = pos + 1
+            return (c, None)
+
+        # strings and literals may continue in the next chunk
+        while True:
+            buf = self.__buffer
+            pos = self.__position
+
+            if c == '"':
+                try:
+                    (value, end) = json.decoder.scanstring(buf, pos + 1, True)
+                except ValueError:
+                    if self.__fill():
+                        continue
+                    raise exceptions.CodecException("Invalid string")
+            else:
+                # the literal may continue if the rest of the buffer could
+                # be part of it, e.g. '1.' before '5'
+                match = _LITERAL.match(buf, pos)
+                if match is None or _NUMBER_TAIL.match(buf, match.end()):
+                    if self.__fill():
+                        continue
+                if match is None:
+                    raise exceptions.CodecException(
+                        "Invalid JSON at %r" % (buf[pos:pos + 20],))
+
+                end = match.end()
+                text = match.group(0)
+
+                if text in _CONSTANTS:
+                    value = _CONSTANTS[text]
+                elif '.' in text or 'e' in text or 'E' in text:
+                    value = float(text)
+                else:
+                    value = int(text)
+
+            self.__position = end
+            return ('v', value)
+
+
+def _decode(tokenizer):
+    """ Decodes a JSON document from a tokenizer, using an explicit stack of
+    open containers.
+
+    :raises: exceptions.CodecException
+
+    :param tokenizer: Tokenizer to read from.
+    :type tokenizer: _Tokenizer
+
+    :rtype: object
+    """
+
+    # decoded instances in the order they were completed
+    nodes = []
+
+    # open containers, as lists [container, key]
+    stack = []
+    expect = _EXPECT_VALUE
+
+    while True:
+        token = tokenizer.next()
+        if token is None:
+            raise exceptions.CodecException("Unexpected end of JSON")
+
+        (kind, value) = token
+        done = False
+
+        if expect == _EXPECT_VALUE or expect == _EXPECT_VALUE_OR_END:
+            if kind == '{':
+                stack.append([{}, None])
+                expect = _EXPECT_KEY_OR_END
+            elif kind == '[':
+                stack.append([[], None])
+                expect = _EXPECT_VALUE_OR_END
+            elif kind == ']' and expect == _EXPECT_VALUE_OR_END:
+                value = stack.pop()[0]
+                done = True
+            elif kind == 'v':
+                done = True
+            else:
+                raise exceptions.CodecException("Expected a value")
+
+        elif expect == _EXPECT_KEY or expect == _EXPECT_KEY_OR_END:
+            if kind == '}' and expect == _EXPECT_KEY_OR_END:
+                value = _finish_object(stack.pop()[0], nodes)
+                done = True
+            elif kind == 'v' and _is_text(value):
+                stack[-1][1] = value
+                expect = _EXPECT_COLON
+            else:
+                raise exceptions.CodecException("Expected a key")
+
+        elif expect == _EXPECT_COLON:
+            if kind != ':':
+                raise exceptions.CodecException("Expected ':'")
+            expect = _EXPECT_VALUE
+
+        else:
+            is_object = type(stack[-1][0]) is dict
+
+            if kind == ',':
+                expect = _EXPECT_KEY if is_object else _EXPECT_VALUE
+            elif kind == '}' and is_object:
+                value = _finish_object(stack.pop()[0], nodes)
+                done = True
+            elif kind == ']' and not is_object:
+                value = stack.pop()[0]
+                done = True
+            else:
+                raise exceptions.CodecException("Expected ',' or the end")
+
+        if not done:
+            continue
+
+        # a value is complete, so add it to the open container
+        if not stack:
+            if tokenizer.next() is not None:
+                raise exceptions.CodecException("Unexpected data after JSON")
+            return value
+
+        (container, key) = stack[-1]
+        if type(container) is dict:
+            container[key] = value
+        else:
+            container.append(value)
+
+        expect = _EXPECT_COMMA_OR_END
+
+
+def _check_args(cls, args):
+    """ Checks that decoded arguments fit the init signature of a class,
+    i.e. that there is one value per parameter, a tuple for the variable
+    arguments and a dictionary for the variable keyword arguments.
+
+    :raises: exceptions.CodecException
+
+    :param cls: Class the arguments are for.
+    :type cls: type
+
+    :param args: Decoded arguments.
+    :type args: list
+
+    :rtype: list
+    """
+
+    params = list(clsutils.get_init_signature(cls))
+
+    if type(args) is not list or len(args) != len(params):
+        raise exceptions.CodecException(
+            "Expected %d arguments for %s, got %r" % (
+                len(params), cls.__name__, args))
+
+    for ((name, tp, default), value) in zip(params, args):
+        if tp == signature.Signature.VARARG and type(value) is not tuple:
+            raise exceptions.CodecException(
+                "Expected a tuple for *%s of %s" % (name, cls.__name__))
+
+        if tp == signature.Signature.KEYWORD_VARARG and \
+                type(value) is not dict:
+            raise exceptions.CodecException(
+                "Expected a dictionary for **%s of %s" % (
+                    name, cls.__name__))
+
+    return args
+
+
+def _finish_object(obj, nodes):
+    """ Turns a decoded JSON object into the value it encodes.
+
+    :raises: exceptions.CodecException
+
+    :param obj: Decoded JSON object.
+    :type obj: dict
+
+    :param nodes: Decoded instances in the order they were completed.
+    :type nodes: list
+
+    :rtype: object
+    """
+
+    try:
+        if '$case' in obj:
+            (module, qualname) = obj['$case'].split(':', 1)
+            cls = codec.find_class(module, qualname)
+            node = cls.from_values(_check_args(cls, obj['args']))
+            nodes.append(node)
+            return node
+
+        elif '$ref' in obj:
+            return nodes[obj['$ref']]
+
+        elif '$tuple' in obj:
+            return tuple(obj['$tuple'])
+
+        elif '$bytes' in obj:
+            return base64.b64decode(obj['$bytes'].encode('ascii'))
+
+        elif '$dict' in obj:
+            return dict((k, v) for (k, v) in obj['$dict'])
+
+        elif '$pvector' in obj:
+            return persistent.PVector(obj['$pvector'])
+
+        elif '$pmap' in obj:
+            return persistent.PMap((k, v) for (k, v) in obj['$pmap'])
+
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise exceptions.CodecException("Invalid special object: %s" % (e,))
+
+    return obj
+
+
+__all__ = ["CHUNK_SIZE", "iter_json", "dump", "dumps", "load", "loads"]
@@ -0,0 +1,227 @@
+"""
+Process-parallel mapping and pattern matching for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import collections
+import itertools
+import multiprocessing
+
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
+
+from . import codec, exceptions, extractor
+
+#: Default number of items sent to a worker process at once.
+CHUNK_SIZE = 1000
+
+#: Number of chunks submitted but not yet collected, per worker process.
+IN_FLIGHT = 2
+
+
+def parallel_map(fn, instances, workers=None, chunk_size=CHUNK_SIZE):
+    """ Applies a function to every item of an iterable in a pool of worker
+    processes and returns the results in order.
+
+    Items are sent to the workers in chunks, each encoded with codec.dumps
+    so that instances shared within a chunk are only transferred once. The
+    results are encoded the same way and decoded in this process, so
+    CaseClass instances among them are interned here.
+
+    The function has to be picklable (e.g. defined at the top level of a
+    module) and both the items and the results have to be encodable by the
+    codec module.
+
+    :raises: exceptions.CodecException
+
+    :param fn: Function to apply.
+    :type fn: function
+
+    :param instances: Items to apply function to.
+    :type instances: iterable
+
+    :param workers: Optional. Number of worker processes, defaults to the
+    number of processors.
+    :type workers: int
+
+    :param chunk_size: Optional. Number of items sent to a worker at once.
+    :type chunk_size: int
+
+    :rtype: list
+    """
+
+    results = []
+
+    for (chunk, data) in _run(_map_chunk, fn, instances, workers,
+                              chunk_size):
+        results.extend(codec.loads(data))
+
+    return results
+
+
+def parallel_match(pattern, iterable, workers=None, chunk_size=CHUNK_SIZE):
+    """ Matches an Extractor against every item of an iterable in a pool of
+    worker processes. Returns a list of pairs (item, context) for the
+    matching items in order, where context is the ExtractedContext of the
+    match.
+
+    Items are transferred as in parallel_map. The pattern has to be
+    picklable, so it can not contain C() extractors of lambdas or local
+    functions. The extracted values have to be encodable by the codec
+    module and CaseClass instances among them are interned here.
+
+    :raises: exceptions.CodecException
+
+    :param pattern: Extractor (or object that is lifted to one) to match.
+    :type pattern: extractor.Extractor
+
+    :param iterable: Items to match pattern against.
+    :type iterable: iterable
+
+    :param workers: Optional. Number of worker processes, defaults to the
+    number of processors.
+    :type workers: int
+
+    :param chunk_size: Optional. Number of items sent to a worker at once.
+    :type chunk_size: int
+
+    :rtype: list
+    """
+
+    pattern = extractor.Extractor.lift(pattern)
+    matches = []
+
+    for (chunk, data) in _run(_match_chunk, pattern, iterable, workers,
+                              chunk_size):
+        for (position, ctx) in codec.loads(data):
+            matches.append((chunk[position],
+                            extractor.ExtractedContext(ctx)))
+
+    return matches
+
+
+#
+# Internal helpers
+#
+
+def _run(task, arg, iterable, workers, chunk_size):
+    """ Runs a task on the chunks of an iterable in a pool of worker
+    processes and generates pairs (chunk, result) in order. Chunks are read
+    and encoded only when there is room for them, so at most IN_FLIGHT
+    chunks per worker are held in memory at once.
+
+    :param task: Top-level function called as task(arg, data) with the
+    encoded chunk.
+    :type task: function
+
+    :param arg: First argument to the task.
+    :type arg: object
+
+    :param iterable: Items to split into chunks.
+    :type iterable: iterable
+
+    :param workers: Number of worker processes or None.
+    :type workers: int
+
+    :param chunk_size: Number of items per chunk.
+    :type chunk_size: int
+
+    :rtype: generator
+    """
+
+    if futures is None:
+        raise RuntimeError("Parallel execution requires concurrent.futures")
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    chunks = _chunks(iterable, chunk_size)
+
+    # do not start any workers for empty input
+    first = next(chunks, None)
+    if first is None:
+        return
+
+    workers = workers or multiprocessing.cpu_count()
+
+    # pairs (chunk, future) in the order of the chunks
+    pending = collections.deque()
+
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in itertools.chain([first], chunks):
+            pending.append((chunk, executor.submit(task, arg,
+                                                   codec.dumps(chunk))))
+
+            if len(pending) >= IN_FLIGHT * workers:
+                (done, future) = pending.popleft()
+                yield (done, future.result())
+
+        while pending:
+            (done, future) = pending.popleft()
+            yield (done, future.result())
+
+
+def _chunks(iterable, size):
+    """ Splits an iterable into lists of a given size.
+
+    :param iterable: Iterable to split.
+    :type iterable: iterable
+
+    :param size: Maximal size of each list.
+    :type size: int
+
+    :rtype: generator
+    """
+
+    it = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if len(chunk) == 0:
+            return
+
+        yield chunk
+
+
+def _map_chunk(fn, data):
+    """ Applies a function to an encoded chunk in a worker process.
+
+    :param fn: Function to apply.
+    :type fn: function
+
+    :param data: Encoded list of items.
+    :type data: bytes
+
+    :rtype: bytes
+    """
+
+    return codec.dumps([fn(o) for o in codec.loads(data)])
+
+
+def _match_chunk(pattern, data):
+    """ Matches a pattern against an encoded chunk in a worker process.
+
+    :param pattern: Pattern to match.
+    :type pattern: extractor.Extractor
+
+    :param data: Encoded list of items.
+    :type data: bytes
+
+    :rtype: bytes
+    """
+
+    matches = []
+
+    for (position, o) in enumerate(codec.loads(data)):
+        try:
+            matches.append((position, pattern._extract(o, dict())))
+        except exceptions.ExtractorDoesNotMatch:
+            pass
+
+    return codec.dumps(matches)
+
+
+__all__ = ["CHUNK_SIZE", "IN_FLIGHT", "parallel_map", "parallel_match"]
@@ -0,0 +1,919 @@
+"""
+Persistent collections for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class
+
+# number of bits used per level of the tries
+_BITS = 5
+
+# number of children of every node
+_WIDTH = 1 << _BITS
+
+# mask extracting the index of a child from a hash or an index
+_MASK = _WIDTH - 1
+
+# number of bits of the hashes of keys in a PMap
+_HASH_MASK = (1 << 64) - 1
+
+# marker stored instead of a key in a PMap node for a child node
+_NODE = object()
+
+# marker for missing values
+_MISSING = object()
+
+
+class PVector(object):
+    """ An immutable sequence with efficient updates. It is stored as a
+    trie of nodes with 32 children (plus a separate tail node), so that
+    getting, setting and appending elements takes O(log n) time and copies
+    only the nodes on one path. All other nodes are shared between the old
+    and the new vector.
+
+    The hash of a vector is the sum of the hashes of its elements and their
+    indexes, which is updated along with every change instead of being
+    recomputed. Vectors can be passed to CaseClass instances and are
+    compared structurally, but they are only equal to other vectors. """
+
+    __slots__ = ['_PVector__count', '_PVector__shift', '_PVector__root',
+                 '_PVector__tail', '_PVector__hash', '__weakref__']
+
+    def __init__(self, iterable=()):
+        """ Creates a new PVector() instance.
+
+        :param iterable: Optional. Elements of the vector.
+        :type iterable: iterable
+        """
+
+        items = list(iterable)
+        count = len(items)
+        tailoff = _tailoff(count)
+
+        # group the elements outside of the tail into leaves, and the nodes
+        # of each level into the nodes of the level above
+        nodes = [items[i:i + _WIDTH] for i in range(0, tailoff, _WIDTH)]
+        shift = _BITS
+
+        while len(nodes) > _WIDTH:
+            nodes = [nodes[i:i + _WIDTH] for i in range(0, len(nodes),
+                                                         _WIDTH)]
+            shift += _BITS
+
+        self.__count = count
+        self.__shift = shift
+        self.__root = nodes
+        self.__tail = items[tailoff:]
+        self.__hash = _sum_hashes(enumerate(items))
+
+    @staticmethod
+    def __make(count, shift, root, tail, total):
+        """ Creates a PVector from its parts.
+
+        :rtype: PVector
+        """
+
+        vector = PVector.__new__(PVector)
+        vector.__count = count
+        vector.__shift = shift
+        vector.__root = root
+        vector.__tail = tail
+        vector.__hash = total
+
+        return vector
+
+    def __len__(self):
+        return self.__count
+
+    def __leaf(self, i):
+        """ Returns the leaf (or the tail) containing an index.
+
+        :param i: Index of the element.
+        :type i: int
+
+        :rtype: list
+        """
+
+        if i >= _tailoff(self.__count):
+            return self.__tail
+
+        node = self.__root
+        level = self.__shift
+
+        while level > 0:
+            node = node[(i >> level) & _MASK]
+            level -= _BITS
+
+        return node
+
+    def __index(self, i):
+        """ Normalises an index and raises IndexError if it is out of range.
+
+        :param i: Index to normalise.
+        :type i: int
+
+        :rtype: int
+        """
+
+        if i < 0:
+            i += self.__count
+
+        if not 0 <= i < self.__count:
+            raise IndexError("PVector index out of range")
+
+        return i
+
+    def __getitem__(self, i):
+        """ Returns the element at an index, or a new PVector for a slice.
+
+        :param i: Index or slice.
+        :type i: int
+
+        :rtype: object
+        """
+
+        if isinstance(i, slice):
+            return PVector(list(self)[i])
+
+        i = self.__index(i)
+        return self.__leaf(i)[i & _MASK]
+
+    def __iter__(self):
+        """ Iterates over the elements of this vector, one leaf at a time.
+
+        :rtype: generator
+        """
+
+        for start in range(0, self.__count, _WIDTH):
+            for value in self.__leaf(start):
+                yield value
+
+    def set(self, i, value):
+        """ Returns a new PVector with the element at an index replaced.
+
+        :param i: Index of the element to replace.
+        :type i: int
+
+        :param value: New value of the element.
+        :type value: object
+
+        :rtype: PVector
+        """
+
+        i = self.__index(i)
+        total = _update_hash(self.__hash, (i, self.__leaf(i)[i & _MASK]),
+                             (i, value))
+
+        if i >= _tailoff(self.__count):
+            tail = list(self.__tail)
+            tail[i & _MASK] = value
+            return PVector.__make(self.__count, self.__shift, self.__root,
+                                  tail, total)
+
+        root = _assoc_path(self.__shift, self.__root, i, value)
+        return PVector.__make(self.__count, self.__shift, root, self.__tail,
+                              total)
+
+    def append(self, value):
+        """ Returns a new PVector with an element added at the end.
+
+        :param value: Element to add.
+        :type value: object
+
+        :rtype: PVector
+        """
+
+        count = self.__count
+        total = _update_hash(self.__hash, None, (count, value))
+
+        # there is room in the tail
+        if count - _tailoff(count) < _WIDTH:
+            return PVector.__make(count + 1, self.__shift, self.__root,
+                                  self.__tail + [value], total)
+
+        # otherwise move the tail into the trie, adding a level if it is full
+        shift = self.__shift
+
+        if (count >> _BITS) > (1 << shift):
+            root = [self.__root, _new_path(shift, self.__tail)]
+            shift += _BITS
+        else:
+            root = _push_tail(count, shift, self.__root, self.__tail)
+
+        return PVector.__make(count + 1, shift, root, [value], total)
+
+    def extend(self, iterable):
+        """ Returns a new PVector with elements added at the end.
+
+        :param iterable: Elements to add.
+        :type iterable: iterable
+
+        :rtype: PVector
+        """
+
+        vector = self
+        for value in iterable:
+            vector = vector.append(value)
+
+        return vector
+
+    def pop(self):
+        """ Returns a new PVector with the last element removed.
+
+        :raises: IndexError
+
+        :rtype: PVector
+        """
+
+        count = self.__count
+
+        if count == 0:
+            raise IndexError("pop from empty PVector")
+
+        if count == 1:
+            return PVector()
+
+        total = _update_hash(self.__hash, (count - 1, self.__tail[-1]), None)
+
+        if count - _tailoff(count) > 1:
+            return PVector.__make(count - 1, self.__shift, self.__root,
+                                  self.__tail[:-1], total)
+
+        # the tail becomes empty, so the last leaf becomes the new tail
+        tail = self.__leaf(count - 2)
+        root = _pop_tail(count, self.__shift, self.__root)
+        shift = self.__shift
+
+        if root is None:
+            root = []
+
+        if shift > _BITS and len(root) == 1:
+            root = root[0]
+            shift -= _BITS
+
+        return PVector.__make(count - 1, shift, root, tail, total)
+
+    def __add__(self, other):
+        if not isinstance(other, PVector):
+            return NotImplemented
+
+        return self.extend(other)
+
+    def __eq__(self, other):
+        """ Checks if this PVector is equal to another one. Vectors are only
+        equal to other vectors.
+
+        :param other: Object to compare with.
+        :type other: object
+
+        :rtype: bool
+        """
+
+        if self is other:
+            return True
+
+        if not isinstance(other, PVector):
+            return NotImplemented
+
+        if len(self) != len(other) or hash(self) != hash(other):
+            return False
+
+        return case_class.CaseClassMeta.equals(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+
+        if equal is NotImplemented:
+            return equal
+
+        return not equal
+
+    def __hash__(self):
+        """ Returns the hash of this PVector.
+
+        :rtype: int
+        """
+
+        return hash((PVector, self.__hash))
+
+    def __reduce__(self):
+        return (PVector, (list(self),))
+
+    def __repr__(self):
+        return 'PVector(%r)' % (list(self),)
+
+
+class PMap(object):
+    """ An immutable mapping with efficient updates. It is stored as a hash
+    array mapped trie, so that getting, setting and removing keys takes
+    O(log n) time and copies only the nodes on one path. All other nodes
+    are shared between the old and the new map.
+
+    Keys have to be hashable. The hash of a map is the sum of the hashes of
+    its items, which is updated along with every change instead of being
+    recomputed. Maps can be passed to CaseClass instances and are compared
+    structurally, but they are only equal to other maps. """
+
+    __slots__ = ['_PMap__count', '_PMap__root', '_PMap__hash',
+                 '__weakref__']
+
+    def __init__(self, mapping=None, **kwargs):
+        """ Creates a new PMap() instance.
+
+        :param mapping: Optional. Dictionary or iterable of pairs (key, value)
+        to create the map from.
+        :type mapping: dict
+
+        :param kwargs: Further items of the map.
+        :type kwargs: dict
+        """
+
+        self.__count = 0
+        self.__root = None
+
+        if mapping is not None:
+            items = mapping.items() if hasattr(mapping, 'items') else mapping
+            for (k, v) in items:
+                self.__set(k, v)
+
+        for k in kwargs:
+            self.__set(k, kwargs[k])
+
+        self.__hash = _sum_hashes(self.items())
+
+    def __set(self, key, value):
+        """ Sets a key while creating this PMap.
+
+        :param key: Key to set.
+        :type key: object
+
+        :param value: Value to set.
+        :type value: object
+        """
+
+        (self.__root, added) = _map_assoc(self.__root, 0, _key_hash(key), key,
+                                          value)
+        if added:
+            self.__count += 1
+
+    @staticmethod
+    def __make(count, root, total):
+        """ Creates a PMap from its parts.
+
+        :rtype: PMap
+        """
+
+        pmap = PMap.__new__(PMap)
+        pmap.__count = count
+        pmap.__root = root
+        pmap.__hash = total
+
+        return pmap
+
+    def __len__(self):
+        return self.__count
+
+    def get(self, key, default=None):
+        """ Returns the value of a key, or a default if it does not exist.
+
+        :param key: Key to get value of.
+        :type key: object
+
+        :param default: Optional. Value to return if the key does not exist.
+        :type default: object
+
+        :rtype: object
+        """
+
+        value = _map_find(self.__root, _key_hash(key), key)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key):
+        value = _map_find(self.__root, _key_hash(key), key)
+
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key):
+        return _map_find(self.__root, _key_hash(key), key) is not _MISSING
+
+    def items(self):
+        """ Generates the pairs (key, value) of this map.
+
+        :rtype: generator
+        """
+
+        stack = [self.__root] if self.__root is not None else []
+
+        while stack:
+            node = stack.pop()
+
+            if isinstance(node, _CollisionNode):
+                for item in node.items:
+                    yield item
+                continue
+
+            array = node.array
+            for i in range(0, len(array), 2):
+                if array[i] is _NODE:
+                    stack.append(array[i + 1])
+                else:
+                    yield (array[i], array[i + 1])
+
+    def keys(self):
+        """ Generates the keys of this map.
+
+        :rtype: generator
+        """
+
+        for (k, v) in self.items():
+            yield k
+
+    def values(self):
+        """ Generates the values of this map.
+
+        :rtype: generator
+        """
+
+        for (k, v) in self.items():
+            yield v
+
+    def __iter__(self):
+        return self.keys()
+
+    def set(self, key, value):
+        """ Returns a new PMap with a key set to a value.
+
+        :param key: Key to set.
+        :type key: object
+
+        :param value: Value to set.
+        :type value: object
+
+        :rtype: PMap
+        """
+
+        h = _key_hash(key)
+        old = _map_find(self.__root, h, key)
+
+        (root, added) = _map_assoc(self.__root, 0, h, key, value)
+
+        if root is self.__root:
+            return self
+
+        total = _update_hash(self.__hash, None if added else (key, old),
+                             (key, value))
+
+        return PMap.__make(self.__count + (1 if added else 0), root, total)
+
+    def update(self, mapping):
+        """ Returns a new PMap with the items of a dictionary set.
+
+        :param mapping: Dictionary or iterable of pairs (key, value).
+        :type mapping: dict
+
+        :rtype: PMap
+        """
+
+        pmap = self
+        items = mapping.items() if hasattr(mapping, 'items') else mapping
+
+        for (k, v) in items:
+            pmap = pmap.set(k, v)
+
+        return pmap
+
+    def remove(self, key):
+        """ Returns a new PMap without a key.
+
+        :raises: KeyError
+
+        :param key: Key to remove.
+        :type key: object
+
+        :rtype: PMap
+        """
+
+        h = _key_hash(key)
+        old = _map_find(self.__root, h, key)
+
+        if old is _MISSING:
+            raise KeyError(key)
+
+        root = _map_without(self.__root, 0, h, key)
+        total = _update_hash(self.__hash, (key, old), None)
+
+        return PMap.__make(self.__count - 1, root, total)
+
+    def discard(self, key):
+        """ Returns a new PMap without a key, or this PMap if it does not
+        contain the key.
+
+        :param key: Key to remove.
+        :type key: object
+
+        :rtype: PMap
+        """
+
+        try:
+            return self.remove(key)
+        except KeyError:
+            return self
+
+    def __eq__(self, other):
+        """ Checks if this PMap is equal to another one. Maps are only equal
+        to other maps.
+
+        :param other: Object to compare with.
+        :type other: object
+
+        :rtype: bool
+        """
+
+        if self is other:
+            return True
+
+        if not isinstance(other, PMap):
+            return NotImplemented
+
+        if len(self) != len(other) or hash(self) != hash(other):
+            return False
+
+        return case_class.CaseClassMeta.equals(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+
+        if equal is NotImplemented:
+            return equal
+
+        return not equal
+
+    def __hash__(self):
+        """ Returns the hash of this PMap.
+
+        :rtype: int
+        """
+
+        return hash((PMap, self.__hash))
+
+    def __reduce__(self):
+        return (PMap, (dict(self.items()),))
+
+    def __repr__(self):
+        return 'PMap(%r)' % (dict(self.items()),)
+
+
+#
+# Internal helpers
+#
+
+def _entry_hash(entry):
+    """ Returns the hash of a pair (index, element) of a PVector or a pair
+    (key, value) of a PMap.
+
+    :param entry: Pair to get hash of.
+    :type entry: tuple
+
+    :rtype: int
+    """
+
+    return hash((entry[0], case_class.CaseClassMeta.hash_value(entry[1])))
+
+
+def _sum_hashes(entries):
+    """ Returns the sum of the hashes of pairs, see _entry_hash.
+
+    :param entries: Pairs to sum hashes of.
+    :type entries: iterable
+
+    :rtype: int
+    """
+
+    return sum(_entry_hash(e) for e in entries) & _HASH_MASK
+
+
+def _update_hash(total, removed, added):
+    """ Updates the sum of the hashes of pairs when one pair is replaced.
+
+    :param total: Sum of the hashes before the change.
+    :type total: int
+
+    :param removed: Pair that was removed or None.
+    :type removed: tuple
+
+    :param added: Pair that was added or None.
+    :type added: tuple
+
+    :rtype: int
+    """
+
+    if removed is not None:
+        total -= _entry_hash(removed)
+
+    if added is not None:
+        total += _entry_hash(added)
+
+    return total & _HASH_MASK
+
+
+def _tailoff(count):
+    """ Returns the index of the first element in the tail of a PVector.
+
+    :param count: Number of elements of the vector.
+    :type count: int
+
+    :rtype: int
+    """
+
+    if count < _WIDTH:
+        return 0
+
+    return ((count - 1) >> _BITS) << _BITS
+
+
+def _new_path(level, node):
+    """ Wraps a leaf into nodes down from a level.
+
+    :rtype: list
+    """
+
+    while level > 0:
+        node = [node]
+        level -= _BITS
+
+    return node
+
+
+def _push_tail(count, level, parent, tail):
+    """ Returns a copy of a node of a PVector with count elements, with the
+    tail added as the last leaf below it.
+
+    :rtype: list
+    """
+
+    idx = ((count - 1) >> level) & _MASK
+    node = list(parent)
+
+    if level == _BITS:
+        node.append(tail)
+    elif idx < len(parent):
+        node[idx] = _push_tail(count, level - _BITS, parent[idx], tail)
+    else:
+        node.append(_new_path(level - _BITS, tail))
+
+    return node
+
+
+def _pop_tail(count, level, node):
+    """ Returns a copy of a node of a PVector with count elements, without
+    its last leaf, or None if the node becomes empty.
+
+    :rtype: list
+    """
+
+    idx = ((count - 2) >> level) & _MASK
+
+    if level > _BITS:
+        child = _pop_tail(count, level - _BITS, node[idx])
+
+        if child is None and idx == 0:
+            return None
+
+        if child is None:
+            return node[:idx]
+
+        node = list(node)
+        node[idx] = child
+        return node
+
+    if idx == 0:
+        return None
+
+    return node[:idx]
+
+
+def _assoc_path(level, node, i, value):
+    """ Returns a copy of a node of a PVector with an element replaced.
+
+    :rtype: list
+    """
+
+    node = list(node)
+
+    if level == 0:
+        node[i & _MASK] = value
+    else:
+        idx = (i >> level) & _MASK
+        node[idx] = _assoc_path(level - _BITS, node[idx], i, value)
+
+    return node
+
+
+def _key_hash(key):
+    """ Returns the hash of a key of a PMap.
+
+    :rtype: int
+    """
+
+    return hash(key) & _HASH_MASK
+
+
+def _popcount(n):
+    """ Counts the bits set in an integer.
+
+    :rtype: int
+    """
+
+    return bin(n).count('1')
+
+
+class _BitmapNode(object):
+    """ A node of a PMap. The bitmap has a bit set for every child that
+    exists, the array holds key and value for every child, where the key is
+    _NODE if the value is a child node. """
+
+    __slots__ = ['bitmap', 'array']
+
+    def __init__(self, bitmap, array):
+        self.bitmap = bitmap
+        self.array = array
+
+
+class _CollisionNode(object):
+    """ A node of a PMap holding keys with the same hash. """
+
+    __slots__ = ['hash', 'items']
+
+    def __init__(self, h, items):
+        self.hash = h
+        self.items = items
+
+
+def _map_find(node, h, key):
+    """ Finds the value of a key in a PMap node, or returns _MISSING.
+
+    :rtype: object
+    """
+
+    shift = 0
+
+    while node is not None:
+        if isinstance(node, _CollisionNode):
+            for (k, v) in node.items:
+                if k == key:
+                    return v
+            return _MISSING
+
+        bit = 1 << ((h >> shift) & _MASK)
+        if not node.bitmap & bit:
+            return _MISSING
+
+        idx = 2 * _popcount(node.bitmap & (bit - 1))
+        (k, v) = (node.array[idx], node.array[idx + 1])
+
+        if k is _NODE:
+            node = v
+            shift += _BITS
+        elif k == key:
+            return v
+        else:
+            return _MISSING
+
+    return _MISSING
+
+
+def _map_merge(shift, h1, k1, v1, h2, k2, v2):
+    """ Creates a node holding two keys.
+
+    :rtype: object
+    """
+
+    if h1 == h2:
+        return _CollisionNode(h1, [(k1, v1), (k2, v2)])
+
+    (i1, i2) = ((h1 >> shift) & _MASK, (h2 >> shift) & _MASK)
+
+    if i1 == i2:
+        return _BitmapNode(1 << i1, [_NODE, _map_merge(
+            shift + _BITS, h1, k1, v1, h2, k2, v2)])
+
+    if i1 < i2:
+        return _BitmapNode((1 << i1) | (1 << i2), [k1, v1, k2, v2])
+
+    return _BitmapNode((1 << i1) | (1 << i2), [k2, v2, k1, v1])
+
+
+def _map_assoc(node, shift, h, key, value):
+    """ Returns a copy of a PMap node with a key set, and whether the key
+    was added. Returns the node itself if nothing changed.
+
+    :rtype: tuple
+    """
+
+    if node is None:
+        return (_BitmapNode(1 << ((h >> shift) & _MASK), [key, value]), True)
+
+    if isinstance(node, _CollisionNode):
+        if h != node.hash:
+            # move the collision node one level down
+            wrapper = _BitmapNode(1 << ((node.hash >> shift) & _MASK),
+                                  [_NODE, node])
+            return _map_assoc(wrapper, shift, h, key, value)
+
+        items = list(node.items)
+        for (i, (k, v)) in enumerate(items):
+            if k == key:
+                if v is value:
+                    return (node, False)
+                items[i] = (key, value)
+                return (_CollisionNode(h, items), False)
+
+        items.append((key, value))
+        return (_CollisionNode(h, items), True)
+
+    bit = 1 << ((h >> shift) & _MASK)
+    idx = 2 * _popcount(node.bitmap & (bit - 1))
+    array = node.array
+
+    if not node.bitmap & bit:
+        return (_BitmapNode(node.bitmap | bit,
+                            array[:idx] + [key, value] + array[idx:]), True)
+
+    (k, v) = (array[idx], array[idx + 1])
+
+    if k is _NODE:
+        (child, added) = _map_assoc(v, shift + _BITS, h, key, value)
+        if child is v:
+            return (node, False)
+        (new_key, new_value) = (_NODE, child)
+
+    elif k == key:
+        if v is value:
+            return (node, False)
+        (added, new_key, new_value) = (False, key, value)
+
+    else:
+        child = _map_merge(shift + _BITS, _key_hash(k), k, v, h, key, value)
+        (added, new_key, new_value) = (True, _NODE, child)
+
+    array = list(array)
+    array[idx] = new_key
+    array[idx + 1] = new_value
+
+    return (_BitmapNode(node.bitmap, array), added)
+
+
+def _map_without(node, shift, h, key):
+    """ Returns a copy of a PMap node without a key, or None if the node
+    becomes empty. Returns the node itself if it does not contain the key.
+
+    :rtype: object
+    """
+
+    if node is None:
+        return None
+
+    if isinstance(node, _CollisionNode):
+        items = [(k, v) for (k, v) in node.items if k != key]
+
+        if len(items) == len(node.items):
+            return node
+        if len(items) == 1:
+            ((k, v),) = items
+            return _BitmapNode(1 << ((node.hash >> shift) & _MASK), [k, v])
+
+        return _CollisionNode(node.hash, items)
+
+    bit = 1 << ((h >> shift) & _MASK)
+    if not node.bitmap & bit:
+        return node
+
+    idx = 2 * _popcount(node.bitmap & (bit - 1))
+    array = node.array
+    (k, v) = (array[idx], array[idx + 1])
+
+    if k is _NODE:
+        child = _map_without(v, shift + _BITS, h, key)
+        if child is v:
+            return node
+
+        if child is not None:
+            array = list(array)
+            array[idx + 1] = child
+            return _BitmapNode(node.bitmap, array)
+
+    elif k != key:
+        return node
+
+    # remove the entry
+    if node.bitmap == bit:
+        return None
+
+    return _BitmapNode(node.bitmap ^ bit, array[:idx] + array[idx + 2:])
+
+
+__all__ = ["PVector", "PMap"]
@@ -0,0 +1,938 @@
+"""
+Column-wise queries for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import collections
+import itertools
+import numbers
+import operator
+
+from . import case_class, columnar, exceptions, fieldindex
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# comparison operators by name
+_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+              '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+#
+# Predicates
+#
+
+class Predicate(case_class.AbstractCaseClass):
+    """ A condition on the parameters of the rows of a query. Predicates are
+    built from fields (see field) and combined with &, | and ~. """
+
+    def __and__(self, other):
+        """ Returns a predicate matching rows that match both this and
+        another predicate.
+
+        :param other: Predicate to combine with.
+        :type other: Predicate
+
+        :rtype: And
+        """
+
+        return And(self, other)
+
+    def __or__(self, other):
+        """ Returns a predicate matching rows that match this or another
+        predicate.
+
+        :param other: Predicate to combine with.
+        :type other: Predicate
+
+        :rtype: Or
+        """
+
+        return Or(self, other)
+
+    def __invert__(self):
+        """ Returns a predicate matching rows that do not match this
+        predicate.
+
+        :rtype: Not
+        """
+
+        return Not(self)
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        raise NotImplementedError
+
+    def instances(self, cls):
+        """ Generates the interned instances of a class that match this
+        predicate. If the predicate constrains a parameter with a secondary
+        index (see fieldindex), only the instances found in the index are
+        checked, otherwise all instances are.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param cls: Class to get instances of.
+        :type cls: type
+
+        :rtype: generator
+        """
+
+        candidates = _candidates(cls, self)
+        if candidates is None:
+            candidates = cls.instances()
+
+        for instance in candidates:
+            if self.matches(instance):
+                yield instance
+
+
+class Compare(Predicate):
+    """ A predicate comparing a parameter to a value. """
+
+    def __init__(self, name, op, value):
+        """ Creates a new Compare() instance.
+
+        :param name: Name of the parameter to compare.
+        :type name: str
+
+        :param op: Operator, one of '==', '!=', '<', '<=', '>' and '>='.
+        :type op: str
+
+        :param value: Value to compare with.
+        :type value: object
+        """
+
+        if op not in _OPERATORS:
+            raise ValueError("Unknown operator %r" % (op,))
+
+        self.name = name
+        self.op = op
+        self.value = value
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return _compare(_OPERATORS[self.op], _value(instance, self.name),
+                        self.value)
+
+
+class Between(Predicate):
+    """ A predicate checking that a parameter lies within a closed
+    range. """
+
+    def __init__(self, name, low, high):
+        """ Creates a new Between() instance.
+
+        :param name: Name of the parameter to check.
+        :type name: str
+
+        :param low: Smallest value in the range.
+        :type low: object
+
+        :param high: Largest value in the range.
+        :type high: object
+        """
+
+        self.name = name
+        self.low = low
+        self.high = high
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return _between(self.low, _value(instance, self.name), self.high)
+
+
+class IsIn(Predicate):
+    """ A predicate checking that a parameter is one of a set of values. """
+
+    def __init__(self, name, values):
+        """ Creates a new IsIn() instance.
+
+        :param name: Name of the parameter to check.
+        :type name: str
+
+        :param values: Values to check for.
+        :type values: tuple
+        """
+
+        self.name = name
+        self.values = values
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return _value(instance, self.name) in self.values
+
+
+class And(Predicate):
+    """ A predicate matching rows that match both of two predicates. """
+
+    def __init__(self, left, right):
+        """ Creates a new And() instance.
+
+        :param left: First predicate.
+        :type left: Predicate
+
+        :param right: Second predicate.
+        :type right: Predicate
+        """
+
+        self.left = left
+        self.right = right
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return self.left.matches(instance) and self.right.matches(instance)
+
+
+class Or(Predicate):
+    """ A predicate matching rows that match one of two predicates. """
+
+    def __init__(self, left, right):
+        """ Creates a new Or() instance.
+
+        :param left: First predicate.
+        :type left: Predicate
+
+        :param right: Second predicate.
+        :type right: Predicate
+        """
+
+        self.left = left
+        self.right = right
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return self.left.matches(instance) or self.right.matches(instance)
+
+
+class Not(Predicate):
+    """ A predicate matching rows that do not match another predicate. """
+
+    def __init__(self, predicate):
+        """ Creates a new Not() instance.
+
+        :param predicate: Predicate to negate.
+        :type predicate: Predicate
+        """
+
+        self.predicate = predicate
+
+    def matches(self, instance):
+        """ Checks if a single instance matches this predicate. Values that
+        can not be compared do not match.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param instance: Instance to check.
+        :type instance: case_class.CaseClass
+
+        :rtype: bool
+        """
+
+        return not self.predicate.matches(instance)
+
+
+class Field(object):
+    """ A reference to a parameter within a query, which builds predicates
+    using comparison operators, e.g. field('src') == 1. """
+
+    def __init__(self, name):
+        """ Creates a new Field() instance.
+
+        :param name: Name of the parameter.
+        :type name: str
+        """
+
+        self.name = name
+
+    def __eq__(self, value):
+        """ Returns a predicate checking that this parameter equals a
+        value.
+
+        :param value: Value to compare with.
+        :type value: object
+
+        :rtype: Compare
+        """
+
+        return Compare(self.name, '==', value)
+
+    def __ne__(self, value):
+        """ Returns a predicate checking that this parameter does not equal a
+        value.
+
+        :param value: Value to compare with.
+        :type value: object
+
+        :rtype: Compare
+        """
+
+        return Compare(self.name, '!=', value)
+
+    def __lt__(self, value):
+        """ Returns a predicate checking that this parameter is less than a
+        value.
+
+        :param value: Value to compare with.
+        :type value: object
+
+        :rtype: Compare
+        """
+
+        return Compare(self.name, '<', value)
+
+    def __le__(self, value):
+        """ Returns a predicate checking that this parameter is less than or
+        equal to a value.
+
+        :param value: Value to compare with.
+        :type value: object
+
+        :rtype: Compare
+        """
+
+        return Compare(self.name, '<=', value)
+
+    def __gt__(self, value):
+        """ Returns a predicate checking that this parameter is greater than a
+        value.
+
+        :param value: Value to compare with.
+        :type value: object
+
+        :rtype: Compare
+        """
+
+        return Compare(self.name, '>', value)
+
+    def __ge__(self, value):
+        """ Returns a predicate checking that this parameter is greater than or
+        equal to a value.
+
+        :param value: Value to compare with.
+        :type value: object
+
+        :rtype: Compare
+        """
+
+        return Compare(self.name, '>=', value)
+
+    __hash__ = None
+
+    def between(self, low, high):
+        """ Returns a predicate checking that this parameter lies within a
+        closed range.
+
+        :param low: Smallest value in the range.
+        :type low: object
+
+        :param high: Largest value in the range.
+        :type high: object
+
+        :rtype: Between
+        """
+
+        return Between(self.name, low, high)
+
+    def isin(self, values):
+        """ Returns a predicate checking that this parameter is one of a set
+        of values.
+
+        :param values: Values to check for.
+        :type values: iterable
+
+        :rtype: IsIn
+        """
+
+        return IsIn(self.name, tuple(values))
+
+    def __repr__(self):
+        return 'field(%r)' % (self.name,)
+
+
+def field(name):
+    """ Returns a reference to a parameter, used to build predicates.
+
+    :param name: Name of the parameter.
+    :type name: str
+
+    :rtype: Field
+    """
+
+    return Field(name)
+
+
+#
+# Queries
+#
+
+class Query(object):
+    """ A query over a collection of instances of a flat CaseClass stored
+    column-wise.
+
+    Predicates are evaluated one column at a time, using NumPy for numeric
+    columns if it is available, and instances are only created for the
+    rows that match. Queries are immutable, where() returns a new query.
+    """
+
+    def __init__(self, source, predicate=None):
+        """ Creates a new Query() instance.
+
+        :param source: Collection to query. Lists of instances are turned
+        into a columnar.CaseClassArray.
+        :type source: columnar.CaseClassArray
+
+        :param predicate: Optional. Predicate rows have to match.
+        :type predicate: Predicate
+        """
+
+        if not isinstance(source, columnar.CaseClassArray):
+            source = list(source)
+            if not source:
+                raise exceptions.CodecException(
+                    "Can not query an empty list of instances")
+            source = columnar.CaseClassArray.from_instances(
+                source[0].__class__, source)
+
+        self.__source = source
+        self.__predicate = predicate
+
+        # matching row indices, computed on first use
+        self.__indices = None
+
+    @property
+    def source(self):
+        """ The collection this query runs on.
+
+        :rtype: columnar.CaseClassArray
+        """
+
+        return self.__source
+
+    def where(self, *predicates):
+        """ Returns a new query that also requires rows to match all of the
+        given predicates.
+
+        :param predicates: Predicates rows have to match.
+        :type predicates: list
+
+        :rtype: Query
+        """
+
+        predicate = self.__predicate
+
+        for p in predicates:
+            if not isinstance(p, Predicate):
+                raise TypeError("Expected a Predicate, got %r" % (p,))
+            predicate = p if predicate is None else And(predicate, p)
+
+        return Query(self.__source, predicate)
+
+    def indices(self):
+        """ Returns the indices of the matching rows, in order.
+
+        :rtype: list
+        """
+
+        if self.__indices is None:
+            n = len(self.__source)
+
+            if self.__predicate is None:
+                self.__indices = list(range(n))
+            else:
+                mask = _Evaluator(self.__source).mask(self.__predicate)
+                if numpy is not None:
+                    self.__indices = numpy.flatnonzero(mask).tolist()
+                else:
+                    self.__indices = list(itertools.compress(range(n), mask))
+
+        return self.__indices
+
+    def count(self):
+        """ Returns the number of matching rows.
+
+        :rtype: int
+        """
+
+        return len(self.indices())
+
+    def array(self):
+        """ Returns the matching rows as a new CaseClassArray.
+
+        :rtype: columnar.CaseClassArray
+        """
+
+        return self.__source.take(self.indices())
+
+    def instances(self):
+        """ Generates the (interned) instances of the matching rows.
+
+        :rtype: generator
+        """
+
+        return iter(self.array())
+
+    def select(self, *names):
+        """ Returns the values of some parameters of the matching rows,
+        without creating instances.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param names: Names of the parameters to select.
+        :type names: list
+
+        :return: a list of tuples of values
+        :rtype: list
+        """
+
+        indices = self.indices()
+        columns = [self.__source.column(n) for n in names]
+
+        return [tuple(c[i] for c in columns) for i in indices]
+
+    def group_count(self, *names):
+        """ Counts the matching rows by the values of some parameters.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param names: Names of the parameters to group by.
+        :type names: list
+
+        :return: a dictionary mapping values (or tuples of values if more
+        than one name is given) to numbers of rows
+        :rtype: dict
+        """
+
+        indices = self.indices()
+
+        if len(names) == 1:
+            column = self.__source.column(names[0])
+
+            if numpy is not None:
+                values = _numeric_array(column)
+                if values is not None:
+                    (keys, counts) = numpy.unique(values[indices],
+                                                  return_counts=True)
+                    return dict(zip(keys.tolist(), counts.tolist()))
+
+            return dict(collections.Counter(column[i] for i in indices))
+
+        return dict(collections.Counter(self.select(*names)))
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self.instances()
+
+    def __repr__(self):
+        return 'Query(%r, %r)' % (self.__source, self.__predicate)
+
+
+def query(source):
+    """ Returns a query matching all rows of a collection.
+
+    :param source: Collection to query, a CaseClassArray or a list of
+    instances of a flat CaseClass.
+    :type source: columnar.CaseClassArray
+
+    :rtype: Query
+    """
+
+    return Query(source)
+
+
+#
+# Internal helpers
+#
+
+def _numeric_array(column):
+    """ Turns a column into a NumPy array if all values are integers, floats
+    or booleans of the same type, and returns None otherwise.
+
+    :param column: Column to convert.
+    :type column: list
+
+    :rtype: numpy.ndarray
+    """
+
+    types = set(map(type, column))
+
+    if len(types) != 1 or types.pop() not in (int, float, bool):
+        return None
+
+    try:
+        return numpy.asarray(column)
+    except OverflowError:
+        return None
+
+
+def _is_number(value):
+    """ Checks if a value can be compared with a numeric NumPy array.
+
+    :param value: Value to check.
+    :type value: object
+
+    :rtype: bool
+    """
+
+    return isinstance(value, numbers.Real)
+
+
+def _value(instance, name):
+    """ Returns the value of a parameter of an instance.
+
+    :raises: exceptions.NoSuchArgument
+
+    :param instance: Instance to get value of.
+    :type instance: case_class.CaseClass
+
+    :param name: Name of the parameter.
+    :type name: str
+
+    :rtype: object
+    """
+
+    try:
+        return instance.case_signature[name]
+    except KeyError:
+        raise exceptions.NoSuchArgument(name)
+
+
+def _compare(op, value, other):
+    """ Compares two values, where values that can not be compared do not
+    match.
+
+    :param op: Comparison operator.
+    :type op: callable
+
+    :param value: Value of the parameter.
+    :type value: object
+
+    :param other: Value to compare with.
+    :type other: object
+
+    :rtype: bool
+    """
+
+    try:
+        return bool(op(value, other))
+    except TypeError:
+        return False
+
+
+def _between(low, value, high):
+    """ Checks if a value lies within a closed range, where values that can
+    not be compared do not match.
+
+    :param low: Smallest value in the range.
+    :type low: object
+
+    :param value: Value of the parameter.
+    :type value: object
+
+    :param high: Largest value in the range.
+    :type high: object
+
+    :rtype: bool
+    """
+
+    try:
+        return bool(low <= value <= high)
+    except TypeError:
+        return False
+
+
+def _is_in(value, lookup, values):
+    """ Checks if a value is one of a tuple of values, using a set of the
+    values if the value is hashable.
+
+    :param value: Value of the parameter.
+    :type value: object
+
+    :param lookup: Set of the values or the values themselves.
+    :type lookup: frozenset
+
+    :param values: Values to check for.
+    :type values: tuple
+
+    :rtype: bool
+    """
+
+    try:
+        return value in lookup
+    except TypeError:
+        return value in values
+
+
+def _union(lists):
+    """ Returns the distinct instances in a list of lists, in order.
+
+    :param lists: Lists of instances.
+    :type lists: list
+
+    :rtype: list
+    """
+
+    seen = set()
+    union = []
+
+    for instances in lists:
+        for i in instances:
+            if id(i) not in seen:
+                seen.add(id(i))
+                union.append(i)
+
+    return union
+
+
+def _candidates(cls, predicate):
+    """ Finds the instances of a class that may match a predicate using the
+    secondary indexes of the class, or returns None if no index can be
+    used. The candidates still have to be checked against the predicate.
+
+    :param cls: Class to find instances of.
+    :type cls: type
+
+    :param predicate: Predicate to find candidates for.
+    :type predicate: Predicate
+
+    :rtype: list
+    """
+
+    if isinstance(predicate, And):
+        found = [c for c in (_candidates(cls, predicate.left),
+                             _candidates(cls, predicate.right))
+                 if c is not None]
+        return min(found, key=len) if found else None
+
+    elif isinstance(predicate, Or):
+        found = [_candidates(cls, predicate.left),
+                 _candidates(cls, predicate.right)]
+        return None if None in found else _union(found)
+
+    elif isinstance(predicate, Not):
+        return None
+
+    name = predicate.name
+
+    if isinstance(predicate, Compare):
+        if predicate.op == '==':
+            index = fieldindex.get_index(cls, name)
+            return None if index is None else index.lookup(predicate.value)
+
+        index = fieldindex.get_index(cls, name, fieldindex.SORTED)
+        if index is None or predicate.op == '!=':
+            return None
+
+        try:
+            if predicate.op in ('<', '<='):
+                return index.range(high=predicate.value,
+                                   include_high=predicate.op == '<=')
+            return index.range(low=predicate.value,
+                               include_low=predicate.op == '>=')
+        except TypeError:
+            return None
+
+    elif isinstance(predicate, Between):
+        index = fieldindex.get_index(cls, name, fieldindex.SORTED)
+        if index is None:
+            return None
+
+        try:
+            return index.range(predicate.low, predicate.high)
+        except TypeError:
+            return None
+
+    elif isinstance(predicate, IsIn):
+        index = fieldindex.get_index(cls, name)
+        if index is None:
+            return None
+
+        return _union(index.lookup(v) for v in predicate.values)
+
+    return None
+
+
+class _Evaluator(object):
+    """ Evaluates predicates on a CaseClassArray one column at a time. Masks
+    are NumPy boolean arrays if NumPy is available and lists of booleans
+    otherwise. """
+
+    def __init__(self, source):
+        """ Creates a new _Evaluator() instance.
+
+        :param source: Collection to evaluate predicates on.
+        :type source: columnar.CaseClassArray
+        """
+
+        self.__source = source
+
+        # numeric arrays (or None) by column name
+        self.__arrays = {}
+
+    def __array(self, name):
+        """ Returns a column as a numeric array or None.
+
+        :param name: Name of the column.
+        :type name: str
+
+        :rtype: numpy.ndarray
+        """
+
+        if numpy is None:
+            return None
+
+        if name not in self.__arrays:
+            self.__arrays[name] = _numeric_array(self.__source.column(name))
+
+        return self.__arrays[name]
+
+    def __from_list(self, mask):
+        """ Turns a list of booleans into a mask.
+
+        :param mask: List to turn into a mask.
+        :type mask: list
+
+        :rtype: object
+        """
+
+        if numpy is None:
+            return mask
+
+        return numpy.fromiter(mask, dtype=bool, count=len(self.__source))
+
+    def mask(self, predicate):
+        """ Computes the mask of the rows matching a predicate.
+
+        :raises: exceptions.NoSuchArgument
+
+        :param predicate: Predicate to evaluate.
+        :type predicate: Predicate
+
+        :rtype: object
+        """
+
+        if isinstance(predicate, And):
+            (left, right) = (self.mask(predicate.left),
+                             self.mask(predicate.right))
+            if numpy is not None:
+                return left & right
+            return list(map(operator.and_, left, right))
+
+        elif isinstance(predicate, Or):
+            (left, right) = (self.mask(predicate.left),
+                             self.mask(predicate.right))
+            if numpy is not None:
+                return left | right
+            return list(map(operator.or_, left, right))
+
+        elif isinstance(predicate, Not):
+            inner = self.mask(predicate.predicate)
+            if numpy is not None:
+                return ~inner
+            return list(map(operator.not_, inner))
+
+        column = self.__source.column(predicate.name)
+        array = self.__array(predicate.name)
+
+        if isinstance(predicate, Compare):
+            op = _OPERATORS[predicate.op]
+
+            if array is not None and _is_number(predicate.value):
+                return op(array, predicate.value)
+
+            return self.__from_list(list(map(_compare, itertools.repeat(op),
+                                             column, itertools.repeat(
+                                                 predicate.value))))
+
+        elif isinstance(predicate, Between):
+            (low, high) = (predicate.low, predicate.high)
+
+            if array is not None and _is_number(low) and _is_number(high):
+                return (array >= low) & (array <= high)
+
+            return self.__from_list([_between(low, v, high)
+                                     for v in column])
+
+        elif isinstance(predicate, IsIn):
+            values = predicate.values
+
+            if array is not None and all(_is_number(v) for v in values):
+                return numpy.isin(array, list(values))
+
+            try:
+                lookup = frozenset(values)
+            except TypeError:
+                lookup = values
+
+            return self.__from_list([_is_in(v, lookup, values)
+                                     for v in column])
+
+        raise TypeError("Unknown predicate %r" % (predicate,))
+
+
+__all__ = ["Predicate", "Compare", "Between", "IsIn", "And", "Or", "Not",
+           "Field", "field", "Query", "query"]
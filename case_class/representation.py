@@ -0,0 +1,336 @@
+"""
+Representation functions for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, signature
+
+#: Text used to mark truncated representations.
+ELLIPSIS = '...'
+
+
+def case_repr(obj, max_depth=None, max_length=None):
+    """ Builds the representation of an object, which typically is a
+    CaseClass instance. In contrast to the builtin repr() function, this
+    works iteratively and does not hit the recursion limit for deep trees.
+
+    :param obj: Object to represent.
+    :type obj: object
+
+    :param max_depth: Optional. Maximal number of nested CaseClass instances
+    to represent. CaseClass instances nested deeper than this are represented
+    as 'Name(...)'.
+    :type max_depth: int
+
+    :param max_length: Optional. Maximal length of the returned string,
+    excluding a trailing ELLIPSIS that marks a truncated representation.
+    :type max_length: int
+
+    :rtype: str
+    """
+
+    return ''.join(iter_repr(obj, max_depth=max_depth, max_length=max_length))
+
+
+def write_repr(obj, fileobj, max_depth=None, max_length=None):
+    """ Writes the representation of an object to a file object without
+    building the entire string in memory first.
+
+    :param obj: Object to represent.
+    :type obj: object
+
+    :param fileobj: File-like object to write representation to.
+    :type fileobj: file
+
+    :param max_depth: Optional. See case_repr.
+    :type max_depth: int
+
+    :param max_length: Optional. See case_repr.
+    :type max_length: int
+
+    :return: the number of characters written
+    :rtype: int
+    """
+
+    written = 0
+
+    for chunk in iter_repr(obj, max_depth=max_depth, max_length=max_length):
+        fileobj.write(chunk)
+        written += len(chunk)
+
+    return written
+
+
+def iter_repr(obj, max_depth=None, max_length=None):
+    """ Generates the representation of an object as a sequence of string
+    chunks. See case_repr for a description of the parameters.
+
+    :rtype: generator
+    """
+
+    # no budget, so we can just pass everything through
+    if max_length is None:
+        for chunk in _iter_chunks(obj, max_depth):
+            yield chunk
+        return
+
+    remaining = max_length
+
+    for chunk in _iter_chunks(obj, max_depth, max_length):
+
+        # if the chunk does not fit, truncate it and stop
+        if len(chunk) > remaining:
+            yield chunk[:remaining] + ELLIPSIS
+            return
+
+        remaining -= len(chunk)
+        yield chunk
+
+
+#
+# Internal helpers
+#
+
+# markers used on the stack in _iter_chunks
+_VALUE = 0
+_TEXT = 1
+_END = 2
+
+
+def _iter_chunks(obj, max_depth, max_length=None):
+    """ Generates the chunks of the representation of an object using an
+    explicit stack instead of recursion.
+
+    The text of every CaseClass instance that occurs more than once is
+    memoised and re-used when the instance is encountered again.
+
+    :param obj: Object to represent.
+    :type obj: object
+
+    :param max_depth: Maximal depth of CaseClass instances or None.
+    :type max_depth: int
+
+    :param max_length: Optional. Maximal length of the representation, used
+    to only search the part that is written for shared instances.
+    :type max_length: int
+
+    :rtype: generator
+    """
+
+    # instances that occur more than once and are worth memoising
+    shared = _find_shared(obj, max_length)
+
+    # text of memoised instances and currently open captures
+    memo = {}
+    captures = []
+
+    # stack of (marker, payload, depth) triples, processed from the end
+    stack = [(_VALUE, obj, 0)]
+
+    while stack:
+        (marker, item, depth) = stack.pop()
+
+        if marker == _TEXT:
+            chunk = item
+
+        # an instance was fully written, so store its text
+        elif marker == _END:
+            (key, chunks) = captures.pop()
+            memo[key] = ''.join(chunks)
+
+            # the text of the closed capture belongs to the enclosing one
+            if captures:
+                captures[-1][1].append(memo[key])
+            continue
+
+        elif isinstance(item, case_class.CaseClass):
+            name = item.__class__.__name__
+
+            # the key depends on the depth only if we have a maximum depth
+            key = id(item) if max_depth is None else (id(item), depth)
+
+            if key in memo:
+                chunk = memo[key]
+            elif max_depth is not None and depth >= max_depth:
+                chunk = '%s(%s)' % (name, ELLIPSIS)
+            else:
+                if id(item) in shared:
+                    captures.append((key, []))
+                    stack.append((_END, None, depth))
+
+                stack.append((_TEXT, ')', depth))
+                _push_reversed(stack, _signature_items(item.case_signature),
+                               depth + 1)
+                chunk = '%s(' % (name,)
+
+        elif type(item) is tuple:
+            if len(item) == 1:
+                stack.append((_TEXT, ',)', depth))
+            else:
+                stack.append((_TEXT, ')', depth))
+            _push_reversed(stack, _sequence_items(item), depth)
+            chunk = '('
+
+        elif type(item) is list:
+            stack.append((_TEXT, ']', depth))
+            _push_reversed(stack, _sequence_items(item), depth)
+            chunk = '['
+
+        elif type(item) is dict:
+            stack.append((_TEXT, '}', depth))
+            _push_reversed(stack, _dict_items(item), depth)
+            chunk = '{'
+
+        else:
+            chunk = repr(item)
+
+        # only the innermost capture collects chunks directly
+        if captures:
+            captures[-1][1].append(chunk)
+
+        yield chunk
+
+
+def _push_reversed(stack, items, depth):
+    """ Pushes (marker, payload) pairs onto a stack so that they are popped
+    in their original order.
+
+    :param stack: Stack to push items to.
+    :type stack: list
+
+    :param items: List of (marker, payload) pairs.
+    :type items: list
+
+    :param depth: Depth to push items with.
+    :type depth: int
+    """
+
+    for (marker, item) in reversed(items):
+        stack.append((marker, item, depth))
+
+
+def _signature_items(applied):
+    """ Returns the items to represent an AppliedSignature in the same format
+    as AppliedSignature.__str__.
+
+    :param applied: AppliedSignature to represent.
+    :type applied: signature.AppliedSignature
+
+    :rtype: list
+    """
+
+    items = []
+
+    for (n, t, v) in applied:
+        if items:
+            items.append((_TEXT, ', '))
+
+        if t == signature.Signature.ARGUMENT_WITH_DEFAULT or \
+                t == signature.Signature.KEYWORD_ONLY:
+            items.append((_TEXT, '%s=' % (n,)))
+        elif t == signature.Signature.VARARG:
+            items.append((_TEXT, '*%s=' % (n,)))
+        elif t == signature.Signature.KEYWORD_VARARG:
+            items.append((_TEXT, '**%s=' % (n,)))
+
+        items.append((_VALUE, v))
+
+    return items
+
+
+def _sequence_items(seq):
+    """ Returns the items to represent the elements of a sequence.
+
+    :param seq: Sequence to represent.
+    :type seq: list
+
+    :rtype: list
+    """
+
+    items = []
+
+    for v in seq:
+        if items:
+            items.append((_TEXT, ', '))
+        items.append((_VALUE, v))
+
+    return items
+
+
+def _dict_items(d):
+    """ Returns the items to represent the elements of a dictionary.
+
+    :param d: Dictionary to represent.
+    :type d: dict
+
+    :rtype: list
+    """
+
+    items = []
+
+    for k in d:
+        if items:
+            items.append((_TEXT, ', '))
+        items.append((_TEXT, '%r: ' % (k,)))
+        items.append((_VALUE, d[k]))
+
+    return items
+
+
+def _find_shared(obj, max_length=None):
+    """ Finds the ids of all CaseClass instances that occur more than once
+    within an object.
+
+    The object is searched in the order it is represented in. If a maximal
+    length is given, the search stops once the representation of the part
+    searched so far is known to be longer, as the rest is never written.
+
+    :param obj: Object to search within.
+    :type obj: object
+
+    :param max_length: Optional. Maximal length of the representation.
+    :type max_length: int
+
+    :rtype: set
+    """
+
+    seen = set()
+    shared = set()
+
+    # lower bound for the length of the text written before the next item
+    length = 0
+
+    stack = [obj]
+
+    while stack:
+        if max_length is not None and length > max_length:
+            break
+
+        item = stack.pop()
+
+        if isinstance(item, case_class.CaseClass):
+            length += len(item.__class__.__name__) + 1
+
+            if id(item) in seen:
+                shared.add(id(item))
+                continue
+
+            seen.add(id(item))
+            stack.extend(reversed([v for (n, t, v) in item.case_signature]))
+
+        elif type(item) is tuple or type(item) is list:
+            length += 1
+            stack.extend(reversed(item))
+
+        elif type(item) is dict:
+            length += 1
+            stack.extend(reversed(list(item.values())))
+
+        else:
+            length += 1
+
+    return shared
+
+
+__all__ = ["case_repr", "write_repr", "iter_repr"]
@@ -0,0 +1,304 @@
+"""
+Term rewriting for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, exceptions, extractor, traversal
+
+
+class Rule(case_class.CaseClass):
+    """ A rewrite rule consisting of a pattern and a rewrite function. """
+
+    def __init__(self, pattern, rewrite):
+        """ Creates a new Rule() instance.
+
+        :param pattern: Pattern that a term has to match for this rule to
+        apply. Lifted into an Extractor.
+        :type pattern: object
+
+        :param rewrite: Function that is called with the ExtractedContext of
+        the match and returns the rewritten term. If it returns None or the
+        matched term itself, the rule does not apply.
+        :type rewrite: callable
+        """
+
+        self.__pattern = extractor.Extractor.lift(pattern)
+        self.__rewrite = rewrite
+
+    @property
+    def pattern(self):
+        """ The pattern of this rule.
+
+        :rtype: extractor.Extractor
+        """
+
+        return self.__pattern
+
+    @property
+    def rewrite(self):
+        """ The rewrite function of this rule.
+
+        :rtype: callable
+        """
+
+        return self.__rewrite
+
+    def apply(self, term):
+        """ Applies this rule to a term.
+
+        :param term: Term to apply rule to.
+        :type term: object
+
+        :return: the rewritten term or None if the rule does not apply
+        :rtype: object
+        """
+
+        try:
+            ctx = self.__pattern.extract(term)
+        except exceptions.ExtractorDoesNotMatch:
+            return None
+
+        result = self.__rewrite(ctx)
+
+        if result is term:
+            return None
+
+        return result
+
+
+class Rewriter(object):
+    """ Rewrites terms made of CaseClass instances to their normal form by
+    applying a list of rules until none of them applies anymore. """
+
+    #: Rewrite the children of a term before the term itself.
+    BOTTOM_UP = 'bottom_up'
+
+    #: Rewrite a term before its children.
+    TOP_DOWN = 'top_down'
+
+    def __init__(self, rules, strategy=BOTTOM_UP, max_steps=None):
+        """ Creates a new Rewriter() instance.
+
+        :param rules: List of rules in the order they should be tried.
+        Elements may be Rule instances or pairs (pattern, rewrite).
+        :type rules: list
+
+        :param strategy: Optional. Either Rewriter.BOTTOM_UP (the default) or
+        Rewriter.TOP_DOWN.
+        :type strategy: str
+
+        :param max_steps: Optional. Maximal number of rewrite steps in a
+        single call to rewrite(). If exceeded, raises NonTerminatingRewrite.
+        :type max_steps: int
+        """
+
+        if strategy != Rewriter.BOTTOM_UP and strategy != Rewriter.TOP_DOWN:
+            raise ValueError("Unknown rewriting strategy %r" % (strategy,))
+
+        self.__rules = tuple(r if isinstance(r, Rule) else Rule(*r)
+                             for r in rules)
+        self.__top_down = strategy == Rewriter.TOP_DOWN
+        self.__max_steps = max_steps
+
+        # normal forms by id of the term. Because terms are interned, they
+        # are kept alive and their ids are never re-used.
+        self.__memo = {}
+
+        # number of times each rule fired
+        self.__stats = dict((r, 0) for r in self.__rules)
+
+    @property
+    def rules(self):
+        """ The rules used by this Rewriter.
+
+        :rtype: tuple
+        """
+
+        return self.__rules
+
+    @property
+    def stats(self):
+        """ A dictionary mapping each rule to the number of times it fired.
+
+        :rtype: dict
+        """
+
+        return dict(self.__stats)
+
+    def __call__(self, term):
+        """ Shortcut for self.rewrite(term).
+
+        :rtype: object
+        """
+
+        return self.rewrite(term)
+
+    def rewrite(self, term):
+        """ Rewrites a term to its normal form. Normal forms of all subterms
+        are remembered, so shared subterms (also across several calls) are
+        only rewritten once.
+
+        :raises: exceptions.NonTerminatingRewrite
+
+        :param term: Term to rewrite.
+        :type term: object
+
+        :rtype: object
+        """
+
+        # only CaseClass instances have subterms to rewrite
+        if not isinstance(term, case_class.CaseClass):
+            rewritten = self.__apply_rules(term)
+            return term if rewritten is None else rewritten
+
+        memo = self.__memo
+        steps = 0
+
+        # terms that were rewritten and the term they were rewritten to
+        redirect = {}
+
+        # terms that rules were already tried on (top-down only)
+        tried = set()
+
+        # terms still to rewrite, the next one is at the end
+        stack = [term]
+
+        while stack:
+            node = stack[-1]
+            nid = id(node)
+
+            if nid in memo:
+                stack.pop()
+                continue
+
+            # the term was rewritten, so it has the normal form of the
+            # rewritten term. If that is not yet known, the rewritten term
+            # depends on this one.
+            if nid in redirect:
+                target = redirect.pop(nid)
+                if id(target) not in memo:
+                    raise exceptions.NonTerminatingRewrite(node)
+
+                memo[nid] = memo[id(target)]
+                stack.pop()
+                continue
+
+            # try the rules on the term itself before the children
+            if self.__top_down and nid not in tried:
+                tried.add(nid)
+
+                rewritten = self.__apply_rules(node)
+                if rewritten is not None:
+                    steps = self.__count_step(steps, node)
+                    self.__redirect(stack, redirect, node, rewritten)
+                    continue
+
+            # rewrite all the children first
+            pending = [c for c in traversal.children(node)
+                       if id(c) not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+
+            # replace the children with their normal forms
+            rebuilt = traversal.map_children(node, lambda c: memo[id(c)])
+            if rebuilt is not node:
+                self.__redirect(stack, redirect, node, rebuilt)
+                continue
+
+            # try the rules on the term after the children
+            if not self.__top_down:
+                rewritten = self.__apply_rules(node)
+                if rewritten is not None:
+                    steps = self.__count_step(steps, node)
+                    self.__redirect(stack, redirect, node, rewritten)
+                    continue
+
+            # the term is in normal form
+            memo[nid] = node
+            stack.pop()
+
+        return memo[id(term)]
+
+    def __redirect(self, stack, redirect, term, rewritten):
+        """ Records that a term was rewritten and schedules the rewritten term
+        to be rewritten to normal form. Rewritten terms that are not
+        CaseClass instances are always considered to be in normal form.
+
+        :param stack: Stack of terms still to rewrite.
+        :type stack: list
+
+        :param redirect: Dictionary mapping ids of terms to rewritten terms.
+        :type redirect: dict
+
+        :param term: Term that was rewritten.
+        :type term: case_class.CaseClass
+
+        :param rewritten: The rewritten term.
+        :type rewritten: object
+        """
+
+        if isinstance(rewritten, case_class.CaseClass):
+            redirect[id(term)] = rewritten
+            stack.append(rewritten)
+        else:
+            self.__memo[id(term)] = rewritten
+            stack.pop()
+
+    def __apply_rules(self, term):
+        """ Applies the first matching rule to a term.
+
+        :param term: Term to apply rules to.
+        :type term: object
+
+        :return: the rewritten term or None if no rule applies
+        :rtype: object
+        """
+
+        for rule in self.__rules:
+            result = rule.apply(term)
+
+            if result is not None:
+                self.__stats[rule] += 1
+                return result
+
+        return None
+
+    def __count_step(self, steps, term):
+        """ Counts a rewrite step and checks that the maximal number of steps
+        is not exceeded.
+
+        :raises: exceptions.NonTerminatingRewrite
+
+        :param steps: Number of steps so far.
+        :type steps: int
+
+        :param term: Term that is being rewritten.
+        :type term: object
+
+        :return: the new number of steps
+        :rtype: int
+        """
+
+        steps += 1
+
+        if self.__max_steps is not None and steps > self.__max_steps:
+            raise exceptions.NonTerminatingRewrite(term)
+
+        return steps
+
+
+def rewrite(term, rules, strategy=Rewriter.BOTTOM_UP, max_steps=None):
+    """ Rewrites a term to its normal form using a list of rules. See
+    Rewriter for a description of the parameters.
+
+    :raises: exceptions.NonTerminatingRewrite
+
+    :rtype: object
+    """
+
+    return Rewriter(rules, strategy=strategy, max_steps=max_steps)(term)
+
+
+__all__ = ["Rule", "Rewriter", "rewrite"]
@@ -5,6 +5,7 @@ Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
 """
 
 import inspect
+import operator
 
 from . import exceptions, utils
 
@@ -81,6 +82,12 @@ class Signature(object):
 
         self.__annots = annots
 
+        # the iteration order of the arguments, computed on first use
+        self.__params = None
+
+        # getter for the argument values, compiled on first use
+        self.__getter = None
+
     @staticmethod
     def apply(f, *args, **kwargs):
         """ Shortcut for signature.Signature(f, *args, **kwargs).
@@ -209,29 +216,100 @@ class Signature(object):
             - d is the default of the argument (or None if not applicable)
         """
 
+        if self.__params is None:
+            self.__params = tuple(self.__build_params())
+
+        return iter(self.__params)
+
+    def get_values(self, values):
+        """ Gets the values of all arguments of this signature from a
+        dictionary mapping argument names to values.
+
+        :param values: Dictionary to get values from.
+        :type values: dict
+
+        :return: a tuple of values in the order of the arguments
+        :rtype: tuple
+        """
+
+        if self.__getter is None:
+            self.__getter = self.__build_getter()
+
+        return self.__getter(values)
+
+    def get_call_arguments(self, values):
+        """ Turns a tuple of values for all arguments of this signature (in
+        the order returned by get_values) into positional and keyword
+        arguments that can be used to call a function with this signature.
+
+        :param values: Values of all arguments.
+        :type values: tuple
+
+        :return: a pair (args, kwargs)
+        :rtype: tuple
+        """
+
+        args = []
+        kwargs = {}
+
+        for ((n, t, d), v) in zip(self, values):
+            if t == Signature.ARGUMENT or t == Signature.ARGUMENT_WITH_DEFAULT:
+                args.append(v)
+            elif t == Signature.VARARG:
+                args.extend(v)
+            elif t == Signature.KEYWORD_ONLY:
+                kwargs[n] = v
+            elif t == Signature.KEYWORD_VARARG:
+                kwargs.update(v)
+
+        return (args, kwargs)
+
+    def __build_getter(self):
+        """ Compiles a function that returns the values of all arguments of
+        this signature. Used by get_values.
+
+        :rtype: callable
+        """
+
+        names = [n for (n, t, d) in self]
+
+        # itemgetter() returns single items as is, so we wrap those
+        if len(names) == 0:
+            return lambda values: ()
+        elif len(names) == 1:
+            name = names[0]
+            return lambda values: (values[name],)
+        else:
+            return operator.itemgetter(*names)
+
+    def __build_params(self):
+        """ Generates the triples returned by iterating over this Signature.
+        Used once during initialisation, see __iter__ for details.
+        """
+
         # 1. Iterate over the argument type.
 
         # index before which we have no defaults.
-        arg_cutoff = len(self.args) - len(self.defaults)
+        arg_cutoff = len(self.__args) - len(self.__defaults)
 
-        for (i, name) in enumerate(self.args):
+        for (i, name) in enumerate(self.__args):
             if i < arg_cutoff:
                 yield (name, Signature.ARGUMENT, None)
             else:
                 yield (name, Signature.ARGUMENT_WITH_DEFAULT,
-                       self.defaults[i - arg_cutoff])
+                       self.__defaults[i - arg_cutoff])
 
         # 2. The vararg
-        if self.vararg is not None:
-            yield (self.vararg, Signature.VARARG, None)
+        if self.__vararg is not None:
+            yield (self.__vararg, Signature.VARARG, None)
 
         # 3. The keyword only arguments
-        for name in self.kwonlyargs:
-            yield (name, Signature.KEYWORD_ONLY, self.kwonlydefaults[name])
+        for name in self.__kwonlyargs:
+            yield (name, Signature.KEYWORD_ONLY, self.__kwonlydefaults[name])
 
         # 4. the kwargs
-        if self.varkw is not None:
-            yield (self.varkw, Signature.KEYWORD_VARARG, None)
+        if self.__varkw is not None:
+            yield (self.__varkw, Signature.KEYWORD_VARARG, None)
 
     def get_default(self, name):
         """ Returns the default values of an argument.
@@ -506,39 +584,18 @@ class AppliedSignature(object):
         if f is None:
             f = self.signature.callable
 
-        # the map of defaults
-        values = {}
-        nprefix = ''
-
-        # create an unused name
-        # and store the values
-        for (n, t, v) in self:
-            nprefix += n
-            values[n] = self[n]
-
-        # build the argument list
-        arg_list = []
-
-        for (n, t, v) in self:
-            if t == Signature.ARGUMENT or t == Signature.ARGUMENT_WITH_DEFAULT:
-                arg_list.append('v_%s[%r]' % (nprefix, n,))
-            elif t == Signature.KEYWORD_ONLY:
-                arg_list.append('%s=v_%s[%r]' % (n, nprefix, n))
-            elif t == Signature.VARARG:
-                arg_list.append('*v_%s[%r]' % (nprefix, n,))
-            elif t == Signature.KEYWORD_VARARG:
-                arg_list.append('**v_%s[%r]' % (nprefix, n,))
+        (args, kwargs) = self.call_arguments()
+        return f(*args, **kwargs)
 
-        # and run the code.
-        code = 'o_%s = w_%s(%s)' % (nprefix, nprefix, ','.join(arg_list))
-        ctx = {
-            'w_%s' % (nprefix,): f,
-            'v_%s' % (nprefix): values
-        }
+    def call_arguments(self):
+        """ Returns positional and keyword arguments that can be used to call
+        a function with this AppliedSignature.
 
-        utils.exec_(code, ctx)
+        :return: a pair (args, kwargs)
+        :rtype: tuple
+        """
 
-        return ctx['o_%s' % (nprefix,)]
+        return self.__sig.get_call_arguments(self.values())
 
     def __call__(self, *args, **kwargs):
         """ Creates a new AppliedSignature instance by partially overriding the
@@ -676,6 +733,15 @@ class AppliedSignature(object):
 
         return dict(self.__values)
 
+    def values(self):
+        """ Returns a tuple of the values of all arguments to this function,
+        in the order they appear in the signature.
+
+        :rtype: tuple
+        """
+
+        return self.__sig.get_values(self.__values)
+
     def __iter__(self):
         """ Iterates over the arguments in this AppliedSignature.
         Each element is a triple (name, tp, v) where
@@ -727,6 +793,23 @@ class AppliedSignature(object):
             self.arguments() == other.arguments()
         )
 
+    def __hash__(self):
+        """ Returns a hash of this AppliedSignature. Values that can not be
+        hashed are hashed by their type.
+
+        :rtype: int
+        """
+
+        hashes = []
+
+        for v in self.values():
+            try:
+                hashes.append(hash(v))
+            except TypeError:
+                hashes.append(hash(type(v)))
+
+        return hash(tuple(hashes))
+
     @property
     def signature(self):
         """ The signature that is being applied.
@@ -0,0 +1,240 @@
+"""
+Sorting functions for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, clsutils, digest, exceptions
+
+# generated key functions by (class, fields)
+_sort_keys = {}
+
+
+def class_tag(cls):
+    """ Returns the tag used to order instances of different classes, which
+    is the qualified name of the class. It is the same in every process, so
+    heterogeneous collections always sort the same way.
+
+    :param cls: Class to get tag of.
+    :type cls: type
+
+    :rtype: str
+    """
+
+    return digest.qualified_name(cls)
+
+
+def sort_key(cls, by=None):
+    """ Returns a function that computes the sort key of instances of a
+    CaseClass. The key is a tuple of the class tag followed by the values of
+    the parameters in the order of the init signature, so instances are
+    first ordered by class and then by their parameters. CaseClass instances
+    within the parameters are ordered the same way.
+
+    Key functions are generated once per class and list of fields.
+
+    :raises: exceptions.NoSuchArgument
+
+    :param cls: Class to get key function for.
+    :type cls: type
+
+    :param by: Optional. Names of the parameters to use in the key, in
+    order. Defaults to all parameters.
+    :type by: list
+
+    :rtype: callable
+    """
+
+    by = None if by is None else tuple(by)
+
+    if (cls, by) not in _sort_keys:
+        _sort_keys[(cls, by)] = _build_sort_key(cls, by)
+
+    return _sort_keys[(cls, by)]
+
+
+def sorted_cases(iterable, by=None, reverse=False):
+    """ Sorts CaseClass instances, which may be of different classes, by their
+    sort keys (see sort_key). Every key is computed only once.
+
+    :raises: exceptions.NoSuchArgument
+
+    :param iterable: Instances to sort.
+    :type iterable: iterable
+
+    :param by: Optional. Names of the parameters to sort by. All instances
+    have to have these parameters.
+    :type by: list
+
+    :param reverse: Optional. If set to True, sort in descending order.
+    :type reverse: bool
+
+    :rtype: list
+    """
+
+    by = None if by is None else tuple(by)
+
+    # key functions by class, to avoid the lookup in _sort_keys
+    keys = {}
+
+    def key(obj):
+        cls = obj.__class__
+        if cls not in keys:
+            keys[cls] = sort_key(cls, by)
+        return keys[cls](obj)
+
+    return sorted(iterable, key=key, reverse=reverse)
+
+
+#
+# Internal helpers
+#
+
+class _CaseKey(object):
+    """ Wraps a CaseClass instance within a sort key, so that it is ordered
+    by class tag and parameters. """
+
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        """ Creates a new _CaseKey() instance.
+
+        :param value: Instance to wrap.
+        :type value: case_class.CaseClass
+        """
+
+        self.value = value
+
+    def __cmp(self, other):
+        """ Compares this key to another one. Nested instances are compared
+        by class tag and parameters as well, without recursion.
+
+        :param other: Key to compare with.
+        :type other: _CaseKey
+
+        :rtype: int
+        """
+
+        # pairs of values still to compare, the next one on top
+        stack = [(self.value, other.value)]
+
+        while stack:
+            (a, b) = stack.pop()
+
+            if a is b:
+                continue
+
+            if isinstance(a, case_class.CaseClass) and \
+                    isinstance(b, case_class.CaseClass):
+                if a.__class__ is not b.__class__:
+                    (ta, tb) = (class_tag(a.__class__),
+                                class_tag(b.__class__))
+                    return -1 if ta < tb else 1
+
+                pairs = list(zip(a.case_signature.values(),
+                                 b.case_signature.values()))
+
+            elif (type(a) is tuple or type(a) is list) and \
+                    type(a) is type(b):
+                # a shorter sequence comes first if it is a prefix
+                stack.append((len(a), len(b)))
+                pairs = list(zip(a, b))
+
+            else:
+                if a < b:
+                    return -1
+                if b < a:
+                    return 1
+                continue
+
+            stack.extend(reversed(pairs))
+
+        return 0
+
+    def __eq__(self, other):
+        if not isinstance(other, _CaseKey):
+            return NotImplemented
+        return self.value == other.value
+
+    def __ne__(self, other):
+        if not isinstance(other, _CaseKey):
+            return NotImplemented
+        return self.value != other.value
+
+    def __lt__(self, other):
+        if not isinstance(other, _CaseKey):
+            return NotImplemented
+        return self.__cmp(other) < 0
+
+    def __le__(self, other):
+        if not isinstance(other, _CaseKey):
+            return NotImplemented
+        return self.__cmp(other) <= 0
+
+    def __gt__(self, other):
+        if not isinstance(other, _CaseKey):
+            return NotImplemented
+        return self.__cmp(other) > 0
+
+    def __ge__(self, other):
+        if not isinstance(other, _CaseKey):
+            return NotImplemented
+        return self.__cmp(other) >= 0
+
+
+def _value_key(value):
+    """ Turns a parameter value into a part of a sort key.
+
+    :param value: Value to turn into a key.
+    :type value: object
+
+    :rtype: object
+    """
+
+    if isinstance(value, case_class.CaseClass):
+        return _CaseKey(value)
+
+    elif type(value) is tuple or type(value) is list:
+        return type(value)(_value_key(v) for v in value)
+
+    return value
+
+
+def _build_sort_key(cls, by):
+    """ Generates the key function of a class.
+
+    :raises: exceptions.NoSuchArgument
+
+    :param cls: Class to generate key function for.
+    :type cls: type
+
+    :param by: Names of the parameters to use or None.
+    :type by: tuple
+
+    :rtype: callable
+    """
+
+    tag = (class_tag(cls),)
+    names = [n for (n, t, d) in clsutils.get_init_signature(cls)]
+
+    if by is None:
+        def key(obj):
+            return tag + tuple(_value_key(v)
+                               for v in obj.case_signature.values())
+
+        return key
+
+    positions = []
+    for name in by:
+        if name not in names:
+            raise exceptions.NoSuchArgument(name)
+        positions.append(names.index(name))
+
+    def key(obj):
+        values = obj.case_signature.values()
+        return tag + tuple(_value_key(values[p]) for p in positions)
+
+    return key
+
+
+__all__ = ["class_tag", "sort_key", "sorted_cases"]
@@ -0,0 +1,301 @@
+"""
+Tree traversal functions for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, persistent
+
+
+def children(obj):
+    """ Returns the CaseClass instances that were passed as parameters to a
+    CaseClass instance. These are taken from the values bound to the init
+    signature in order, including varargs and keyword arguments. Tuples,
+    lists and dictionaries (and their persistent counterparts) given as
+    parameters are searched for CaseClass instances as well.
+
+    :param obj: CaseClass instance to get children of.
+    :type obj: case_class.CaseClass
+
+    :rtype: list
+    """
+
+    result = []
+
+    # the values still to search, the next one is at the end
+    stack = list(reversed(obj.case_signature.values()))
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, case_class.CaseClass):
+            result.append(value)
+        elif type(value) is tuple or type(value) is list:
+            stack.extend(reversed(value))
+        elif type(value) is dict:
+            stack.extend(reversed(list(value.values())))
+        elif type(value) is persistent.PVector:
+            stack.extend(reversed(list(value)))
+        elif type(value) is persistent.PMap:
+            stack.extend(reversed(list(value.values())))
+
+    return result
+
+
+def walk(root, unique=False, prune=None):
+    """ Walks over a tree of CaseClass instances in pre-order and generates
+    pairs (node, depth) where depth is the distance of node from the root.
+
+    :param root: CaseClass instance to start walking at.
+    :type root: case_class.CaseClass
+
+    :param unique: Optional. If set to True, visit every (interned) instance
+    only once, even if it occurs in several places of the tree.
+    :type unique: bool
+
+    :param prune: Optional. A function that is called with each visited
+    instance. If it returns True, the children of the instance are not
+    visited.
+    :type prune: callable
+
+    :rtype: generator
+    """
+
+    seen = set()
+    stack = [(root, 0)]
+
+    while stack:
+        (node, depth) = stack.pop()
+
+        if unique:
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+
+        yield (node, depth)
+
+        if prune is not None and prune(node):
+            continue
+
+        for child in reversed(children(node)):
+            stack.append((child, depth + 1))
+
+
+def preorder(root, unique=False, prune=None):
+    """ Generates all CaseClass instances in a tree in pre-order, i.e. every
+    instance before its children. See walk for a description of the
+    parameters.
+
+    :rtype: generator
+    """
+
+    for (node, depth) in walk(root, unique=unique, prune=prune):
+        yield node
+
+
+def postorder(root, unique=False, prune=None):
+    """ Generates all CaseClass instances in a tree in post-order, i.e. every
+    instance after its children. See walk for a description of the
+    parameters.
+
+    :rtype: generator
+    """
+
+    seen = set()
+
+    # stack of (node, expanded) pairs
+    stack = [(root, False)]
+
+    while stack:
+        (node, expanded) = stack.pop()
+
+        if expanded:
+            yield node
+            continue
+
+        if unique:
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+
+        stack.append((node, True))
+
+        if prune is not None and prune(node):
+            continue
+
+        for child in reversed(children(node)):
+            stack.append((child, False))
+
+
+def fold(root, fn, unique=True, prune=None):
+    """ Combines the CaseClass instances in a tree bottom-up. For every
+    instance fn(node, results) is called, where results is a list of the
+    values returned for the children of the node.
+
+    :param root: CaseClass instance to fold.
+    :type root: case_class.CaseClass
+
+    :param fn: Function to combine a node with the results of its children.
+    :type fn: callable
+
+    :param unique: Optional. If set to True (the default), fn is called only
+    once for every (interned) instance and the result is re-used whenever the
+    instance occurs again.
+    :type unique: bool
+
+    :param prune: Optional. A function that is called with each instance. If
+    it returns True, the children of the instance are not visited and fn is
+    called with an empty list of results.
+    :type prune: callable
+
+    :return: the result for the root
+    :rtype: object
+    """
+
+    memo = {}
+
+    # results of the nodes that were already folded
+    results = []
+
+    # stack of (node, number of children) pairs, where the number is None
+    # if the node was not yet expanded
+    stack = [(root, None)]
+
+    while stack:
+        (node, count) = stack.pop()
+
+        # all the children are done, so combine them
+        if count is not None:
+            if count:
+                child_results = results[-count:]
+                del results[-count:]
+            else:
+                child_results = []
+
+            result = fn(node, child_results)
+
+            if unique:
+                memo[id(node)] = result
+            results.append(result)
+            continue
+
+        if unique and id(node) in memo:
+            results.append(memo[id(node)])
+            continue
+
+        if prune is not None and prune(node):
+            node_children = []
+        else:
+            node_children = children(node)
+
+        stack.append((node, len(node_children)))
+        for child in reversed(node_children):
+            stack.append((child, None))
+
+    return results[-1]
+
+
+def transform(root, fn):
+    """ Transforms a tree of CaseClass instances bottom-up. Each instance is
+    first rebuilt with the transformed children and then passed to fn, whose
+    return value replaces the instance.
+
+    Every (interned) instance is transformed only once. If none of the
+    children of an instance change, the instance itself is passed to fn,
+    so subtrees that fn leaves alone are shared with the original tree.
+
+    :param root: CaseClass instance to transform.
+    :type root: case_class.CaseClass
+
+    :param fn: Function that returns the replacement for a node.
+    :type fn: callable
+
+    :return: the transformed root
+    :rtype: object
+    """
+
+    # transformed instances by id of the original instance
+    memo = {}
+
+    for node in postorder(root, unique=True):
+        node_rebuilt = map_children(node, lambda c: memo[id(c)])
+        memo[id(node)] = fn(node_rebuilt)
+
+    return memo[id(root)]
+
+
+def map_children(obj, fn):
+    """ Replaces every child of a CaseClass instance (see children) by the
+    result of calling fn on it. The instance is only rebuilt if at least
+    one child is replaced by a different object, otherwise it is returned
+    as is.
+
+    :param obj: CaseClass instance to replace children of.
+    :type obj: case_class.CaseClass
+
+    :param fn: Function that returns the replacement for a child.
+    :type fn: callable
+
+    :rtype: case_class.CaseClass
+    """
+
+    values = obj.case_signature.values()
+    new_values = tuple(_replace(v, fn) for v in values)
+
+    if all(n is v for (n, v) in zip(new_values, values)):
+        return obj
+
+    return obj.__class__.from_values(new_values)
+
+
+def _replace(value, fn):
+    """ Replaces all CaseClass instances within a value passed to a
+    CaseClass by the result of calling fn on them. Returns the value itself
+    if nothing was replaced.
+
+    :param value: Value to replace instances in.
+    :type value: object
+
+    :param fn: Function that returns the replacement for an instance.
+    :type fn: callable
+
+    :rtype: object
+    """
+
+    if isinstance(value, case_class.CaseClass):
+        return fn(value)
+
+    elif type(value) is tuple or type(value) is list:
+        new_value = [_replace(v, fn) for v in value]
+
+        if all(n is v for (n, v) in zip(new_value, value)):
+            return value
+        return type(value)(new_value)
+
+    elif type(value) is dict:
+        new_value = dict((k, _replace(value[k], fn)) for k in value)
+
+        if all(new_value[k] is value[k] for k in value):
+            return value
+        return new_value
+
+    # only the changed elements of persistent collections are replaced
+    elif type(value) is persistent.PVector:
+        for (i, v) in enumerate(list(value)):
+            n = _replace(v, fn)
+            if n is not v:
+                value = value.set(i, n)
+        return value
+
+    elif type(value) is persistent.PMap:
+        for (k, v) in list(value.items()):
+            n = _replace(v, fn)
+            if n is not v:
+                value = value.set(k, n)
+        return value
+
+    return value
+
+
+__all__ = ["children", "walk", "preorder", "postorder", "fold", "transform",
+           "map_children"]
@@ -0,0 +1,334 @@
+"""
+Unification of terms for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, exceptions, extractor, traversal
+
+# marker for variables that are not linked to anything
+_MISSING = object()
+
+
+def is_variable(term):
+    """ Checks if a term is a variable. Variables are represented by
+    extractor.V instances.
+
+    :param term: Term to check.
+    :type term: object
+
+    :rtype: bool
+    """
+
+    return isinstance(term, extractor.V)
+
+
+class Substitution(object):
+    """ Maps variables to terms. A substitution is a union-find structure
+    over variables, where each variable is either unbound or linked to a
+    term. Extending a substitution is cheap because the new substitution
+    only stores the bindings that were added on top of the existing one. """
+
+    def __init__(self, parent=None):
+        """ Creates a new Substitution() instance.
+
+        :param parent: Optional. Substitution to extend.
+        :type parent: Substitution
+        """
+
+        self.__parent = parent
+        self.__links = {}
+
+    def extend(self):
+        """ Creates a new Substitution that contains all bindings of this
+        one. Bindings added to the new Substitution do not affect this one.
+
+        :rtype: Substitution
+        """
+
+        return Substitution(self)
+
+    def __link(self, var):
+        """ Gets the term a variable is linked to or _MISSING.
+
+        :param var: Variable to get link of.
+        :type var: extractor.V
+
+        :rtype: object
+        """
+
+        sub = self
+        while sub is not None:
+            link = sub.__links.get(var, _MISSING)
+            if link is not _MISSING:
+                return link
+            sub = sub.__parent
+
+        return _MISSING
+
+    def find(self, term):
+        """ Finds the representative of a term. For unbound variables this is
+        the variable itself or another variable it was unified with, for
+        bound variables the term they are bound to. All other terms are
+        their own representative.
+
+        :param term: Term to find representative of.
+        :type term: object
+
+        :rtype: object
+        """
+
+        if not is_variable(term):
+            return term
+
+        path = []
+        link = self.__link(term)
+
+        while link is not _MISSING:
+            path.append(term)
+            term = link
+
+            if not is_variable(term):
+                break
+            link = self.__link(term)
+
+        # compress the path, only in this substitution
+        for var in path[:-1]:
+            self.__links[var] = term
+
+        return term
+
+    def bind(self, var, term):
+        """ Links an unbound variable to a term. Does not perform any
+        checks, use unify() instead.
+
+        :param var: Unbound variable to bind.
+        :type var: extractor.V
+
+        :param term: Term to bind variable to.
+        :type term: object
+        """
+
+        self.__links[var] = term
+
+    def __getitem__(self, var):
+        """ Returns the fully resolved value of a variable.
+
+        :param var: Variable or name of variable to resolve.
+        :type var: extractor.V
+
+        :rtype: object
+        """
+
+        if not is_variable(var):
+            var = extractor.V(var)
+
+        return self.resolve(var)
+
+    def resolve(self, term):
+        """ Applies this substitution to a term, i.e. replaces all bound
+        variables within the term by their resolved values.
+
+        :param term: Term to resolve.
+        :type term: object
+
+        :rtype: object
+        """
+
+        memo = {}
+        stack = [term]
+
+        while stack:
+            current = stack[-1]
+
+            if id(current) in memo:
+                stack.pop()
+                continue
+
+            if is_variable(current):
+                rep = self.find(current)
+
+                if is_variable(rep):
+                    memo[id(current)] = rep
+                elif id(rep) in memo:
+                    memo[id(current)] = memo[id(rep)]
+                else:
+                    stack.append(rep)
+                    continue
+
+            elif isinstance(current, case_class.CaseClass):
+                pending = [c for c in traversal.children(current)
+                           if id(c) not in memo]
+                if pending:
+                    stack.extend(pending)
+                    continue
+
+                memo[id(current)] = traversal.map_children(
+                    current, lambda c: memo[id(c)])
+
+            else:
+                memo[id(current)] = current
+
+            stack.pop()
+
+        return memo[id(term)]
+
+
+def unify(left, right, subst=None):
+    """ Unifies two terms that may both contain variables, i.e. finds a
+    Substitution that makes them equal. Pairs of subterms are unified only
+    once, so terms sharing interned subterms unify in near-linear time.
+
+    Raises UnificationFailure if the terms can not be unified.
+
+    :raises: exceptions.UnificationFailure
+
+    :param left: First term to unify.
+    :type left: object
+
+    :param right: Second term to unify.
+    :type right: object
+
+    :param subst: Optional. Substitution to extend. It is not modified.
+    :type subst: Substitution
+
+    :rtype: Substitution
+    """
+
+    subst = Substitution(subst)
+
+    # cache of terms without variables, see _is_ground
+    ground = {}
+
+    stack = [(left, right)]
+    seen = set()
+
+    while stack:
+        (a, b) = stack.pop()
+
+        a = subst.find(a)
+        b = subst.find(b)
+
+        if a is b:
+            continue
+
+        key = (id(a), id(b))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        if is_variable(a) or is_variable(b):
+            if not is_variable(a):
+                (a, b) = (b, a)
+
+            if not is_variable(b) and _occurs(a, b, subst, ground):
+                raise exceptions.UnificationFailure(a, b)
+
+            subst.bind(a, b)
+
+        elif isinstance(a, case_class.CaseClass):
+            if type(a) is not type(b):
+                raise exceptions.UnificationFailure(a, b)
+
+            stack.extend(zip(a.case_signature.values(),
+                             b.case_signature.values()))
+
+        elif (type(a) is tuple or type(a) is list) and type(a) is type(b):
+            if len(a) != len(b):
+                raise exceptions.UnificationFailure(a, b)
+
+            stack.extend(zip(a, b))
+
+        elif type(a) is dict and type(b) is dict:
+            if set(a) != set(b):
+                raise exceptions.UnificationFailure(a, b)
+
+            stack.extend((a[k], b[k]) for k in a)
+
+        elif a != b:
+            raise exceptions.UnificationFailure(a, b)
+
+    return subst
+
+
+def unifiable(left, right, subst=None):
+    """ Checks if two terms can be unified. See unify.
+
+    :rtype: bool
+    """
+
+    try:
+        unify(left, right, subst)
+        return True
+    except exceptions.UnificationFailure:
+        return False
+
+
+def _occurs(var, term, subst, ground):
+    """ Checks if a variable occurs within a term under a substitution.
+
+    :param var: Variable to look for.
+    :type var: extractor.V
+
+    :param term: Term to search.
+    :type term: object
+
+    :param subst: Substitution to resolve bound variables with.
+    :type subst: Substitution
+
+    :param ground: Cache of terms that contain no variables, see _is_ground.
+    :type ground: dict
+
+    :rtype: bool
+    """
+
+    stack = [term]
+    seen = set()
+
+    while stack:
+        current = subst.find(stack.pop())
+
+        if is_variable(current):
+            if current == var:
+                return True
+            continue
+
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+
+        if isinstance(current, case_class.CaseClass):
+            if not _is_ground(current, ground):
+                stack.extend(current.case_signature.values())
+        elif type(current) is tuple or type(current) is list:
+            stack.extend(current)
+        elif type(current) is dict:
+            stack.extend(current.values())
+
+    return False
+
+
+def _is_ground(term, ground):
+    """ Checks if a CaseClass instance contains no variables at all.
+
+    :param term: Term to check.
+    :type term: case_class.CaseClass
+
+    :param ground: Cache mapping ids of checked terms to the result.
+    :type ground: dict
+
+    :rtype: bool
+    """
+
+    if id(term) not in ground:
+        prune = lambda n: id(n) in ground or is_variable(n)
+
+        for node in traversal.postorder(term, unique=True, prune=prune):
+            if id(node) not in ground:
+                ground[id(node)] = not is_variable(node) and all(
+                    ground[id(c)] for c in traversal.children(node))
+
+    return ground[id(term)]
+
+
+__all__ = ["is_variable", "Substitution", "unify", "unifiable"]
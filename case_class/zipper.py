@@ -0,0 +1,395 @@
+"""
+Focused updates of trees for the case_class module
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from . import case_class, signature
+
+
+class Zipper(object):
+    """ Navigates within a tree of CaseClass instances and updates values
+    deep within it.
+
+    Values are only rebuilt when leaving the tree through root() or when
+    reading the focus, and only on the paths to changed values. Any number
+    of edits below a common ancestor rebuild that ancestor only once, all
+    untouched subtrees are shared with the original tree. """
+
+    def __init__(self, root):
+        """ Creates a new Zipper() instance focused on the root of a tree.
+
+        :param root: Tree to navigate in.
+        :type root: object
+        """
+
+        # wraps the root so that it can be replaced as well
+        self.__top = _Level(None)
+        self.__top.items = [root]
+
+        # stack of (level, step, index) triples for all ancestors
+        self.__stack = []
+
+        self.__current = self.__top
+        self.__down_to(0, 0)
+        self.__stack = []
+
+    @property
+    def focus(self):
+        """ The value that is currently focused.
+
+        :rtype: object
+        """
+
+        return _close(self.__current)
+
+    @property
+    def path(self):
+        """ The path from the root to the focused value, in the format used by
+        goto().
+
+        :rtype: tuple
+        """
+
+        return tuple(step for (level, step, idx) in self.__stack)
+
+    @property
+    def depth(self):
+        """ The distance from the root to the focused value.
+
+        :rtype: int
+        """
+
+        return len(self.__stack)
+
+    def down(self, step):
+        """ Moves the focus to a value within the focused value. Steps into a
+        CaseClass instance are parameter names, or indices into the varargs
+        of the instance. Steps into a tuple or list are indices and steps
+        into a dictionary are keys.
+
+        :param step: Step to move along.
+        :type step: object
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        level = self.__current
+        level.open()
+
+        if level.names is not None and isinstance(step, int):
+            if level.vararg is None:
+                raise TypeError("%r has no varargs" % (level.value,))
+
+            self.down(level.vararg)
+            return self.down(step)
+
+        if level.names is not None:
+            if step not in level.names:
+                raise KeyError(step)
+            idx = level.names[step]
+        else:
+            idx = step
+
+        self.__down_to(step, idx)
+        return self
+
+    def up(self):
+        """ Moves the focus to the parent of the focused value.
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        if not self.__stack:
+            raise ValueError("Can not move up from the root")
+
+        (self.__current, step, idx) = self.__stack.pop()
+        return self
+
+    def top(self):
+        """ Moves the focus to the root of the tree.
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        if self.__stack:
+            self.__current = self.__stack[0][0]
+            self.__stack = []
+
+        return self
+
+    def goto(self, path):
+        """ Moves the focus to a path from the root. Only moves up as far as
+        needed, i.e. to the deepest common ancestor of the focused value and
+        the target.
+
+        :param path: Path to move to.
+        :type path: tuple
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        path = tuple(path)
+        current = self.path
+
+        common = 0
+        for (a, b) in zip(current, path):
+            if a != b:
+                break
+            common += 1
+
+        for i in range(len(current) - common):
+            self.up()
+
+        for step in path[common:]:
+            self.down(step)
+
+        return self
+
+    def replace(self, value):
+        """ Replaces the focused value.
+
+        :param value: New value.
+        :type value: object
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        level = _Level(value)
+
+        if self.__stack:
+            (parent, step, idx) = self.__stack[-1]
+        else:
+            (parent, idx) = (self.__top, 0)
+
+        parent.items[idx] = level
+        self.__current = level
+
+        return self
+
+    def edit(self, fn):
+        """ Replaces the focused value by the result of calling a function on
+        it.
+
+        :param fn: Function to call.
+        :type fn: callable
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        return self.replace(fn(self.focus))
+
+    def insert(self, index, value):
+        """ Inserts a value into the focused tuple or list.
+
+        :param index: Index to insert value at.
+        :type index: int
+
+        :param value: Value to insert.
+        :type value: object
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        self.__sequence().insert(index, value)
+        return self
+
+    def delete(self, index):
+        """ Deletes a value from the focused tuple or list.
+
+        :param index: Index of the value to delete.
+        :type index: int
+
+        :return: this zipper
+        :rtype: Zipper
+        """
+
+        del self.__sequence()[index]
+        return self
+
+    def root(self):
+        """ Moves the focus to the root of the tree and returns it.
+
+        :rtype: object
+        """
+
+        return self.top().focus
+
+    def __down_to(self, step, idx):
+        """ Moves the focus to an item of the focused value.
+
+        :param step: Step that was used to move.
+        :type step: object
+
+        :param idx: Index of the item.
+        :type idx: object
+        """
+
+        level = self.__current
+        child = level.items[idx]
+
+        if not isinstance(child, _Level):
+            child = _Level(child)
+            level.items[idx] = child
+
+        self.__stack.append((level, step, idx))
+        self.__current = child
+
+    def __sequence(self):
+        """ Returns the items of the focused tuple or list.
+
+        :rtype: list
+        """
+
+        level = self.__current
+        level.open()
+
+        if level.names is not None or type(level.items) is not list:
+            raise TypeError("%r is not a tuple or list" % (level.value,))
+
+        return level.items
+
+
+def update(root, path, fn):
+    """ Replaces the value at a path within a tree by the result of calling a
+    function on it. See Zipper.goto for the format of paths.
+
+    :param root: Tree to update.
+    :type root: object
+
+    :param path: Path to value to replace.
+    :type path: tuple
+
+    :param fn: Function that returns the new value.
+    :type fn: callable
+
+    :rtype: object
+    """
+
+    return Zipper(root).goto(path).edit(fn).root()
+
+
+#
+# Internal helpers
+#
+
+class _Level(object):
+    """ A value within a Zipper. Once opened, the items of the value are
+    kept in a mutable list or dictionary, where values that were navigated
+    into are replaced by _Level instances. """
+
+    def __init__(self, value):
+        """ Creates a new _Level() instance.
+
+        :param value: Value of this level.
+        :type value: object
+        """
+
+        self.value = value
+        self.items = None
+        self.names = None
+        self.vararg = None
+
+    def open(self):
+        """ Makes the items of the value of this level available. """
+
+        if self.items is not None:
+            return
+
+        value = self.value
+
+        if isinstance(value, case_class.CaseClass):
+            applied = value.case_signature
+            self.names = {}
+
+            for (i, (n, t, v)) in enumerate(applied):
+                self.names[n] = i
+                if t == signature.Signature.VARARG:
+                    self.vararg = n
+
+            self.items = list(applied.values())
+
+        elif type(value) is tuple or type(value) is list:
+            self.items = list(value)
+
+        elif type(value) is dict:
+            self.items = dict(value)
+
+        else:
+            raise TypeError("Can not navigate into %r" % (value,))
+
+    def build(self):
+        """ Builds the new value of this level from its items, which must not
+        contain any _Level instances, and returns it.
+
+        :rtype: object
+        """
+
+        value = self.value
+        items = self.items
+
+        if isinstance(value, case_class.CaseClass):
+            old = value.case_signature.values()
+            if len(old) != len(items) or \
+                    any(n is not o for (n, o) in zip(items, old)):
+                value = value.__class__.from_values(items)
+
+        elif type(value) is tuple or type(value) is list:
+            if len(value) != len(items) or \
+                    any(n is not o for (n, o) in zip(items, value)):
+                value = type(value)(items)
+
+        elif type(value) is dict:
+            if set(value) != set(items) or \
+                    any(items[k] is not value[k] for k in value):
+                value = dict(items)
+
+        self.value = value
+        return value
+
+
+def _close(level):
+    """ Builds the value of a level and of all the levels within it
+    bottom-up, and replaces the nested levels by their values.
+
+    :param level: Level to close.
+    :type level: _Level
+
+    :rtype: object
+    """
+
+    # stack of (level, expanded) pairs
+    stack = [(level, False)]
+
+    while stack:
+        (current, expanded) = stack.pop()
+
+        if current.items is None:
+            continue
+
+        items = current.items
+        keys = list(items) if type(items) is dict else range(len(items))
+
+        if not expanded:
+            stack.append((current, True))
+            stack.extend((items[k], False) for k in keys
+                         if isinstance(items[k], _Level))
+            continue
+
+        for k in keys:
+            if isinstance(items[k], _Level):
+                items[k] = items[k].value
+
+        current.build()
+
+    return level.value
+
+
+__all__ = ["Zipper", "update"]
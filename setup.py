@@ -16,7 +16,23 @@ setup(
 
     py_modules=['case_class', 'case_class.case_class', 'case_class.clsutils',
                 'case_class.exceptions', 'case_class.signature',
-                'case_class.utils', 'case_class.extractor'],
+                'case_class.utils', 'case_class.extractor',
+                'case_class.representation', 'case_class.traversal',
+                'case_class.rewriting', 'case_class.egraph',
+                'case_class.unification', 'case_class.diff',
+                'case_class.zipper', 'case_class.attributes',
+                'case_class.caching', 'case_class.digest',
+                'case_class.diskmemo', 'case_class.index',
+                'case_class.footprint', 'case_class.sorting',
+                'case_class.codec', 'case_class.jsoncodec',
+                'case_class.arrow', 'case_class.columnar',
+                'case_class.query', 'case_class.fieldindex',
+                'case_class.persistent', 'case_class.parallel'],
+
+    extras_require={
+        'arrow': ['pyarrow'],
+        'query': ['numpy'],
+    },
 
     description=("Scala-like CaseClasses for Python"),
     long_description=read('README.rst'),
@@ -0,0 +1,108 @@
+"""
+testing case_class.arrow
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+
+from case_class import case_class
+from case_class import arrow
+from case_class import exceptions
+
+
+class Point(case_class.CaseClass):
+    def __init__(self, x, y, label, flag=False):
+        pass
+
+    __init__.__annotations__ = {'x': float, 'y': 'float', 'label': str}
+
+
+class Pixel(case_class.CaseClass):
+    def __init__(self, x, y, data):
+        pass
+
+    __init__.__annotations__ = {'x': int, 'y': int, 'data': bytes}
+
+
+class Tagged(case_class.CaseClass):
+    def __init__(self, *tags):
+        pass
+
+
+@skipIf(arrow.pyarrow is None, 'requires pyarrow')
+class TestArrow(TestCase):
+    """ Tests the arrow functions. """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'points.arrow')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_schema(self):
+        """ Tests deriving schemas from annotations. """
+
+        self.assertRaises(exceptions.CodecException, arrow.schema, Point)
+
+        s = arrow.schema(Pixel)
+        self.assertEqual(s.names, ['x', 'y', 'data'])
+        self.assertEqual([str(t) for t in s.types],
+                         ['int64', 'int64', 'binary'])
+
+    def test_roundtrip(self):
+        """ Tests writing and reading instances. """
+
+        points = [Point(float(i), i / 2.0, u'p%d' % i, i % 3 == 0)
+                  for i in range(1000)]
+
+        self.assertEqual(arrow.write(points, self.path, batch_size=64), 1000)
+
+        with arrow.read(self.path) as reader:
+            self.assertTrue(reader.cls is Point, 'class is found')
+            self.assertEqual(len(reader), 1000)
+            self.assertEqual(str(reader.schema.field('x').type), 'double')
+            self.assertEqual(str(reader.schema.field('flag').type), 'bool')
+
+            restored = list(reader)
+            self.assertTrue(all(a is b for (a, b) in zip(points, restored)),
+                            'instances are interned')
+            self.assertEqual(len(restored), 1000)
+
+            self.assertTrue(reader[100] is points[100], 'row access')
+            self.assertTrue(reader[-1] is points[-1], 'negative row access')
+            self.assertRaises(IndexError, lambda: reader[1000])
+
+            column = reader.column('label')
+            self.assertEqual(len(column), 1000)
+            self.assertEqual(column[5].as_py(), u'p5')
+            self.assertRaises(exceptions.NoSuchArgument, reader.column, 'z')
+
+            self.assertEqual(reader.table().num_rows, 1000)
+
+    def test_empty(self):
+        """ Tests writing an empty collection. """
+
+        self.assertRaises(exceptions.CodecException, arrow.write, [],
+                          self.path)
+
+        self.assertEqual(arrow.write([], self.path, cls=Point), 0)
+
+        with arrow.read(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader), [])
+
+    def test_invalid(self):
+        """ Tests that only flat records of one class can be written. """
+
+        self.assertRaises(exceptions.CodecException, arrow.write,
+                          [Tagged(1)], self.path)
+        self.assertRaises(exceptions.CodecException, arrow.write,
+                          [Point(1.0, 2.0, u'a'), Tagged()], self.path)
+        self.assertRaises(exceptions.CodecException, arrow.write,
+                          [Point(1.0, 2.0, Point(1.0, 2.0, u'a'))],
+                          self.path)
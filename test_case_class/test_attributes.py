@@ -0,0 +1,72 @@
+"""
+testing case_class.attributes
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import traversal
+from case_class.attributes import case_attribute
+
+
+class Expr(case_class.AbstractCaseClass):
+    #: number of times size was computed
+    computed = []
+
+    @case_attribute
+    def size(self):
+        """ The number of nodes in this expression. """
+
+        Expr.computed.append(self)
+        return 1 + sum(c.size for c in traversal.children(self))
+
+
+class Num(Expr):
+    def __init__(self, value):
+        pass
+
+
+class Add(Expr):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+
+class TestCaseAttribute(TestCase):
+    """ Tests the case_attribute class. """
+
+    def setUp(self):
+        del Expr.computed[:]
+
+    def test_cached(self):
+        """ Tests that attributes are computed once per instance. """
+
+        expr = Add(Add(Num(1), Num(2)), Add(Num(1), Num(2)))
+
+        self.assertEqual(expr.size, 7, 'value of attribute')
+        self.assertEqual(len(Expr.computed), 4, 'shared instances once')
+        self.assertEqual(expr.size, 7, 'value of attribute')
+        self.assertEqual(len(Expr.computed), 4, 'not computed again')
+
+        self.assertTrue(Expr.size.is_computed(expr.left), 'computed')
+        self.assertEqual(Expr.size.name, 'size', 'name of attribute')
+        self.assertEqual(Expr.size.__doc__.strip(),
+                         'The number of nodes in this expression.', 'doc')
+
+    def test_incremental(self):
+        """ Tests that only new instances compute the attribute again. """
+
+        expr = Num(0)
+        for i in range(3000):
+            expr = Add(expr, Num(-i))
+
+        self.assertEqual(expr.size, 6001, 'deep trees')
+
+        del Expr.computed[:]
+        edited = expr.copy(right=Num(10000))
+
+        self.assertEqual(edited.size, 6001, 'value of attribute')
+        self.assertEqual(len(Expr.computed), 2, 'only new instances')
+        self.assertIs(Expr.computed[-1], edited, 'new root')
@@ -0,0 +1,102 @@
+"""
+testing case_class.caching
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import threading
+import time
+from unittest import TestCase
+
+from case_class import case_class
+from case_class.caching import case_cached, case_memoize
+
+
+class Point(case_class.CaseClass):
+    #: arguments the cached functions were computed for
+    computed = []
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    @case_cached
+    def norm(self):
+        """ The squared length of this point. """
+
+        Point.computed.append(self)
+        time.sleep(0.01)
+        return self.x * self.x + self.y * self.y
+
+    @case_memoize(maxsize=2)
+    def scale(self, factor):
+        Point.computed.append((self, factor))
+        return Point(self.x * factor, self.y * factor)
+
+
+class Slotted(object):
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        self.value = value
+
+    @case_cached
+    def double(self):
+        return 2 * self.value
+
+
+class TestCaseCached(TestCase):
+    """ Tests the case_cached class. """
+
+    def setUp(self):
+        del Point.computed[:]
+
+    def test_cached(self):
+        """ Tests that values are computed once per instance. """
+
+        self.assertEqual(Point(1, 2).norm, 5, 'value of property')
+        self.assertEqual(Point(1, 2).norm, 5, 'value of property')
+        self.assertEqual(Point.computed, [Point(1, 2)], 'computed once')
+        self.assertEqual(Point.norm.__doc__.strip(),
+                         'The squared length of this point.', 'doc')
+
+        self.assertEqual(Slotted(4).double, 8, 'instances without __dict__')
+
+    def test_threads(self):
+        """ Tests that values are computed once from several threads. """
+
+        p = Point(3, 4)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(p.norm))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, [25] * 8, 'value of property')
+        self.assertEqual(Point.computed, [p], 'computed once')
+
+
+class TestCaseMemoize(TestCase):
+    """ Tests the case_memoize function. """
+
+    def setUp(self):
+        del Point.computed[:]
+        Point.scale.cache_clear()
+
+    def test_memoize(self):
+        """ Tests that results are memoised. """
+
+        p = Point(1, 1)
+
+        self.assertIs(p.scale(2), Point(2, 2), 'result')
+        self.assertIs(p.scale(factor=2), Point(2, 2), 'keyword argument')
+        self.assertIs(p.scale(2), Point(2, 2), 'result')
+        self.assertEqual(len(Point.computed), 2, 'computed once per call')
+
+        p.scale(3)
+        p.scale(4)
+        p.scale(2)
+        self.assertEqual(len(Point.computed), 5, 'least recently used evicted')
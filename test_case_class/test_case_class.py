@@ -4,12 +4,22 @@ testing case_class.case_class
 Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
 """
 
+import copy
+import pickle
 from unittest import main, TestCase
 
 from case_class import case_class
 from case_class import exceptions
 
 
+class Pickled(case_class.CaseClass):
+    """ CaseClass used for pickling tests, which have to find the class by
+    name. """
+
+    def __init__(self, x, *children, **kwargs):
+        pass
+
+
 class TestCaseClass(TestCase):
     """ Tests for the CaseClass class. """
 
@@ -63,6 +73,22 @@ class TestCaseClass(TestCase):
         self.assertEqual(instance1.copy(unknown='dummy'), instance6,
                          'setting unknown keyword arg')
 
+    def test_from_values(self):
+        """ Tests that from_values() creates interned instances. """
+
+        class Foo(case_class.CaseClass):
+            def __init__(self, x, y=1, *args, **kwargs):
+                pass
+
+        instance = Foo(1, 2, 3, key='value')
+
+        self.assertTrue(Foo.from_values((1, 2, (3,), {'key': 'value'})) is
+                        instance, 'existing instance')
+        self.assertEqual(Foo.from_values((1, 2, (), {})), Foo(1, 2),
+                         'new instance')
+        self.assertRaises(exceptions.NotInstantiableClassException,
+                          case_class.CaseClass.from_values, ())
+
     def test___repr__(self):
         """ Tests that repr() calls work as expected. """
 
@@ -114,6 +140,55 @@ class TestCaseClass(TestCase):
         self.assertEqual(inst_one_a, inst_one_b, 'normal equality')
         self.assertNotEqual(inst_one_b, inst_two, 'normal inequality')
 
+    def test___eq___not_interned(self):
+        """ Tests that CaseClass instances that bypassed interning are
+        compared structurally. """
+
+        class Test(case_class.CaseClass):
+            def __init__(self, x, *children):
+                pass
+
+        interned = Test(1, Test(2), Test(3, [4]))
+        bypassed = Test.__new__(Test, 1, Test.__new__(Test, 2),
+                                Test.__new__(Test, 3, [4]))
+
+        self.assertTrue(interned is not bypassed, 'interning was bypassed')
+        self.assertEqual(interned, bypassed, 'structural equality')
+        self.assertEqual(hash(interned), hash(bypassed), 'structural hash')
+        self.assertNotEqual(interned, Test.__new__(Test, 1, Test(2)),
+                            'structural inequality')
+
+    def test___eq___deep(self):
+        """ Tests that comparing deep trees does not hit the recursion
+        limit. """
+
+        class Test(case_class.CaseClass):
+            def __init__(self, x, *children):
+                pass
+
+        interned = Test(0)
+        bypassed = Test.__new__(Test, 0)
+
+        for i in range(3000):
+            interned = Test(i, interned)
+            bypassed = Test.__new__(Test, i, bypassed)
+
+        self.assertEqual(interned, bypassed, 'equality of deep trees')
+        self.assertNotEqual(interned, Test(-1, bypassed),
+                            'inequality of deep trees')
+
+    def test_hash(self):
+        """ Tests that CaseClass instances can be used as dictionary keys. """
+
+        class Test(case_class.CaseClass):
+            def __init__(self, x, **kwargs):
+                pass
+
+        d = {Test(1, key=[1, 2]): 'one', Test(2): 'two'}
+
+        self.assertEqual(d[Test(1, key=[1, 2])], 'one', 'lookup by key')
+        self.assertEqual(d[Test(2)], 'two', 'lookup by other key')
+
     def test_no_inheritance(self):
         """ Tests that case-to-case inheritance is disabled by default. """
 
@@ -126,6 +201,33 @@ class TestCaseClass(TestCase):
 
         self.assertRaises(exceptions.NoCaseToCaseInheritanceException, code)
 
+    def test_pickle(self):
+        """ Tests that pickled CaseClass instances are interned again when
+        they are unpickled. """
+
+        shared = Pickled('shared', key=[1, 2])
+        tree = Pickled(1, shared, Pickled(2, shared))
+
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            restored = pickle.loads(pickle.dumps(tree, protocol))
+            self.assertTrue(restored is tree, 'unpickled instance is interned '
+                                              'with protocol %d' % protocol)
+
+        # shared subtrees are written once
+        data = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+        self.assertEqual(data.count(b'shared'), 1, 'shared subtree')
+
+    def test_copy_protocol(self):
+        """ Tests that copying a CaseClass instance returns the instance
+        itself. """
+
+        tree = Pickled(1, Pickled(2), key={'a': [1]})
+
+        self.assertTrue(copy.copy(tree) is tree, 'copy')
+        self.assertTrue(copy.deepcopy(tree) is tree, 'deepcopy')
+        self.assertTrue(copy.deepcopy([tree])[0] is tree,
+                        'deepcopy of a containing list')
+
 
 class TestAbstractCaseClass(TestCase):
     """ Tests for the AbstractCaseClass class. """
@@ -256,5 +358,76 @@ class TestInheritableCaseClass(TestCase):
                          "it is possible to send default values with key names")
 
 
+class TestOrderedCaseClass(TestCase):
+    """ Tests for the OrderedCaseClass class. """
+
+    def test_no_direct(self):
+        """ Tests that the OrderedCaseClass class can not be
+            instantiated directly. """
+
+        self.assertRaises(exceptions.NotInstantiableClassException,
+                          case_class.OrderedCaseClass)
+
+    def test_ordering(self):
+        """ Tests that OrderedCaseClass instances are ordered by their
+        parameters. """
+
+        class Test(case_class.OrderedCaseClass):
+            def __init__(self, x, *children):
+                pass
+
+        self.assertTrue(Test(1) < Test(2), 'ordering by first parameter')
+        self.assertTrue(Test(1, Test(2)) > Test(1, Test(1)),
+                        'ordering by nested parameter')
+        self.assertTrue(Test(1) < Test(1, Test(0)),
+                        'shorter varargs are smaller')
+        self.assertTrue(Test(1) <= Test(1) and Test(1) >= Test(1),
+                        'ordering of equal instances')
+        self.assertEqual(sorted([Test(3), Test(1), Test(2)]),
+                         [Test(1), Test(2), Test(3)], 'sorting instances')
+
+    def test_abstract(self):
+        """ Tests that OrderedCaseClass can be combined with
+        AbstractCaseClass. """
+
+        class Expr(case_class.AbstractCaseClass, case_class.OrderedCaseClass):
+            pass
+
+        class Num(Expr):
+            def __init__(self, n):
+                pass
+
+        class Var(Expr):
+            def __init__(self, name):
+                pass
+
+        self.assertTrue(Num(1) < Num(2), 'ordering of subclass instances')
+        self.assertRaises(TypeError, lambda: Num(1) < Var('x'))
+
+    def test_no_inheritance(self):
+        """ Tests that concrete OrderedCaseClass classes can not be
+        inherited from. """
+
+        class Test(case_class.OrderedCaseClass):
+            def __init__(self, x):
+                pass
+
+        def code():
+            class Failure(Test):
+                pass
+
+        self.assertRaises(exceptions.NoCaseToCaseInheritanceException, code)
+
+        class Base(case_class.OrderedCaseClass,
+                   case_class.InheritableCaseClass):
+            def __init__(self, x):
+                pass
+
+        class Sub(Base):
+            pass
+
+        self.assertTrue(Sub(1) < Sub(2), 'inheritable ordered classes')
+
+
 if __name__ == '__main__':
     main()
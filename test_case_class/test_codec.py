@@ -0,0 +1,78 @@
+"""
+testing case_class.codec
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import io
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import codec
+from case_class import exceptions
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        pass
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        pass
+
+
+class Many(case_class.CaseClass):
+    def __init__(self, *items, **options):
+        pass
+
+
+class TestCodec(TestCase):
+    """ Tests the codec functions. """
+
+    def test_roundtrip(self):
+        """ Tests encoding and decoding values. """
+
+        values = [None, True, False, 0, -1, 2 ** 70, -(2 ** 70), 1.5,
+                  u'text ☃', b'\x00\xff', (), [1, (2,)], {'a': [None]},
+                  Leaf(1), Many(), Many(Leaf(1), Leaf(u'x'), key={'k': 1.0}),
+                  Node(Leaf(1), Many(Leaf([1, 2]), Node(Leaf(3), Leaf(4))))]
+
+        for value in values:
+            decoded = codec.loads(codec.dumps(value))
+            self.assertEqual(decoded, value, 'roundtrip of %r' % (value,))
+            self.assertEqual(type(decoded), type(value), 'type of %r' % (
+                value,))
+
+        tree = Node(Leaf(1), Leaf(2))
+        self.assertIs(codec.loads(codec.dumps(tree)), tree, 'interned')
+
+        buf = io.BytesIO()
+        codec.dump(tree, buf)
+        buf.seek(0)
+        self.assertIs(codec.load(buf), tree, 'file objects')
+
+    def test_shared(self):
+        """ Tests that shared instances are written once. """
+
+        tree = Leaf(0)
+        for i in range(3000):
+            tree = Node(tree, tree)
+
+        data = codec.dumps(tree)
+        self.assertTrue(len(data) < 3000 * 8, 'back-references')
+        self.assertIs(codec.loads(data), tree, 'deep shared tree')
+
+    def test_errors(self):
+        """ Tests invalid data and values. """
+
+        self.assertRaises(exceptions.CodecException, codec.dumps, object())
+        self.assertRaises(exceptions.CodecException, codec.loads, b'nope')
+
+        data = codec.dumps(Node(Leaf(1), Leaf(2)))
+        self.assertRaises(exceptions.CodecException, codec.loads, data[:-1])
+        self.assertRaises(exceptions.CodecException, codec.loads, data + b'0')
+        self.assertRaises(exceptions.CodecException, codec.find_class,
+                          'test_case_class.test_codec', 'Missing')
+        self.assertIs(codec.find_class('test_case_class.test_codec', 'Leaf'),
+                      Leaf, 'find classes')
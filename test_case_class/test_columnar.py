@@ -0,0 +1,138 @@
+"""
+testing case_class.columnar
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import columnar
+from case_class import exceptions
+
+
+class Edge(case_class.CaseClass):
+    def __init__(self, src, dst, weight=1.0, directed=False, label='edge'):
+        pass
+
+    __init__.__annotations__ = {'src': int, 'dst': int, 'weight': float,
+                                'directed': bool}
+
+
+class Positive(case_class.CaseClass):
+    def __init__(self, n):
+        if n <= 0:
+            raise ValueError("n has to be positive")
+
+    __init__.__annotations__ = {'n': 'int'}
+
+
+class Many(case_class.CaseClass):
+    def __init__(self, *items):
+        pass
+
+
+class TestCaseClassArray(TestCase):
+    """ Tests the CaseClassArray class. """
+
+    def test_columns(self):
+        """ Tests creating arrays and accessing rows. """
+
+        edges = [Edge(i, i + 1, float(i)) for i in range(10)]
+        array = columnar.CaseClassArray.from_instances(Edge, edges)
+
+        self.assertEqual(len(array), 10)
+        self.assertEqual(array.names,
+                         ['src', 'dst', 'weight', 'directed', 'label'])
+        self.assertEqual(array.column('dst'), list(range(1, 11)))
+        self.assertTrue(array[3] is edges[3], 'rows are interned')
+        self.assertEqual(list(array), edges)
+        self.assertEqual(list(array[2:4]), edges[2:4])
+        self.assertEqual(list(array.take([5, 1])), [edges[5], edges[1]])
+
+        self.assertRaises(exceptions.NoSuchArgument, array.column, 'x')
+        self.assertRaises(exceptions.CodecException,
+                          columnar.CaseClassArray, Edge, {'src': [1]})
+        self.assertRaises(exceptions.CodecException,
+                          columnar.CaseClassArray.from_instances, Many, [])
+
+
+class TestReadCSV(TestCase):
+    """ Tests the read_csv function. """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_csv(self):
+        """ Tests reading instances from a file. """
+
+        path = os.path.join(self.directory, 'edges.csv')
+
+        with io.open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(u'dst,src,weight,directed,extra\n')
+            for i in range(100):
+                f.write(u'%d,%d,%s,%s,x\n' % (i + 1, i, i / 2.0,
+                                              'yes' if i % 2 else 'no'))
+
+        edges = list(Edge.read_csv(path, chunk_size=7))
+        self.assertEqual(len(edges), 100)
+        self.assertTrue(edges[4] is Edge(4, 5, 2.0, False), 'converted')
+        self.assertTrue(edges[5] is Edge(5, 6, 2.5, True), 'converted')
+
+        chunks = list(Edge.read_csv(path, chunk_size=30, arrays=True))
+        self.assertEqual([len(c) for c in chunks], [30, 30, 30, 10])
+        self.assertEqual([e for c in chunks for e in c], edges)
+
+    def test_errors(self):
+        """ Tests that bad rows are reported and skipped. """
+
+        data = io.StringIO(u'src,dst,weight\n'
+                           u'1,2,\n'
+                           u'x,3,1.0\n'
+                           u'4,5\n'
+                           u'\n'
+                           u'6,7,2.0\n')
+
+        errors = []
+        edges = list(Edge.read_csv(data, errors=errors))
+
+        self.assertEqual(edges, [Edge(1, 2), Edge(6, 7, 2.0)])
+        self.assertEqual([e.line for e in errors], [3, 4])
+        self.assertEqual(errors[0].row, ['x', '3', '1.0'])
+
+        errors = []
+        data = io.StringIO(u'src,dst\n1\n2\n')
+        self.assertEqual(list(Edge.read_csv(data, errors=errors)), [])
+        self.assertEqual([e.line for e in errors], [2, 3])
+
+        errors = []
+        data = io.StringIO(u'n\n1\n-1\n2\n')
+        self.assertEqual(list(Positive.read_csv(data, errors=errors)),
+                         [Positive(1), Positive(2)])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0].error, ValueError),
+                        'errors of the constructor are reported')
+
+        errors = []
+        data = io.StringIO(u'n\n1\n-1\nx\n')
+        (array,) = Positive.read_csv(data, arrays=True, errors=errors)
+        self.assertEqual([e.line for e in errors], [4],
+                         'conversion errors are reported for arrays')
+        self.assertEqual(array.column('n'), [1, -1])
+        self.assertTrue(array[0] is Positive(1))
+        self.assertRaises(ValueError, lambda: array[1])
+
+    def test_missing(self):
+        """ Tests that required columns have to exist. """
+
+        data = io.StringIO(u'src,weight\n1,2.0\n')
+
+        self.assertRaises(exceptions.CodecException, list,
+                          Edge.read_csv(data))
@@ -0,0 +1,96 @@
+"""
+testing case_class.diff
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import diff
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        pass
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        pass
+
+
+class Many(case_class.CaseClass):
+    def __init__(self, *items):
+        pass
+
+
+class TestDiff(TestCase):
+    """ Tests the diff and apply_patch functions. """
+
+    def assertPatches(self, old, new):
+        """ Asserts that the diff of two trees turns one into the other. """
+
+        edits = diff.diff(old, new)
+        self.assertIs(diff.apply_patch(old, edits), new, 'patch applies')
+        return edits
+
+    def test_replace(self):
+        """ Tests replacing values within a tree. """
+
+        old = Node(Node(Leaf(1), Leaf(2)), Leaf(3))
+        new = Node(Node(Leaf(1), Leaf(5)), Leaf(3))
+
+        self.assertEqual(self.assertPatches(old, new),
+                         [diff.Replace(('left', 'right', 'value'), 5)],
+                         'only the changed leaf is replaced')
+
+        self.assertEqual(self.assertPatches(old, Leaf(1)),
+                         [diff.Replace((), Leaf(1))], 'replace the root')
+
+        self.assertEqual(diff.diff(old, old), [], 'no edits')
+
+    def test_varargs(self):
+        """ Tests inserting and deleting varargs. """
+
+        old = Many(Leaf(1), Leaf(2), Leaf(3), Leaf(4))
+        new = Many(Leaf(0), Leaf(1), Leaf(3), Leaf(4), Leaf(5))
+
+        edits = self.assertPatches(old, new)
+        self.assertTrue(all(isinstance(e, (diff.Insert, diff.Delete))
+                            for e in edits), 'only inserts and deletes')
+        self.assertEqual(len(edits), 3, 'compact edit script')
+
+        self.assertPatches(Many(Node(Leaf(1), Leaf(2))),
+                           Many(Node(Leaf(1), Leaf(3)), Leaf(4)))
+
+        self.assertPatches(Many(), Many(Leaf(1), [Leaf(2), {'a': 3}]))
+        self.assertPatches(Many([Leaf(2), {'a': 3}]),
+                           Many([Leaf(2), {'a': 4}]))
+
+    def test_large(self):
+        """ Tests that shared subtrees are skipped. """
+
+        tree = Leaf(0)
+        for i in range(3000):
+            tree = Node(tree, Leaf(i))
+
+        edits = self.assertPatches(tree, tree.copy(right=Leaf(-1)))
+        self.assertEqual(edits, [diff.Replace(('right', 'value'), -1)],
+                         'one edit')
+
+    def test_apply_patch(self):
+        """ Tests applying several edits at once. """
+
+        old = Node(Many(Leaf(1), Leaf(2)), Leaf(3))
+        edits = [diff.Replace(('left', 'items', 0, 'value'), 10),
+                 diff.Insert(('left', 'items'), 0, Leaf(0)),
+                 diff.Replace(('left', 'items', 1), Leaf(11)),
+                 diff.Delete(('left', 'items'), 2)]
+
+        self.assertEqual(diff.apply_patch(old, edits),
+                         Node(Many(Leaf(0), Leaf(11)), Leaf(3)),
+                         'edits applied in order')
+        self.assertIs(diff.apply_patch(old, []), old, 'no edits')
+        self.assertRaises(TypeError, diff.apply_patch, old,
+                          [diff.Insert(('left',), 0, Leaf(0))])
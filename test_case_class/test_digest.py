@@ -0,0 +1,93 @@
+"""
+testing case_class.digest
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import subprocess
+import sys
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import digest
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        pass
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        pass
+
+
+class Other(case_class.CaseClass):
+    def __init__(self, left, right):
+        pass
+
+
+class Opaque(object):
+    def __init__(self, data):
+        self.data = data
+
+
+class TestDigest(TestCase):
+    """ Tests the digest function. """
+
+    def test_digest(self):
+        """ Tests that digests depend on classes and values. """
+
+        tree = Node(Leaf(1), Leaf([u'a', b'b', None, 1.5, {'k': (True,)}]))
+
+        self.assertEqual(len(digest.digest(tree)), 64, 'sha256 hex digest')
+        self.assertEqual(digest.digest(tree), digest.digest(
+            Node(Leaf(1), Leaf([u'a', b'b', None, 1.5, {'k': (True,)}]))),
+            'equal trees have equal digests')
+
+        digests = set(digest.digest(t) for t in [
+            tree, Other(Leaf(1), Leaf(1)), Node(Leaf(1), Leaf(1)),
+            Node(Leaf(1), Leaf(2)), Node(Leaf(1), Leaf('1')),
+            Node(Leaf(1), Leaf((1,))), Node(Leaf(1), Leaf([1])),
+            Node(Leaf((1, 2)), Leaf(3)), Node(Leaf(1), Leaf((2, 3)))])
+        self.assertEqual(len(digests), 9, 'different trees differ')
+
+        self.assertEqual(digest.qualified_name(Leaf),
+                         'test_case_class.test_digest.Leaf', 'qualified name')
+
+    def test_stable(self):
+        """ Tests that digests are the same in another process. """
+
+        code = ("from test_case_class.test_digest import Node, Leaf; "
+                "from case_class.digest import digest; "
+                "print(digest(Node(Leaf('x'), Leaf(2))))")
+        output = subprocess.check_output([sys.executable, '-c', code])
+
+        self.assertEqual(output.decode('ascii').strip(),
+                         digest.digest(Node(Leaf('x'), Leaf(2))),
+                         'same digest in a new process')
+
+    def test_encoders(self):
+        """ Tests custom encoders. """
+
+        self.assertRaises(TypeError, digest.digest, Leaf(Opaque(b'a')))
+
+        encoders = {Opaque: lambda o: o.data}
+        self.assertNotEqual(digest.digest(Leaf(Opaque(b'a')), encoders),
+                            digest.digest(Leaf(Opaque(b'b')), encoders),
+                            'custom encoder')
+        self.assertNotEqual(digest.digest(Leaf(Opaque(b'a')), encoders),
+                            digest.digest(Leaf(b'a')), 'type is encoded')
+
+    def test_deep(self):
+        """ Tests digests of deep trees. """
+
+        tree = Leaf(0)
+        for i in range(3000):
+            tree = Node(tree, Leaf(i))
+
+        self.assertEqual(digest.digest(tree),
+                         digest.digest(tree.copy(right=Leaf(2999))), 'cached')
+        self.assertNotEqual(digest.digest(tree),
+                            digest.digest(tree.copy(right=Leaf(-1))),
+                            'edited tree')
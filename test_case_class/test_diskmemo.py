@@ -0,0 +1,104 @@
+"""
+testing case_class.diskmemo
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import diskmemo
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        self.value = value
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+
+class TestDiskMemo(TestCase):
+    """ Tests the DiskMemo class. """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'memo.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store(self):
+        """ Tests storing and evicting values. """
+
+        memo = diskmemo.DiskMemo(self.path, max_size=100)
+
+        memo.set('a', 'x' * 40)
+        memo.set('b', 'y' * 40)
+        self.assertEqual(memo.get('a'), 'x' * 40, 'stored value')
+        self.assertEqual(len(memo), 2, 'number of values')
+
+        memo.set('c', 'z' * 40)
+        self.assertTrue('a' in memo, 'recently used value is kept')
+        self.assertFalse('b' in memo, 'least recently used value is evicted')
+        self.assertTrue(memo.size <= 100, 'size is bounded')
+
+        memo.delete('a')
+        self.assertEqual(memo.get('a', 1), 1, 'default value')
+
+        memo.set('c', 'w' * 20)
+        self.assertEqual(memo.size, len(pickle.dumps('w' * 20, 2)),
+                         'replaced value')
+
+        memo.clear()
+        self.assertEqual(len(memo), 0, 'clear')
+        self.assertEqual(memo.size, 0, 'size after clear')
+        memo.close()
+
+        # the running total is kept in the database
+        memo = diskmemo.DiskMemo(self.path, max_size=100)
+        memo.set('d', 'x' * 40)
+        memo.close()
+
+        memo = diskmemo.DiskMemo(self.path, max_size=100)
+        self.assertEqual(memo.size, len(pickle.dumps('x' * 40, 2)))
+        memo.close()
+
+    def test_memoize(self):
+        """ Tests memoising a function across instances of the store. """
+
+        calls = []
+
+        def size(tree, scale=1):
+            calls.append(tree)
+            if isinstance(tree, Leaf):
+                return scale
+            return size(tree.left, scale) + size(tree.right, scale)
+
+        tree = Node(Node(Leaf(1), Leaf(2)), Leaf(3))
+
+        memo = diskmemo.DiskMemo(self.path)
+        memoized = memo.memoize()(size)
+        self.assertEqual(memoized(tree), 3, 'computed result')
+        self.assertEqual(memoized(tree, scale=2), 6, 'keyword arguments')
+        memo.close()
+
+        del calls[:]
+
+        memoized = diskmemo.disk_memoize(self.path)(size)
+        self.assertEqual(memoized(tree), 3, 'stored result')
+        self.assertEqual(calls, [], 'not computed again')
+        self.assertEqual(len(memoized.store), 2, 'store of the function')
+        memoized.close()
+
+        memoized = diskmemo.disk_memoize(self.path, version=2)(size)
+        self.assertEqual(memoized(tree), 3, 'computed result')
+        self.assertNotEqual(calls, [], 'new version is computed again')
+        memoized.close()
@@ -0,0 +1,116 @@
+"""
+testing case_class.egraph
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import egraph
+from case_class.extractor import T, V, L
+
+
+class Expr(case_class.AbstractCaseClass):
+    pass
+
+
+class Num(Expr):
+    def __init__(self, n):
+        pass
+
+
+class Var(Expr):
+    def __init__(self, name):
+        pass
+
+
+class Add(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class Mul(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class Div(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class Shl(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class TestEGraph(TestCase):
+    """ Tests the EGraph class. """
+
+    def test_add(self):
+        """ Tests that equal terms are stored once. """
+
+        graph = egraph.EGraph()
+
+        a = graph.add(Mul(Var('x'), Var('x')))
+        b = graph.add(Mul(Var('x'), Var('x')))
+
+        self.assertEqual(a, b, 'equal terms are in the same class')
+        self.assertEqual(len(graph), 2, 'shared subterms are stored once')
+        self.assertEqual(graph.lookup(Var('x')), graph.add(Var('x')),
+                         'lookup of an existing term')
+        self.assertEqual(graph.lookup(Var('y')), None,
+                         'lookup of a missing term')
+
+    def test_congruence(self):
+        """ Tests that merging classes restores congruence. """
+
+        graph = egraph.EGraph()
+
+        fa = graph.add(Mul(Var('a'), Num(2)))
+        fb = graph.add(Mul(Var('b'), Num(2)))
+
+        graph.merge(graph.add(Var('a')), graph.add(Var('b')))
+        graph.rebuild()
+
+        self.assertEqual(graph.find(fa), graph.find(fb),
+                         'congruent terms are merged')
+
+    def test_simplify(self):
+        """ Tests simplification using equality saturation. """
+
+        rules = [
+            # x * 2 => x << 1
+            (T(Mul)(V('x'), L(Num(2))), lambda ctx: Shl(ctx.x, Num(1))),
+            # (x * y) / z => x * (y / z)
+            (T(Div)(T(Mul)(V('x'), V('y')), V('z')),
+             lambda ctx: Mul(ctx.x, Div(ctx.y, ctx.z))),
+            # x / x => 1
+            (T(Div)(V('x'), V('y')),
+             lambda ctx: Num(1) if ctx.x == ctx.y else None),
+            # x * 1 => x
+            (T(Mul)(V('x'), L(Num(1))), lambda ctx: ctx.x),
+        ]
+
+        term = Div(Mul(Var('a'), Num(2)), Num(2))
+
+        self.assertEqual(egraph.simplify(term, rules), Var('a'),
+                         'simplified term')
+
+    def test_simplify_commutative(self):
+        """ Tests simplification rules together with a commutativity rule. """
+
+        rules = [
+            # x + 0 => x
+            (T(Add)(V('x'), L(Num(0))), lambda ctx: ctx.x),
+            # x * 1 => x
+            (T(Mul)(V('x'), L(Num(1))), lambda ctx: ctx.x),
+            # x + y => y + x
+            (T(Add)(V('x'), V('y')), lambda ctx: Add(ctx.y, ctx.x)),
+        ]
+
+        term = Mul(Add(Var('x'), Num(0)), Num(1))
+
+        self.assertEqual(egraph.simplify(term, rules), Var('x'),
+                         'simplified term')
@@ -0,0 +1,50 @@
+"""
+testing case_class.extractor
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class.extractor import T, V
+
+
+class Items(case_class.CaseClass):
+    def __init__(self, first, *rest):
+        pass
+
+
+class Options(case_class.CaseClass):
+    def __init__(self, name, **options):
+        pass
+
+
+class TestA(TestCase):
+    """ Tests applying patterns to CaseClass instances. """
+
+    def test_varargs(self):
+        """ Tests that varargs are matched item by item. """
+
+        ctx = T(Items)(V('a'), V('b'), 3).extract(Items(1, 2, 3))
+        self.assertEqual(ctx['a'], 1)
+        self.assertEqual(ctx['b'], 2)
+
+        self.assertTrue(T(Items)(1).matches(Items(1)))
+        self.assertFalse(T(Items)(1, 2).matches(Items(1)))
+        self.assertFalse(T(Items)(1, 2).matches(Items(1, 2, 3)))
+        self.assertFalse(T(Items)(1, 2, 4).matches(Items(1, 2, 3)))
+
+    def test_keyword_varargs(self):
+        """ Tests that keyword varargs match a subset of the keys. """
+
+        options = Options('x', size=1, color='red')
+
+        ctx = T(Options)(V('n'), size=V('s')).extract(options)
+        self.assertEqual(ctx['n'], 'x')
+        self.assertEqual(ctx['s'], 1)
+
+        self.assertTrue(T(Options)('x').matches(options))
+        self.assertTrue(T(Options)('x', size=1, color='red').matches(options))
+        self.assertFalse(T(Options)('x', size=2).matches(options))
+        self.assertFalse(T(Options)('x', weight=1).matches(options))
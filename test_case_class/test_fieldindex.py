@@ -0,0 +1,120 @@
+"""
+testing case_class.fieldindex
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import exceptions
+from case_class import fieldindex
+from case_class.query import field
+
+
+class TestFieldIndex(TestCase):
+    """ Tests secondary indexes and CaseClass.instances(). """
+
+    def test_instances(self):
+        """ Tests finding instances without indexes. """
+
+        class Edge(case_class.CaseClass):
+            def __init__(self, src, dst):
+                pass
+
+        edges = [Edge(i % 3, i) for i in range(10)]
+
+        self.assertEqual(list(Edge.instances()), edges)
+        self.assertEqual(list(Edge.instances(where=field('src') == 1)),
+                         edges[1::3])
+        self.assertEqual(list(Edge.instances(where=field('dst') > 7)),
+                         edges[8:])
+
+        # instances are generated lazily
+        it = Edge.instances(where=field('src') == 2)
+        self.assertTrue(next(it) is edges[2])
+
+    def test_hash_index(self):
+        """ Tests hash indexes. """
+
+        class Edge(case_class.CaseClass):
+            def __init__(self, src, dst):
+                pass
+
+        before = [Edge([i % 3], i) for i in range(10)]
+        index = Edge.create_index('src')
+
+        self.assertTrue(Edge.create_index('src') is index, 'existing index')
+        self.assertTrue(fieldindex.get_index(Edge, 'src') is index)
+        self.assertEqual(len(index), 10)
+
+        after = [Edge([i % 3], i) for i in range(10, 20)]
+        self.assertEqual(len(index), 20, 'index is updated on insert')
+
+        found = list(Edge.instances(where=field('src') == [1]))
+        self.assertEqual(found, [e for e in before + after
+                                 if e.case_params.src == [1]])
+        self.assertEqual(index.lookup([5]), [])
+
+        found = set(Edge.instances(where=field('src').isin([[0], [2]]) &
+                                   (field('dst') < 5)))
+        self.assertEqual(found, set([before[0], before[2], before[3]]))
+
+        self.assertRaises(exceptions.NoSuchArgument, Edge.create_index, 'x')
+
+        fieldindex.drop_index(Edge, 'src')
+        self.assertTrue(fieldindex.get_index(Edge, 'src') is None)
+
+    def test_sorted_index(self):
+        """ Tests sorted indexes. """
+
+        class Item(case_class.CaseClass):
+            def __init__(self, key):
+                pass
+
+        items = [Item(k) for k in [5, 1.5, 'b', None, 3, 'a', 8, (1,)]]
+        index = Item.create_index('key', fieldindex.SORTED)
+
+        self.assertEqual(index.range(2, 6), [Item(3), Item(5)])
+        self.assertEqual(index.range(2, 5, include_high=False), [Item(3)])
+        self.assertEqual(index.range(low='a'), [Item('a'), Item('b')])
+        self.assertEqual(index.lookup(None), [Item(None)])
+        self.assertEqual(len(index), len(items))
+
+        Item(4)
+        self.assertEqual(list(Item.instances(where=field('key') >= 4)),
+                         [Item(4), Item(5), Item(8)])
+        self.assertEqual(list(Item.instances(
+            where=field('key').between(1, 3))), [Item(1.5), Item(3)])
+        self.assertEqual(list(Item.instances(
+            where=(field('key') < 2) | (field('key') == 'b'))),
+            [Item(1.5), Item('b')])
+
+    def test_sorted_index_updates(self):
+        """ Tests building and updating large sorted indexes. """
+
+        class Item(case_class.CaseClass):
+            def __init__(self, key):
+                pass
+
+        items = [Item((i * 7919) % 20000) for i in range(20000)]
+        index = Item.create_index('key', fieldindex.SORTED)
+
+        self.assertEqual(index.range(100, 104),
+                         [Item(k) for k in range(100, 105)])
+
+        for i in range(20000, 20100):
+            Item(-i)
+            Item(i)
+
+        self.assertEqual(len(index), len(items) + 200)
+        self.assertEqual(index.range(19998, 20002),
+                         [Item(k) for k in range(19998, 20003)])
+        self.assertEqual(index.range(high=-20098),
+                         [Item(-20099), Item(-20098)])
+
+        # tuples of the same kind that can not be ordered with each other
+        Item((1,))
+        Item(('a',))
+        self.assertEqual(index.lookup(('a',)), [Item(('a',))])
+        self.assertEqual(index.lookup((1,)), [Item((1,))])
@@ -0,0 +1,80 @@
+"""
+testing case_class.footprint
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import footprint
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        self.value = value
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        pass
+
+
+class Big(case_class.CaseClass):
+    def __init__(self, n):
+        self.payload = list(range(n))
+
+
+class TestFootprint(TestCase):
+    """ Tests the footprint functions. """
+
+    def test_footprint(self):
+        """ Tests the footprint of a tree with shared instances. """
+
+        leaf = Leaf(u'some value')
+        tree = Node(Node(leaf, leaf), Node(leaf, leaf))
+
+        fp = footprint.footprint(tree)
+
+        self.assertEqual(fp.nodes, 3, 'distinct instances')
+        self.assertEqual(fp.tree_size, 7, 'instances in the tree')
+        self.assertAlmostEqual(fp.sharing_ratio, 7.0 / 3, msg='sharing ratio')
+        self.assertEqual(set(fp.by_class), set([Leaf, Node]), 'classes')
+        self.assertEqual(fp.by_class[Node][0], 2, 'instances by class')
+        self.assertEqual(fp.total, sum(fp.by_class[c][1] for c in fp.by_class),
+                         'total')
+        self.assertTrue(all(fp.sizes[k] > 0 for k in [
+            footprint.INSTANCES, footprint.DICTS, footprint.SIGNATURES,
+            footprint.VALUES]), 'sizes')
+        self.assertEqual(fp.sizes[footprint.ATTRIBUTES], 0,
+                         'attributes referring to values are not counted')
+        self.assertTrue(footprint.footprint(Big(10)).sizes[
+            footprint.ATTRIBUTES] > 0, 'other attributes')
+
+        small = footprint.footprint(Leaf(u'some value'))
+        self.assertEqual(small.sizes[footprint.VALUES],
+                         fp.sizes[footprint.VALUES], 'values counted once')
+
+    def test_registry_report(self):
+        """ Tests the report of all instances. """
+
+        tree = Node(Leaf(-1), Leaf(-1))
+        report = footprint.registry_report()
+
+        self.assertTrue(report[Leaf].nodes >= 1, 'number of instances')
+        self.assertTrue(report[Leaf].tree_size >= 2, 'number of references')
+        self.assertIn(tree.__class__, report, 'all classes')
+
+    def test_trace_allocations(self):
+        """ Tests tracing allocations of instances. """
+
+        with footprint.trace_allocations() as sites:
+            kept = [Big(1000 + i) for i in range(3)]
+
+        self.assertEqual(len(kept), 3, 'instances are kept')
+        self.assertTrue(sites, 'allocations are found')
+
+        ((filename, lineno), (size, count)) = max(
+            sites.items(), key=lambda item: item[1][0])
+        self.assertTrue(filename.endswith('test_footprint.py'), 'call site')
+        self.assertTrue(size > 3000 * 8, 'allocated memory')
@@ -0,0 +1,91 @@
+"""
+testing case_class.index
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import index
+from case_class.extractor import T, V, _
+
+
+class Expr(case_class.AbstractCaseClass):
+    pass
+
+
+class Num(Expr):
+    def __init__(self, value):
+        pass
+
+
+class Add(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class Neg(Expr):
+    def __init__(self, arg):
+        pass
+
+
+class TestSubtreeIndex(TestCase):
+    """ Tests the SubtreeIndex class and the find_all function. """
+
+    def test_class_set(self):
+        """ Tests the classes found in trees. """
+
+        self.assertEqual(index.class_set(Add(Num(1), Neg(Num(2)))),
+                         frozenset([Add, Num, Neg]), 'classes in a tree')
+        self.assertIs(index.class_set(Num(1)), index.class_set(Num(2)),
+                      'equal sets are shared')
+
+    def test_nodes(self):
+        """ Tests grouping instances by class. """
+
+        tree = Add(Add(Num(1), Neg(Num(2))), Add(Num(1), Neg(Num(2))))
+        idx = index.SubtreeIndex(tree)
+
+        self.assertEqual(idx.nodes(Neg), (Neg(Num(2)),), 'distinct instances')
+        self.assertEqual(idx.nodes(Num), (Num(1), Num(2)), 'in pre-order')
+        self.assertEqual(len(idx.nodes(Expr)), 5, 'subclasses')
+        self.assertEqual(idx.classes(), frozenset([Add, Num, Neg]), 'classes')
+
+    def test_find_all(self):
+        """ Tests finding all matches of a pattern. """
+
+        tree = Add(Neg(Num(1)), Add(Neg(Add(Num(2), Num(3))), Num(4)))
+
+        found = [ctx.x for ctx in index.find_all(tree, T(Neg)(V('x')))]
+        self.assertEqual(found, [Num(1), Add(Num(2), Num(3))], 'head class')
+
+        found = [ctx.x for ctx in index.find_all(
+            tree, T(Add)(T(Num) & V('x'), _))]
+        self.assertEqual(found, [Num(2)], 'nested patterns')
+
+        found = list(index.SubtreeIndex(tree).find_all(T(Num) >> 'n'))
+        self.assertEqual([ctx.n for ctx in found],
+                         [Num(1), Num(2), Num(3), Num(4)], 'type pattern')
+
+        found = list(index.find_all(tree, V('x')))
+        self.assertEqual(len(found), 9, 'patterns without a class')
+
+    def test_head_class(self):
+        """ Tests finding the class of a pattern. """
+
+        self.assertIs(index.head_class(T(Add)()), Add, 'application')
+        self.assertIs(index.head_class(V('x') & Neg), Neg, 'and')
+        self.assertIs(index.head_class(Num(1)), Num, 'literal')
+        self.assertIs(index.head_class(_), None, 'wildcard')
+        self.assertIs(index.head_class(int), None, 'other types')
+
+    def test_deep(self):
+        """ Tests searching deep trees. """
+
+        tree = Num(0)
+        for i in range(3000):
+            tree = Add(tree, Num(i))
+        tree = Add(tree, Neg(Num(0)))
+
+        self.assertEqual(len(list(index.find_all(tree, Neg))), 1, 'one match')
@@ -0,0 +1,116 @@
+"""
+testing case_class.jsoncodec
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import io
+import json
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import exceptions
+from case_class import jsoncodec
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        pass
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        pass
+
+
+class Many(case_class.CaseClass):
+    def __init__(self, *items, **options):
+        pass
+
+
+class TestJSONCodec(TestCase):
+    """ Tests the jsoncodec functions. """
+
+    def test_roundtrip(self):
+        """ Tests encoding and decoding values. """
+
+        values = [None, True, 0, -12, 2 ** 70, 1.5e-3, u'text ☃ "q"',
+                  b'\x00\xff', (), [1, (2,)], {'a': [None]}, {1: 'x'},
+                  {'$case': 1}, Leaf(1), Many(),
+                  Many(Leaf(1), Leaf(u'x'), key={'k': 1.0}),
+                  Node(Leaf(1), Many(Leaf([1, 2]), Node(Leaf(3), Leaf(4))))]
+
+        for value in values:
+            text = jsoncodec.dumps(value)
+            json.loads(text)
+
+            decoded = jsoncodec.loads(text)
+            self.assertEqual(decoded, value, 'roundtrip of %r' % (value,))
+            self.assertEqual(type(decoded), type(value), 'type of %r' % (
+                value,))
+
+        tree = Node(Leaf(1), Leaf(2))
+        self.assertIs(jsoncodec.loads(jsoncodec.dumps(tree)), tree,
+                      'interned')
+
+    def test_format(self):
+        """ Tests the encoding of instances. """
+
+        self.assertEqual(json.loads(jsoncodec.dumps(Node(Leaf(1), Leaf(1)))), {
+            '$case': 'test_case_class.test_jsoncodec:Node',
+            'args': [{'$case': 'test_case_class.test_jsoncodec:Leaf',
+                      'args': [1]}, {'$ref': 0}]}, 'format')
+
+    def test_stream(self):
+        """ Tests encoding to and decoding from file objects in chunks. """
+
+        tree = Leaf(0)
+        for i in range(3000):
+            tree = Node(tree, Leaf(u'value %d' % (i,)))
+
+        buf = io.StringIO()
+        jsoncodec.dump(tree, buf)
+
+        buf.seek(0)
+        self.assertIs(jsoncodec.load(buf, chunk_size=7), tree, 'text file')
+
+        data = io.BytesIO(buf.getvalue().encode('utf-8'))
+        self.assertIs(jsoncodec.load(data, chunk_size=5), tree, 'binary file')
+
+    def test_stream_numbers(self):
+        """ Tests decoding numbers split across chunks. """
+
+        values = [[1.5, -0.25, 1e5, 2.5E-3, -7e+2, 10, -3, 0.0],
+                  {'a': 1.125, 'b': [3e-1, None, -12.5]},
+                  Many(Leaf(2.75), Leaf(-1e10), key=0.5)]
+
+        for value in values:
+            text = jsoncodec.dumps(value)
+
+            for chunk_size in range(1, 9):
+                decoded = jsoncodec.load(io.StringIO(text), chunk_size)
+                self.assertEqual(decoded, value, 'chunk size %d' % (
+                    chunk_size,))
+
+        self.assertRaises(exceptions.CodecException, jsoncodec.load,
+                          io.StringIO(u'[1.]'), 1)
+
+    def test_errors(self):
+        """ Tests invalid values and documents. """
+
+        self.assertRaises(exceptions.CodecException, jsoncodec.dumps,
+                          object())
+
+        for text in ['', '[1, 2', '{"a" 1}', '[1 2]', '{1: 2}', '[1] 2',
+                     '"abc', '{"$ref": 0}', '{"$case": "nope:Nope",'
+                     ' "args": []}',
+                     '{"$case": "test_case_class.test_jsoncodec:Node", '
+                     '"args": [1, 2, 3]}',
+                     '{"$case": "test_case_class.test_jsoncodec:Node", '
+                     '"args": [1]}',
+                     '{"$case": "test_case_class.test_jsoncodec:Many", '
+                     '"args": [[1], {}]}',
+                     '{"$case": "test_case_class.test_jsoncodec:Many", '
+                     '"args": [{"$tuple": [1]}, [1]]}']:
+            self.assertRaises(exceptions.CodecException, jsoncodec.loads,
+                              text)
@@ -0,0 +1,82 @@
+"""
+testing case_class.parallel
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import parallel
+from case_class.extractor import T, V, _
+
+
+class Edge(case_class.CaseClass):
+    """ Edge of a graph, used as input to worker processes. """
+
+    def __init__(self, src, dst):
+        pass
+
+
+def reverse(edge):
+    """ Reverses an edge, used as function applied in worker processes. """
+
+    return Edge(edge.case_params.dst, edge.case_params.src)
+
+
+class TestParallel(TestCase):
+    """ Tests the parallel module. """
+
+    def setUp(self):
+        """ Creates the edges used as input. """
+
+        self.edges = [Edge(i % 7, i) for i in range(100)]
+
+    def test_parallel_map(self):
+        """ Tests mapping a function in worker processes. """
+
+        reversed_edges = parallel.parallel_map(reverse, self.edges,
+                                               workers=2, chunk_size=30)
+
+        self.assertEqual(len(reversed_edges), 100)
+        self.assertTrue(reversed_edges[5] is Edge(5, 5), 'interned')
+        self.assertTrue(all(r is reverse(e) for (e, r)
+                            in zip(self.edges, reversed_edges)))
+
+        self.assertEqual(parallel.parallel_map(reverse, []), [])
+        self.assertRaises(ValueError, parallel.parallel_map, reverse,
+                          self.edges, chunk_size=0)
+
+    def test_parallel_match(self):
+        """ Tests pattern matching in worker processes. """
+
+        matches = parallel.parallel_match(T(Edge)(3, V('dst')),
+                                          iter(self.edges), workers=2,
+                                          chunk_size=16)
+
+        self.assertEqual([m for (m, ctx) in matches], self.edges[3::7])
+        self.assertEqual([ctx['dst'] for (m, ctx) in matches],
+                         list(range(3, 100, 7)))
+        self.assertTrue(matches[0][0] is self.edges[3])
+
+        nested = parallel.parallel_match(T(Edge)(_(), V('e')),
+                                         [Edge(0, Edge(1, 2)), 5])
+        self.assertTrue(nested[0][1].e is Edge(1, 2), 'interned')
+        self.assertEqual(len(nested), 1)
+
+    def test_lazy(self):
+        """ Tests that the input is read only as far as needed. """
+
+        consumed = []
+
+        def edges():
+            for e in self.edges:
+                consumed.append(e)
+                yield e
+
+        results = parallel._run(parallel._map_chunk, reverse, edges(), 2, 5)
+        next(results)
+
+        self.assertTrue(len(consumed) <= 5 * (parallel.IN_FLIGHT * 2 + 1),
+                        'bounded number of chunks in flight')
+        self.assertEqual(len(list(results)), 100 // 5 - 1, 'all chunks')
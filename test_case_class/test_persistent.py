@@ -0,0 +1,226 @@
+"""
+testing case_class.persistent
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import pickle
+import random
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import codec
+from case_class import digest
+from case_class import jsoncodec
+from case_class import traversal
+from case_class.extractor import T, V
+from case_class.persistent import PVector, PMap
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        pass
+
+
+class Bag(case_class.CaseClass):
+    def __init__(self, items, index):
+        pass
+
+
+class Colliding(object):
+    """ Key whose hash collides with all other keys. """
+
+    def __init__(self, n):
+        self.n = n
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, Colliding) and self.n == other.n
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class Counted(object):
+    """ Value that counts how often it is hashed. """
+
+    calls = 0
+
+    def __hash__(self):
+        Counted.calls += 1
+        return id(self)
+
+
+class TestPVector(TestCase):
+    """ Tests the PVector class. """
+
+    def test_operations(self):
+        """ Tests PVector operations against lists. """
+
+        rng = random.Random(1)
+
+        vector = PVector()
+        expected = []
+
+        for i in range(5000):
+            vector = vector.append(i)
+            expected.append(i)
+
+        self.assertEqual(list(vector), expected)
+        self.assertEqual(list(PVector(expected)), expected)
+        self.assertEqual(PVector(expected), vector)
+
+        for i in range(500):
+            idx = rng.randrange(len(expected))
+            old = vector
+            vector = vector.set(idx, -i)
+            expected[idx] = -i
+            self.assertTrue(old[idx] != -i or old is vector,
+                            'old vector is unchanged')
+
+        self.assertEqual(list(vector), expected)
+        self.assertEqual(vector[-1], expected[-1])
+        self.assertEqual(list(vector[10:20]), expected[10:20])
+        self.assertRaises(IndexError, lambda: vector[5000])
+
+        while len(expected) > 0:
+            vector = vector.pop()
+            expected.pop()
+            if len(expected) % 97 == 0:
+                self.assertEqual(list(vector), expected)
+                self.assertEqual(hash(vector), hash(PVector(expected)),
+                                 'incremental hash')
+
+        self.assertEqual(len(vector), 0)
+        self.assertRaises(IndexError, vector.pop)
+
+    def test_hash(self):
+        """ Tests hashing and equality of vectors. """
+
+        a = PVector([1, [2, 3], {'a': 4}])
+        b = PVector([1, [2, 3], {'a': 4}])
+
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, a.set(0, 2))
+        self.assertNotEqual(a, [1, [2, 3], {'a': 4}])
+        self.assertEqual(PVector([1]) + PVector([2]), PVector([1, 2]))
+        self.assertNotEqual(hash(PVector([1, 2])), hash(PVector([2, 1])))
+
+        vector = PVector(Counted() for i in range(1000))
+        Counted.calls = 0
+        updated = vector.set(500, Counted()).append(Counted()).pop()
+        hash(updated)
+        self.assertTrue(Counted.calls <= 4, 'updates do not rehash')
+
+
+class TestPMap(TestCase):
+    """ Tests the PMap class. """
+
+    def test_operations(self):
+        """ Tests PMap operations against dictionaries. """
+
+        rng = random.Random(2)
+
+        pmap = PMap()
+        expected = {}
+
+        for i in range(3000):
+            key = rng.randrange(2000)
+            if rng.random() < 0.3 and key in expected:
+                pmap = pmap.remove(key)
+                del expected[key]
+            else:
+                pmap = pmap.set(key, i)
+                expected[key] = i
+
+            self.assertEqual(len(pmap), len(expected))
+
+        self.assertEqual(dict(pmap.items()), expected)
+        self.assertEqual(PMap(expected), pmap)
+        self.assertEqual(hash(PMap(expected)), hash(pmap), 'incremental hash')
+        self.assertTrue(all(pmap[k] == expected[k] for k in expected))
+        self.assertTrue(2001 not in pmap)
+        self.assertEqual(pmap.get(2001, 'x'), 'x')
+        self.assertRaises(KeyError, pmap.remove, 2001)
+        self.assertTrue(pmap.discard(2001) is pmap)
+
+    def test_collisions(self):
+        """ Tests keys with colliding hashes. """
+
+        keys = [Colliding(i) for i in range(5)]
+        pmap = PMap((k, k.n) for k in keys).set('other', 1)
+
+        self.assertEqual(len(pmap), 6)
+        self.assertEqual([pmap[k] for k in keys], [0, 1, 2, 3, 4])
+
+        for k in keys:
+            pmap = pmap.remove(k)
+
+        self.assertEqual(dict(pmap.items()), {'other': 1})
+
+    def test_hash(self):
+        """ Tests hashing and equality of maps. """
+
+        a = PMap({'a': [1], 'b': 2})
+        b = PMap(b=2).set('a', [1])
+
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, a.set('a', [2]))
+        self.assertNotEqual(a, {'a': [1], 'b': 2})
+        self.assertEqual(hash(a.remove('a').set('a', [1])), hash(a))
+
+        pmap = PMap((i, Counted()) for i in range(1000))
+        Counted.calls = 0
+        hash(pmap.set(5, Counted()).remove(7))
+        self.assertTrue(Counted.calls <= 4, 'updates do not rehash')
+
+
+class TestIntegration(TestCase):
+    """ Tests persistent collections within CaseClass instances. """
+
+    def setUp(self):
+        self.bag = Bag(PVector([Leaf(1), Leaf(2)]),
+                       PMap({'one': Leaf(1), 'three': [Leaf(3)]}))
+
+    def test_interning(self):
+        """ Tests interning, traversal and serialisation. """
+
+        bag = self.bag
+        same = Bag(PVector([Leaf(1), Leaf(2)]),
+                   PMap({'three': [Leaf(3)], 'one': Leaf(1)}))
+
+        self.assertTrue(bag is same, 'interned')
+
+        children = traversal.children(bag)
+        self.assertEqual(children[:2], [Leaf(1), Leaf(2)])
+        self.assertEqual(sorted(c.case_params.value for c in children[2:]),
+                         [1, 3])
+
+        doubled = traversal.transform(
+            bag, lambda n: Leaf(n.case_params.value * 2)
+            if isinstance(n, Leaf) else n)
+        self.assertTrue(doubled is Bag(PVector([Leaf(2), Leaf(4)]),
+                                       PMap({'one': Leaf(2),
+                                             'three': [Leaf(6)]})))
+
+        self.assertTrue(codec.loads(codec.dumps(bag)) is bag, 'codec')
+        self.assertTrue(jsoncodec.loads(jsoncodec.dumps(bag)) is bag, 'json')
+        self.assertTrue(pickle.loads(pickle.dumps(bag)) is bag, 'pickle')
+        self.assertEqual(digest.digest(bag), digest.digest(same))
+        self.assertNotEqual(digest.digest(bag), digest.digest(doubled))
+
+    def test_extractor(self):
+        """ Tests extracting items of persistent collections. """
+
+        ctx = T(Bag)(T(PVector)(V('a'), Leaf(2)), T(PMap)(one=V('b'))) \
+            .extract(self.bag)
+
+        self.assertEqual(ctx['a'], Leaf(1))
+        self.assertEqual(ctx['b'], Leaf(1))
+
+        self.assertFalse(T(PVector)(V('a')).matches(PVector([1, 2])))
+        self.assertFalse(T(PMap)(two=V('a')).matches(PMap(one=1)))
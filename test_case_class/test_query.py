@@ -0,0 +1,110 @@
+"""
+testing case_class.query
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import columnar
+from case_class import query
+from case_class.query import field
+
+
+class Edge(case_class.CaseClass):
+    def __init__(self, src, dst, weight, label):
+        pass
+
+
+class TestQuery(TestCase):
+    """ Tests the Query class. """
+
+    def setUp(self):
+        self.edges = [Edge(i % 10, i, i / 4.0, 'even' if i % 2 else 'odd')
+                      for i in range(200)]
+        self.array = columnar.CaseClassArray.from_instances(Edge, self.edges)
+
+    def check(self):
+        """ Runs the queries of the tests. """
+
+        q = query.query(self.array)
+
+        self.assertEqual(q.count(), 200)
+        self.assertEqual(list(q.where(field('src') == 3).instances()),
+                         self.edges[3::10])
+        self.assertEqual(q.where(field('src') != 3).count(), 180)
+        self.assertEqual(q.where(field('dst') < 10, field('dst') >= 5)
+                         .indices(), [5, 6, 7, 8, 9])
+        self.assertEqual(q.where(field('weight').between(1, 2)).indices(),
+                         list(range(4, 9)))
+        self.assertEqual(q.where(field('label') == 'odd').count(), 100)
+        self.assertEqual(q.where(field('label').isin(['odd', 'x'])).count(),
+                         100)
+        self.assertEqual(q.where(field('src').isin([1, 2])).count(), 40)
+        self.assertEqual(q.where((field('src') == 1) | (field('src') == 2))
+                         .count(), 40)
+        self.assertEqual(q.where(~(field('src') > 0)).count(), 20)
+
+        matches = list(q.where(field('dst') > 197))
+        self.assertTrue(matches[0] is self.edges[198], 'interned')
+
+        self.assertEqual(q.where(field('dst') < 3).select('dst', 'label'),
+                         [(0, 'odd'), (1, 'even'), (2, 'odd')])
+        self.assertEqual(q.where(field('dst') < 30).group_count('src'),
+                         dict((i, 3) for i in range(10)))
+        self.assertEqual(q.where(field('dst') < 30).group_count('label'),
+                         {'odd': 15, 'even': 15})
+        self.assertEqual(q.where(field('dst') < 4).group_count('src',
+                                                               'label'),
+                         {(0, 'odd'): 1, (1, 'even'): 1, (2, 'odd'): 1,
+                          (3, 'even'): 1})
+
+    def test_query(self):
+        """ Tests queries using NumPy if available. """
+
+        self.check()
+
+    def test_query_python(self):
+        """ Tests queries without NumPy. """
+
+        numpy = query.numpy
+        query.numpy = None
+
+        try:
+            self.check()
+        finally:
+            query.numpy = numpy
+
+    def test_incomparable(self):
+        """ Tests that values that can not be compared do not match. """
+
+        edges = [Edge(1, 2, None, 'a'), Edge(2, 3, 1.5, 'b'),
+                 Edge(3, 4, [1], 'c'), Edge(4, 5, 5.0, 'd')]
+        array = columnar.CaseClassArray.from_instances(Edge, edges)
+        predicates = [field('weight') < 3, field('weight').between(1, 6),
+                      ~(field('weight') >= 2), field('weight').isin([[1]])]
+
+        numpy = query.numpy
+
+        try:
+            for module_numpy in [numpy, None]:
+                query.numpy = module_numpy
+
+                for p in predicates:
+                    self.assertEqual(list(query.query(array).where(p)),
+                                     [e for e in edges if p.matches(e)],
+                                     'consistent with matches()')
+        finally:
+            query.numpy = numpy
+
+        self.assertEqual(list(query.query(array).where(predicates[0])),
+                         [edges[1]])
+
+    def test_instances(self):
+        """ Tests querying a list of instances. """
+
+        q = query.Query(self.edges).where(field('src') == 0)
+
+        self.assertEqual(len(q), 20)
+        self.assertRaises(TypeError, q.where, 'src')
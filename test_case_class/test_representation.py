@@ -0,0 +1,99 @@
+"""
+testing case_class.representation
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+import io
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import representation
+
+
+class Tree(case_class.AbstractCaseClass):
+    def __init__(self, value, *children):
+        pass
+
+
+class Node(Tree):
+    pass
+
+
+class Leaf(Tree):
+    def __init__(self, value):
+        pass
+
+
+class TestRepresentation(TestCase):
+    """ Tests the representation functions. """
+
+    def test_case_repr(self):
+        """ Tests that case_repr() matches the builtin format. """
+
+        tree = Node(1, Leaf([1, {'a': (Leaf(2),)}]), Leaf('x'))
+
+        self.assertEqual(representation.case_repr(tree),
+                         "Node(1, *children=(Leaf([1, {'a': (Leaf(2),)}]), "
+                         "Leaf('x')))", 'representation of a tree')
+        self.assertEqual(repr(tree), representation.case_repr(tree),
+                         'repr() uses case_repr()')
+
+    def test_deep(self):
+        """ Tests that deep trees do not hit the recursion limit. """
+
+        tree = Leaf(0)
+        for i in range(1500):
+            tree = Node(i, tree)
+
+        self.assertTrue(repr(tree).endswith('Leaf(0)' + ',))' * 1500),
+                        'representation of a deep tree')
+
+    def test_shared(self):
+        """ Tests that shared subtrees are represented every time. """
+
+        shared = Node(1, Leaf(2))
+        tree = Node(0, shared, Node(3, shared), shared)
+
+        self.assertEqual(repr(tree),
+                         'Node(0, *children=(%s, Node(3, *children=(%s,)), '
+                         '%s))' % ((repr(shared),) * 3),
+                         'representation of a shared subtree')
+
+    def test_budget(self):
+        """ Tests that max_depth and max_length truncate the
+        representation. """
+
+        tree = Node(1, Node(2, Leaf(3)))
+
+        self.assertEqual(representation.case_repr(tree, max_depth=2),
+                         'Node(1, *children=(Node(2, *children=(Leaf(...),)),))',
+                         'representation with maximal depth')
+        self.assertEqual(representation.case_repr(tree, max_length=10),
+                         'Node(1, *c...', 'representation with maximal length')
+
+    def test_budget_shared(self):
+        """ Tests that only the written part is searched for shared
+        instances. """
+
+        shared = Leaf(-1)
+        tree = Node(0, *([Leaf(i) for i in range(1000)] + [shared, shared]))
+
+        self.assertEqual(representation._find_shared(tree),
+                         set([id(shared)]), 'search everything')
+        self.assertEqual(representation._find_shared(tree, 50), set(),
+                         'stop searching after the budget')
+        self.assertEqual(representation.case_repr(tree, max_length=20),
+                         repr(tree)[:20] + representation.ELLIPSIS,
+                         'representation with maximal length')
+
+    def test_write_repr(self):
+        """ Tests that write_repr() writes the representation to a file. """
+
+        tree = Node(1, Leaf(2))
+        out = io.StringIO()
+
+        written = representation.write_repr(tree, out)
+
+        self.assertEqual(out.getvalue(), repr(tree), 'write representation')
+        self.assertEqual(written, len(repr(tree)), 'number of written chars')
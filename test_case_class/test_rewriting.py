@@ -0,0 +1,100 @@
+"""
+testing case_class.rewriting
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import exceptions
+from case_class import rewriting
+from case_class.extractor import T, V, L
+
+
+class Expr(case_class.AbstractCaseClass):
+    pass
+
+
+class Num(Expr):
+    def __init__(self, n):
+        pass
+
+
+class Var(Expr):
+    def __init__(self, name):
+        pass
+
+
+class Add(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class Mul(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+# x + 0 => x, x * 1 => x, n + m => (n + m)
+RULES = [
+    (T(Add)(V('x'), L(Num(0))), lambda ctx: ctx.x),
+    (T(Mul)(V('x'), L(Num(1))), lambda ctx: ctx.x),
+    (T(Add)(T(Num)(V('n')), T(Num)(V('m'))),
+     lambda ctx: Num(ctx.n + ctx.m)),
+]
+
+
+class TestRewriter(TestCase):
+    """ Tests the Rewriter class. """
+
+    def test_bottom_up(self):
+        """ Tests rewriting bottom-up to a fixpoint. """
+
+        rewriter = rewriting.Rewriter(RULES)
+        term = Mul(Add(Add(Num(1), Num(2)), Num(0)), Num(1))
+
+        self.assertEqual(rewriter.rewrite(term), Num(3), 'normal form')
+        self.assertEqual(sorted(rewriter.stats.values()), [1, 1, 1],
+                         'every rule fired once')
+
+    def test_top_down(self):
+        """ Tests rewriting top-down to a fixpoint. """
+
+        term = Add(Mul(Var('x'), Num(1)), Add(Num(0), Num(0)))
+
+        self.assertEqual(rewriting.rewrite(term, RULES,
+                                           rewriting.Rewriter.TOP_DOWN),
+                         Var('x'), 'normal form')
+
+    def test_shared(self):
+        """ Tests that shared subterms are rewritten once. """
+
+        shared = Add(Num(1), Num(2))
+        term = Var('x')
+        for i in range(1000):
+            term = Mul(Add(term, shared), Num(1))
+
+        rewriter = rewriting.Rewriter(RULES)
+        result = rewriter.rewrite(term)
+
+        self.assertEqual(rewriter.stats[rewriting.Rule(*RULES[2])], 1,
+                         'shared subterm rewritten once')
+        self.assertEqual(rewriter.stats[rewriting.Rule(*RULES[1])], 1000,
+                         'rule fired on every level')
+        self.assertTrue(rewriter.rewrite(term) is result,
+                        'normal forms are remembered')
+
+    def test_non_terminating(self):
+        """ Tests that non-terminating rewrites are detected. """
+
+        swap = [(T(Add)(V('x'), V('y')), lambda ctx: Add(ctx.y, ctx.x))]
+
+        self.assertRaises(exceptions.NonTerminatingRewrite,
+                          rewriting.rewrite, Add(Var('x'), Var('y')), swap,
+                          max_steps=10)
+
+        grow = [(T(Var)(V('x')), lambda ctx: Add(Var(ctx.x), Num(0)))]
+
+        self.assertRaises(exceptions.NonTerminatingRewrite,
+                          rewriting.rewrite, Var('x'), grow)
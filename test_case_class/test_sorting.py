@@ -0,0 +1,123 @@
+"""
+testing case_class.sorting
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import exceptions
+from case_class import sorting
+
+
+class Shape(case_class.AbstractCaseClass):
+    pass
+
+
+class Circle(Shape):
+    def __init__(self, radius, name='circle'):
+        pass
+
+
+class Rect(Shape):
+    def __init__(self, width, height, name='rect'):
+        pass
+
+
+class Group(Shape):
+    def __init__(self, *shapes):
+        pass
+
+
+class Expr(case_class.AbstractCaseClass):
+    pass
+
+
+class Num(Expr):
+    def __init__(self, n):
+        pass
+
+
+class Var(Expr):
+    def __init__(self, name):
+        pass
+
+
+class Add(Expr):
+    def __init__(self, left, right):
+        pass
+
+
+class Neg(Expr):
+    def __init__(self, expr):
+        pass
+
+
+class TestSorting(TestCase):
+    """ Tests the sorting functions. """
+
+    def test_sort_key(self):
+        """ Tests generated sort keys. """
+
+        key = sorting.sort_key(Rect)
+
+        self.assertIs(sorting.sort_key(Rect), key, 'generated once')
+        self.assertTrue(key(Rect(1, 2)) < key(Rect(1, 3)), 'by parameters')
+        self.assertEqual(sorting.sort_key(Rect, by=['height', 'width'])(
+            Rect(1, 2))[1:], (2, 1), 'selected fields')
+        self.assertRaises(exceptions.NoSuchArgument, sorting.sort_key,
+                          Rect, ['radius'])
+
+        nested = sorting.sort_key(Group)(Group(Circle(1)))
+        self.assertFalse(nested[1][0] == None, 'compared with other types')
+        self.assertTrue(nested[1][0] != 1, 'compared with other types')
+        self.assertFalse(None in nested, 'membership in keys')
+        self.assertRaises(TypeError, lambda: nested[1][0] < 1)
+
+    def test_sorted_cases(self):
+        """ Tests sorting heterogeneous collections. """
+
+        shapes = [Rect(2, 1), Circle(3), Group(Circle(2), Rect(1, 1)),
+                  Rect(1, 5), Group(Circle(1)), Circle(1)]
+
+        self.assertEqual(sorting.sorted_cases(shapes), [
+            Circle(1), Circle(3), Group(Circle(1)),
+            Group(Circle(2), Rect(1, 1)), Rect(1, 5), Rect(2, 1)],
+            'by class tag, then parameters')
+
+        rects = [Rect(2, 1), Rect(1, 5), Rect(3, 3, 'a')]
+        self.assertEqual(sorting.sorted_cases(rects, by=['height']),
+                         [Rect(2, 1), Rect(3, 3, 'a'), Rect(1, 5)],
+                         'by a field')
+        self.assertEqual(sorting.sorted_cases(rects, by=['name', 'width'],
+                                              reverse=True),
+                         [Rect(2, 1), Rect(1, 5), Rect(3, 3, 'a')],
+                         'by several fields, reversed')
+
+        self.assertEqual(sorting.class_tag(Rect),
+                         'test_case_class.test_sorting.Rect', 'class tag')
+
+    def test_nested(self):
+        """ Tests sorting instances with nested heterogeneous parameters. """
+
+        exprs = [Neg(Add(Var('y'), Num(2))), Neg(Add(Num(1), Var('x'))),
+                 Neg(Add(Num(1), Num(3))), Neg(Add(Var('y'), Var('a')))]
+
+        self.assertEqual(sorting.sorted_cases(exprs), [
+            Neg(Add(Num(1), Num(3))), Neg(Add(Num(1), Var('x'))),
+            Neg(Add(Var('y'), Num(2))), Neg(Add(Var('y'), Var('a')))],
+            'nested instances by class tag, then parameters')
+
+        groups = [Group(Rect(0, 0)), Group(Circle(1), Rect(1, 1)),
+                  Group(Circle(1))]
+        self.assertEqual(sorting.sorted_cases(groups), [
+            Group(Circle(1)), Group(Circle(1), Rect(1, 1)),
+            Group(Rect(0, 0))], 'nested sequences')
+
+        deep = Num(0)
+        for i in range(5000):
+            deep = Neg(deep)
+
+        self.assertEqual(sorting.sorted_cases([deep, Neg(deep), deep]),
+                         [Neg(deep), deep, deep], 'deep instances')
@@ -0,0 +1,116 @@
+"""
+testing case_class.traversal
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import traversal
+
+
+class Tree(case_class.AbstractCaseClass):
+    def __init__(self, value, *children):
+        pass
+
+
+class Node(Tree):
+    pass
+
+
+class Leaf(Tree):
+    def __init__(self, value, extra=None):
+        pass
+
+
+class TestTraversal(TestCase):
+    """ Tests the traversal functions. """
+
+    def test_children(self):
+        """ Tests that children() finds children in all parameters. """
+
+        tree = Node(1, Leaf(2, extra=[Leaf(3), {'a': Leaf(4)}]), Leaf(5))
+
+        self.assertEqual(traversal.children(tree),
+                         [Leaf(2, extra=[Leaf(3), {'a': Leaf(4)}]), Leaf(5)],
+                         'children in varargs')
+        self.assertEqual(traversal.children(traversal.children(tree)[0]),
+                         [Leaf(3), Leaf(4)], 'children in containers')
+
+    def test_orders(self):
+        """ Tests pre-order and post-order traversal. """
+
+        tree = Node(1, Node(2, Leaf(3)), Leaf(4))
+
+        self.assertEqual([n.case_params.value
+                          for n in traversal.preorder(tree)],
+                         [1, 2, 3, 4], 'pre-order')
+        self.assertEqual([n.case_params.value
+                          for n in traversal.postorder(tree)],
+                         [3, 2, 4, 1], 'post-order')
+        self.assertEqual([d for (n, d) in traversal.walk(tree)],
+                         [0, 1, 2, 1], 'depth of walked nodes')
+
+    def test_unique_and_prune(self):
+        """ Tests visiting shared nodes once and pruning subtrees. """
+
+        shared = Node(2, Leaf(3))
+        tree = Node(1, shared, shared)
+
+        self.assertEqual(len(list(traversal.preorder(tree))), 5,
+                         'shared nodes are visited every time')
+        self.assertEqual(len(list(traversal.postorder(tree, unique=True))), 3,
+                         'shared nodes are visited once')
+        self.assertEqual(list(traversal.preorder(
+            tree, prune=lambda n: n is shared)), [tree, shared, shared],
+            'pruned subtrees are not visited')
+
+    def test_fold(self):
+        """ Tests folding a tree bottom-up. """
+
+        calls = []
+
+        def size(node, results):
+            calls.append(node)
+            return 1 + sum(results)
+
+        shared = Node(2, Leaf(3))
+        tree = Node(1, shared, shared)
+
+        self.assertEqual(traversal.fold(tree, size), 5, 'size of a tree')
+        self.assertEqual(len(calls), 3, 'shared nodes are folded once')
+
+    def test_deep(self):
+        """ Tests that deep trees do not hit the recursion limit. """
+
+        tree = Leaf(0)
+        for i in range(3000):
+            tree = Node(i, tree)
+
+        self.assertEqual(traversal.fold(tree, lambda n, r: 1 + sum(r)), 3001,
+                         'folding a deep tree')
+        self.assertEqual(len(list(traversal.postorder(tree))), 3001,
+                         'post-order of a deep tree')
+
+    def test_transform(self):
+        """ Tests transforming a tree bottom-up. """
+
+        calls = []
+
+        def increment_leaves(node):
+            calls.append(node)
+            if isinstance(node, Leaf):
+                return node.copy(value=node.case_params.value + 1)
+            return node
+
+        shared = Node(2, Leaf(3))
+        untouched = Node(4)
+        tree = Node(1, shared, shared, untouched)
+
+        self.assertEqual(traversal.transform(tree, increment_leaves),
+                         Node(1, Node(2, Leaf(4)), Node(2, Leaf(4)), untouched),
+                         'transforming a tree')
+        self.assertEqual(len(calls), 4, 'shared nodes are transformed once')
+        self.assertTrue(traversal.transform(tree, lambda n: n) is tree,
+                        'unchanged trees are kept')
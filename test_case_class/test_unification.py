@@ -0,0 +1,102 @@
+"""
+testing case_class.unification
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import exceptions
+from case_class import unification
+from case_class.extractor import V
+
+
+class Type(case_class.AbstractCaseClass):
+    pass
+
+
+class Int(Type):
+    pass
+
+
+class Fun(Type):
+    def __init__(self, arg, result):
+        pass
+
+
+class Tuple(Type):
+    def __init__(self, *items):
+        pass
+
+
+class TestUnification(TestCase):
+    """ Tests the unification functions. """
+
+    def test_unify(self):
+        """ Tests unifying terms with variables on both sides. """
+
+        left = Fun(V('a'), Tuple(V('a'), Int()))
+        right = Fun(Int(), Tuple(V('b'), V('c')))
+
+        subst = unification.unify(left, right)
+
+        self.assertEqual(subst['a'], Int(), 'variable of the left term')
+        self.assertEqual(subst['b'], Int(), 'variable of the right term')
+        self.assertEqual(subst.resolve(left), subst.resolve(right),
+                         'resolved terms are equal')
+
+    def test_variable_chains(self):
+        """ Tests that variables unified with each other are resolved. """
+
+        subst = unification.unify(Tuple(V('a'), V('b'), V('b')),
+                                  Tuple(V('b'), V('c'), Fun(Int(), V('d'))))
+
+        self.assertEqual(subst['a'], Fun(Int(), V('d')), 'resolved chain')
+
+    def test_failure(self):
+        """ Tests that non-unifiable terms raise an exception. """
+
+        self.assertRaises(exceptions.UnificationFailure, unification.unify,
+                          Fun(Int(), Int()), Tuple(Int(), Int()))
+        self.assertRaises(exceptions.UnificationFailure, unification.unify,
+                          Tuple(Int()), Tuple(Int(), Int()))
+        self.assertFalse(unification.unifiable(V('a'), Fun(V('a'), Int())),
+                         'occurs check')
+
+    def test_none(self):
+        """ Tests binding variables to None. """
+
+        subst = unification.unify(Fun(V('x'), V('y')), Fun(None, V('x')))
+
+        self.assertEqual(subst['x'], None, 'bound to None')
+        self.assertEqual(subst['y'], None, 'linked to a variable bound to '
+                                           'None')
+        self.assertRaises(exceptions.UnificationFailure, unification.unify,
+                          Fun(V('x'), V('x')), Fun(1, None))
+
+    def test_extend(self):
+        """ Tests that extending a substitution does not modify it. """
+
+        base = unification.unify(V('a'), Int())
+        extended = unification.unify(V('b'), Tuple(V('a')), base)
+
+        self.assertEqual(extended['b'], Tuple(Int()), 'extended binding')
+        self.assertEqual(base['b'], V('b'), 'base substitution unchanged')
+        self.assertRaises(exceptions.UnificationFailure, unification.unify,
+                          V('a'), Tuple(), base)
+
+    def test_deep(self):
+        """ Tests unifying deep terms. """
+
+        left = Int()
+        right = V('x')
+        for i in range(3000):
+            left = Fun(left, V('r%d' % (i,)))
+            right = Fun(right, Int())
+
+        subst = unification.unify(left, right)
+
+        self.assertEqual(subst['x'], Int(), 'variable deep in the term')
+        self.assertEqual(subst.resolve(left), subst.resolve(right),
+                         'resolved deep terms are equal')
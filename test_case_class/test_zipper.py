@@ -0,0 +1,92 @@
+"""
+testing case_class.zipper
+
+Copyright (c) 2016 Tom Wiesing -- licensed under MIT, see LICENSE
+"""
+
+from unittest import TestCase
+
+from case_class import case_class
+from case_class import zipper
+
+
+class Leaf(case_class.CaseClass):
+    def __init__(self, value):
+        pass
+
+
+class Node(case_class.CaseClass):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+
+class Many(case_class.CaseClass):
+    def __init__(self, name, *items):
+        pass
+
+
+class TestZipper(TestCase):
+    """ Tests the Zipper class. """
+
+    def test_navigate(self):
+        """ Tests moving around in a tree. """
+
+        tree = Node(Many('m', Leaf(1), Leaf(2)), Leaf(3))
+        z = zipper.Zipper(tree)
+
+        self.assertIs(z.focus, tree, 'starts at the root')
+
+        z.down('left').down(1)
+        self.assertEqual(z.focus, Leaf(2), 'varargs index')
+        self.assertEqual(z.path, ('left', 'items', 1), 'path')
+        self.assertEqual(z.depth, 3, 'depth')
+
+        z.up().up().down('name')
+        self.assertEqual(z.focus, 'm', 'parameter name')
+
+        z.goto(('right', 'value'))
+        self.assertEqual(z.focus, 3, 'goto')
+
+        self.assertIs(z.root(), tree, 'nothing is rebuilt')
+
+        self.assertRaises(ValueError, z.up)
+        self.assertRaises(KeyError, z.down, 'middle')
+        self.assertRaises(TypeError, z.down('right').down, 0)
+
+    def test_replace(self):
+        """ Tests replacing values within a tree. """
+
+        tree = Node(Many('m', Leaf(1), Leaf(2)), Leaf(3))
+        z = zipper.Zipper(tree)
+
+        z.down('left').down(0).replace(Leaf(10)).up()
+        z.insert(0, Leaf(0)).delete(2)
+        z.goto(('right', 'value')).edit(lambda v: v + 1)
+
+        self.assertEqual(z.root(), Node(Many('m', Leaf(0), Leaf(10)), Leaf(4)),
+                         'edited tree')
+        self.assertEqual(zipper.Zipper(tree).replace(Leaf(5)).root(), Leaf(5),
+                         'replace the root')
+        self.assertEqual(zipper.update(tree, ('left', 'name'), str.upper),
+                         Node(Many('M', Leaf(1), Leaf(2)), Leaf(3)), 'update')
+        self.assertRaises(TypeError, zipper.Zipper(tree).insert, 0, 1)
+
+    def test_deep(self):
+        """ Tests editing deep within a tree. """
+
+        tree = Leaf(0)
+        for i in range(3000):
+            tree = Node(tree, Leaf(i))
+
+        path = ('left',) * 2999
+        z = zipper.Zipper(tree).goto(path)
+        z.down('left').replace(Leaf(-1)).up().down('right').replace(Leaf(-2))
+
+        new = z.root()
+        for step in path:
+            self.assertIsNot(new, tree, 'spine is rebuilt')
+            self.assertIs(new.right, tree.right, 'subtrees are shared')
+            (new, tree) = (new.left, tree.left)
+
+        self.assertEqual(new, Node(Leaf(-1), Leaf(-2)), 'edited values')